@@ -0,0 +1,360 @@
+"""
+Duplicate customer detection and merging.
+
+Comparing every customer with every other one is quadratic, so detection
+uses blocking: each customer gets a few cheap keys (the tail of the phone
+number, the email local part and a phonetic key of the name) and only
+customers sharing a key are compared and scored. The table is read once
+as plain tuples.
+
+``merge_customers`` folds duplicates into one customer in a single
+transaction, moving their special dates, bookings, waitlist entries,
+offer usages, spin games, game session and profile over with one UPDATE
+per table.
+
+Detection still reads the whole table, so ``cached_duplicates`` keeps the
+candidates of each threshold in the cache for ``CANDIDATES_TTL`` seconds;
+``find_duplicate_customers`` refreshes them and every merge drops them.
+"""
+import difflib
+from collections import Counter, defaultdict
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+
+from .models import Customer, CustomerProfile
+from .search import _WORD_SPLIT, normalize_text
+
+# Score at or above which two customers are reported as duplicates
+DEFAULT_THRESHOLD = 0.6
+
+# Blocks larger than this (e.g. a very common name) are not compared
+MAX_BLOCK_SIZE = 200
+
+# Phones agreeing on their last digits are the same number written with
+# or without a country code or trunk prefix
+PHONE_TAIL_DIGITS = 9
+
+# Seconds the candidates found for a threshold are served from the cache
+CANDIDATES_TTL = 600
+
+# Bumped by every merge so candidates naming a merged customer are dropped
+CANDIDATES_VERSION_KEY = 'customers:duplicates:version'
+
+WEIGHTS = {
+    'name': 0.35,
+    'phone': 0.35,
+    'email': 0.2,
+    'birth_date': 0.1,
+}
+
+_SOUNDEX_CODES = {
+    **dict.fromkeys('bfpv', '1'),
+    **dict.fromkeys('cgjkqsxz', '2'),
+    **dict.fromkeys('dt', '3'),
+    'l': '4',
+    **dict.fromkeys('mn', '5'),
+    'r': '6',
+}
+
+
+def soundex(word):
+    """American Soundex code of a word, e.g. 'Smith' and 'Smyth' are S530"""
+    word = ''.join(ch for ch in normalize_text(word) if ch.isalpha())
+    if not word:
+        return ''
+    code = word[0].upper()
+    previous = _SOUNDEX_CODES.get(word[0])
+    for ch in word[1:]:
+        digit = _SOUNDEX_CODES.get(ch)
+        if digit and digit != previous:
+            code += digit
+            if len(code) == 4:
+                break
+        if ch not in 'hw':
+            previous = digit
+    return code.ljust(4, '0')
+
+
+def name_key(name):
+    """Phonetic key of a name, independent of word order"""
+    # Soundex only knows Latin letters; other words are kept as written
+    codes = sorted(filter(None, (
+        soundex(word) if word.isascii() else word for word in _WORD_SPLIT.split(normalize_text(name))
+    )))
+    return ' '.join(codes)
+
+
+def email_local_part(email):
+    """Local part of an email with dots and +tags removed"""
+    if not email or '@' not in email:
+        return ''
+    local = email.lower().rsplit('@', 1)[0].split('+', 1)[0]
+    return local.replace('.', '')
+
+
+def phone_tail(digits):
+    return digits[-PHONE_TAIL_DIGITS:] if len(digits) >= 7 else ''
+
+
+def blocking_keys(name, email, digits):
+    keys = []
+    if phone_tail(digits):
+        keys.append('phone:' + phone_tail(digits))
+    if email_local_part(email):
+        keys.append('email:' + email_local_part(email))
+    if name_key(name):
+        keys.append('name:' + name_key(name))
+    return keys
+
+
+def _name_tokens(name):
+    return ' '.join(sorted(filter(None, _WORD_SPLIT.split(normalize_text(name)))))
+
+
+def score_pair(first, second):
+    """Return (score, reasons) for two customer records"""
+    _, name_a, email_a, digits_a, birth_a = first
+    _, name_b, email_b, digits_b, birth_b = second
+    scores = {
+        'name': difflib.SequenceMatcher(None, _name_tokens(name_a), _name_tokens(name_b)).ratio(),
+        'phone': 1.0 if phone_tail(digits_a) and phone_tail(digits_a) == phone_tail(digits_b) else 0.0,
+        'email': 0.0,
+        'birth_date': 1.0 if birth_a == birth_b else 0.0,
+    }
+    if email_a and email_b:
+        if email_a.lower() == email_b.lower():
+            scores['email'] = 1.0
+        elif email_local_part(email_a) == email_local_part(email_b):
+            scores['email'] = 0.6
+    score = sum(WEIGHTS[key] * value for key, value in scores.items())
+    reasons = [key for key, value in scores.items() if value >= 0.8]
+    return round(score, 3), reasons
+
+
+def find_duplicates(threshold=DEFAULT_THRESHOLD, max_block_size=MAX_BLOCK_SIZE, chunk_size=2000):
+    """
+    Return duplicate candidates as dicts, best first.
+
+    Each candidate has ``customer_ids`` (older customer first), ``score``,
+    ``reasons`` (the fields that matched) and the ``blocks`` shared.
+    """
+    records = {}
+    blocks = defaultdict(list)
+    rows = (
+        Customer.objects
+        .order_by('created_at', 'id')
+        .values_list('id', 'name', 'email', 'phone_digits', 'birth_date')
+        .iterator(chunk_size=chunk_size)
+    )
+    for row in rows:
+        records[row[0]] = row
+        for key in blocking_keys(row[1], row[2], row[3]):
+            blocks[key].append(row[0])
+
+    pairs = {}
+    for key, members in blocks.items():
+        if len(members) < 2 or len(members) > max_block_size:
+            continue
+        for i, first in enumerate(members):
+            for second in members[i + 1:]:
+                pair = (first, second)
+                if pair in pairs:
+                    pairs[pair]['blocks'].append(key)
+                    continue
+                score, reasons = score_pair(records[first], records[second])
+                pairs[pair] = {'customer_ids': pair, 'score': score, 'reasons': reasons, 'blocks': [key]}
+
+    candidates = [pair for pair in pairs.values() if pair['score'] >= threshold]
+    candidates.sort(key=lambda pair: -pair['score'])
+    return candidates
+
+
+def _candidates_key(threshold):
+    version = cache.get_or_set(CANDIDATES_VERSION_KEY, 1, timeout=None)
+    return f'customers:duplicates:{version}:{threshold:g}'
+
+
+def store_duplicates(threshold, candidates):
+    """Cache the candidates found for ``threshold``"""
+    cache.set(_candidates_key(threshold), candidates, CANDIDATES_TTL)
+
+
+def cached_duplicates(threshold=DEFAULT_THRESHOLD):
+    """Candidates for ``threshold`` from the cache, found and stored on a miss"""
+    candidates = cache.get(_candidates_key(threshold))
+    if candidates is None:
+        candidates = find_duplicates(threshold=threshold)
+        store_duplicates(threshold, candidates)
+    return candidates
+
+
+def _forget_duplicates():
+    try:
+        cache.incr(CANDIDATES_VERSION_KEY)
+    except ValueError:
+        cache.set(CANDIDATES_VERSION_KEY, 2, timeout=None)
+
+
+def phone_collisions(chunk_size=2000):
+    """
+    Customers whose number is already another customer's, as
+    (customer_id, owner_id, phone_e164) tuples.
+
+    Such numbers predate the phone_e164 unique index and were left without
+    ``phone_e164`` (see migration 0003); merge them into the owner.
+    """
+    from .phone import normalize_phone
+
+    unnormalized = (
+        Customer.objects.filter(phone_e164__isnull=True)
+        .order_by('created_at', 'id')
+        .values_list('id', 'phone')
+        .iterator(chunk_size=chunk_size)
+    )
+    by_number = defaultdict(list)
+    for customer_id, phone in unnormalized:
+        phone_e164 = normalize_phone(phone)
+        if phone_e164:
+            by_number[phone_e164].append(customer_id)
+    owners = dict(
+        Customer.objects.filter(phone_e164__in=list(by_number)).values_list('phone_e164', 'id')
+    ) if by_number else {}
+    return [
+        (customer_id, owners[phone_e164], phone_e164)
+        for phone_e164, customer_ids in by_number.items() if phone_e164 in owners
+        for customer_id in customer_ids
+    ]
+
+
+def duplicate_groups(candidates):
+    """Group candidate pairs into clusters of customer ids (union-find)"""
+    parent = {}
+
+    def root(node):
+        parent.setdefault(node, node)
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    for candidate in candidates:
+        first, second = candidate['customer_ids']
+        parent[root(second)] = root(first)
+
+    groups = defaultdict(list)
+    for node in parent:
+        groups[root(node)].append(node)
+    return list(groups.values())
+
+
+def _merge_one_to_one(model, primary, duplicate_ids, combine):
+    """Keep one row per customer for a one-to-one relation"""
+    rows = list(model.objects.filter(customer_id__in=[primary.pk, *duplicate_ids]))
+    kept = next((row for row in rows if row.customer_id == primary.pk), None)
+    others = [row for row in rows if row is not kept]
+    if not others:
+        return 0
+    if kept is None:
+        kept = others.pop(0)
+        kept.customer = primary
+    for other in others:
+        combine(kept, other)
+    model.objects.filter(pk__in=[other.pk for other in others]).delete()
+    kept.save()
+    return len(others) + 1
+
+
+def _combine_profiles(kept, other):
+    for field in ('address', 'city', 'country', 'notes'):
+        if not getattr(kept, field) and getattr(other, field):
+            setattr(kept, field, getattr(other, field))
+    kept.is_vip = kept.is_vip or other.is_vip
+    kept.preferences = {**(other.preferences or {}), **(kept.preferences or {})}
+
+
+def _combine_game_sessions(kept, other):
+    kept.has_played = kept.has_played or other.has_played
+    dates = [date for date in (kept.first_play_date, other.first_play_date) if date]
+    kept.first_play_date = min(dates) if dates else None
+
+
+def merge_customers(primary_id, duplicate_ids):
+    """
+    Merge ``duplicate_ids`` into ``primary_id`` and delete the duplicates.
+
+    Related rows are moved with one UPDATE per table. Rows that would
+    break a uniqueness rule are dropped instead: an offer used by more
+    than one of the records keeps its earliest usage (the offer gets the
+    other uses back), and a special date the primary already has (same
+    type and date) is not copied. The primary keeps its own fields and
+    takes the email of a duplicate only if it has none.
+    """
+    from events.models import EventBooking, SpecialDate, WaitlistEntry
+    from offers.models import OfferUsage
+    from offers.redemption import release_uses
+    from spin_wheel.models import GameSession, SpinWheelGame
+
+    duplicate_ids = [pk for pk in dict.fromkeys(duplicate_ids) if str(pk) != str(primary_id)]
+    with transaction.atomic():
+        customers = {
+            customer.pk: customer
+            for customer in Customer.objects.select_for_update().filter(pk__in=[primary_id, *duplicate_ids])
+        }
+        primary = next((customer for pk, customer in customers.items() if str(pk) == str(primary_id)), None)
+        if primary is None:
+            raise Customer.DoesNotExist(f'Customer {primary_id} not found')
+        duplicate_ids = [pk for pk in customers if pk != primary.pk]
+        duplicates = [customers[pk] for pk in duplicate_ids]
+        if not duplicates:
+            return {'primary_id': primary.pk, 'merged': 0}
+
+        summary = {'primary_id': primary.pk, 'merged': len(duplicates)}
+
+        already_recorded = SpecialDate.objects.filter(
+            customer=primary,
+            special_date_type=OuterRef('special_date_type'),
+            date=OuterRef('date'),
+        )
+        summary['special_dates_dropped'], _ = (
+            SpecialDate.objects.filter(customer_id__in=duplicate_ids).filter(Exists(already_recorded)).delete()
+        )
+        summary['special_dates'] = SpecialDate.objects.filter(customer_id__in=duplicate_ids).update(customer=primary)
+
+        usages = (
+            OfferUsage.objects
+            .filter(customer_id__in=[primary.pk, *duplicate_ids])
+            .order_by('offer_id', 'used_at', 'id')
+            .values_list('id', 'offer_id')
+        )
+        seen_offers = set()
+        dropped_usages = []
+        released_uses = Counter()
+        for usage_id, offer_id in usages:
+            if offer_id in seen_offers:
+                dropped_usages.append(usage_id)
+                released_uses[offer_id] += 1
+            seen_offers.add(offer_id)
+        OfferUsage.objects.filter(id__in=dropped_usages).delete()
+        # Each dropped usage had taken one of its offer's uses
+        release_uses(released_uses)
+        summary['offer_usages_dropped'] = len(dropped_usages)
+        summary['offer_usages'] = OfferUsage.objects.filter(customer_id__in=duplicate_ids).update(customer=primary)
+
+        summary['event_bookings'] = EventBooking.objects.filter(customer_id__in=duplicate_ids).update(customer=primary)
+        summary['waitlist_entries'] = (
+            WaitlistEntry.objects.filter(customer_id__in=duplicate_ids).update(customer=primary)
+        )
+        summary['spin_games'] = SpinWheelGame.objects.filter(customer_id__in=duplicate_ids).update(customer=primary)
+        summary['game_sessions'] = _merge_one_to_one(GameSession, primary, duplicate_ids, _combine_game_sessions)
+        summary['profiles'] = _merge_one_to_one(CustomerProfile, primary, duplicate_ids, _combine_profiles)
+
+        Customer.objects.filter(pk__in=duplicate_ids).delete()
+        transaction.on_commit(_forget_duplicates)
+        if not primary.email:
+            primary.email = next((duplicate.email for duplicate in duplicates if duplicate.email), None)
+            if primary.email:
+                primary.save(update_fields=['email', 'updated_at'])
+
+    return summary
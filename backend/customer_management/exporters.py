@@ -0,0 +1,128 @@
+"""
+Streaming export of customers with their profile and special dates.
+
+Customers and special dates are read as two server-side cursors of plain
+``values_list`` tuples, both ordered by customer id, and merged as they go.
+No model instance is built and no more than one chunk of either table is
+held in memory, whatever the size of the guest list.
+"""
+import csv
+import io
+import json
+import zlib
+
+from .models import Customer
+
+FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+}
+
+CUSTOMER_COLUMNS = (
+    'id', 'name', 'email', 'phone', 'phone_e164', 'birth_date', 'created_at',
+    'profile__address', 'profile__city', 'profile__country', 'profile__is_vip',
+)
+
+CSV_HEADER = [column.replace('profile__', '') for column in CUSTOMER_COLUMNS] + ['special_dates']
+
+# Flush the output buffer once it holds this many characters
+BUFFER_SIZE = 64 * 1024
+
+
+def _iso(value):
+    return value.isoformat() if value is not None else None
+
+
+def iter_customer_rows(chunk_size=2000):
+    """Yield (customer_row, special_dates) with special dates as (type, date) pairs"""
+    from events.models import SpecialDate
+
+    customers = (
+        Customer.objects
+        .order_by('id')
+        .values_list(*CUSTOMER_COLUMNS)
+        .iterator(chunk_size=chunk_size)
+    )
+    special_dates = (
+        SpecialDate.objects
+        .order_by('customer_id', 'date')
+        .values_list('customer_id', 'special_date_type', 'date')
+        .iterator(chunk_size=chunk_size)
+    )
+
+    pending = next(special_dates, None)
+    for row in customers:
+        customer_id = row[0]
+        dates = []
+        while pending is not None and pending[0] <= customer_id:
+            if pending[0] == customer_id:
+                dates.append((pending[1], pending[2]))
+            pending = next(special_dates, None)
+        yield row, dates
+
+
+def _csv_lines(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_HEADER)
+    for row, dates in rows:
+        writer.writerow([
+            *('' if value is None else _iso(value) if hasattr(value, 'isoformat') else value for value in row),
+            ';'.join(f'{date_type}:{date.isoformat()}' for date_type, date in dates),
+        ])
+        if buffer.tell() >= BUFFER_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _ndjson_lines(rows):
+    chunk = []
+    size = 0
+    for row, dates in rows:
+        (customer_id, name, email, phone, phone_e164, birth_date, created_at,
+         address, city, country, is_vip) = row
+        line = json.dumps({
+            'id': str(customer_id),
+            'name': name,
+            'email': email,
+            'phone': phone,
+            'phone_e164': phone_e164,
+            'birth_date': _iso(birth_date),
+            'created_at': _iso(created_at),
+            'profile': {
+                'address': address,
+                'city': city,
+                'country': country,
+                'is_vip': is_vip,
+            } if is_vip is not None else None,
+            'special_dates': [
+                {'type': date_type, 'date': date.isoformat()} for date_type, date in dates
+            ],
+        }, ensure_ascii=False)
+        chunk.append(line)
+        size += len(line) + 1
+        if size >= BUFFER_SIZE:
+            yield '\n'.join(chunk) + '\n'
+            chunk = []
+            size = 0
+    if chunk:
+        yield '\n'.join(chunk) + '\n'
+
+
+def _gzip(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_customers(output='csv', compress=False, chunk_size=2000):
+    """Return an iterator of encoded chunks for a StreamingHttpResponse"""
+    rows = iter_customer_rows(chunk_size=chunk_size)
+    lines = _ndjson_lines(rows) if output == 'ndjson' else _csv_lines(rows)
+    encoded = (line.encode('utf-8') for line in lines)
+    return _gzip(encoded) if compress else encoded
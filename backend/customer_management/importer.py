@@ -0,0 +1,260 @@
+"""
+Streaming bulk import of customers from CSV or NDJSON.
+
+Rows are read one at a time from the file and written in chunks: each
+chunk is checked for duplicates with a single query against the unique
+phone indexes and inserted with ``bulk_create`` inside its own
+transaction, so memory stays bounded by the chunk size and a 200k row
+file needs a few hundred queries instead of two per row.
+"""
+import csv
+import io
+import json
+import time
+import uuid
+
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, models, transaction
+from django.utils.dateparse import parse_date
+
+from .models import Customer, CustomerProfile
+from .phone import normalize_phone
+from .search import index_customers, phone_digits
+
+FORMATS = ('csv', 'ndjson')
+
+PROFILE_FIELDS = ('address', 'city', 'country', 'notes', 'is_vip')
+
+TRUE_VALUES = {'1', 'true', 'yes', 'y'}
+
+
+def detect_format(filename, default='csv'):
+    """Guess the file format from its extension"""
+    if filename and filename.lower().endswith(('.ndjson', '.jsonl')):
+        return 'ndjson'
+    return default
+
+
+def iter_csv_rows(stream):
+    """Yield (row_number, row) pairs from a binary CSV stream with a header"""
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    reader = csv.DictReader(text)
+    for row_number, row in enumerate(reader, start=2):
+        yield row_number, row
+
+
+def iter_ndjson_rows(stream):
+    """Yield (row_number, row) pairs from a binary NDJSON stream"""
+    for row_number, line in enumerate(io.TextIOWrapper(stream, encoding='utf-8'), start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        if not isinstance(row, dict):
+            yield row_number, {'__error__': 'Line is not a JSON object'}
+            continue
+        yield row_number, row
+
+
+class FileDecodeError(ValueError):
+    """The file is not valid UTF-8"""
+
+
+def iter_rows(stream, file_format):
+    """
+    Yield (row_number, row) pairs; raise FileDecodeError on bytes that are not UTF-8.
+
+    Chunks before the bad bytes have already been written by then.
+    """
+    rows = iter_ndjson_rows(stream) if file_format == 'ndjson' else iter_csv_rows(stream)
+    last_row = 0
+    try:
+        for last_row, row in rows:
+            yield last_row, row
+    except UnicodeDecodeError:
+        where = f'after row {last_row}' if last_row else 'before its first row'
+        raise FileDecodeError(f'File is not valid UTF-8 {where}')
+
+
+def _clean(value):
+    if value is None:
+        return ''
+    return str(value).strip()
+
+
+class CustomerImporter:
+    """
+    Import customers from a stream of row dicts.
+
+    Rows need ``name``, ``phone`` and ``birth_date`` (YYYY-MM-DD); ``email``
+    is optional. With ``with_profiles`` the profile columns (address, city,
+    country, notes, is_vip) create a ``CustomerProfile`` for the row.
+    """
+
+    def __init__(self, chunk_size=1000, with_profiles=False, dry_run=False, max_errors=1000):
+        self.chunk_size = max(1, chunk_size)
+        self.with_profiles = with_profiles
+        self.dry_run = dry_run
+        self.max_errors = max_errors
+        self.seen_phones = set()
+        self.stats = {
+            'rows': 0,
+            'created': 0,
+            'profiles_created': 0,
+            'duplicates': 0,
+            'invalid': 0,
+        }
+        self.errors = []
+        self.errors_truncated = False
+
+    def run(self, rows):
+        """Import every row and return the report"""
+        started = time.monotonic()
+        chunk = []
+        for row_number, row in rows:
+            self.stats['rows'] += 1
+            customer = self.build_customer(row_number, row)
+            if customer is None:
+                continue
+            chunk.append((row_number, customer, row))
+            if len(chunk) >= self.chunk_size:
+                self.write_chunk(chunk)
+                chunk = []
+        self.write_chunk(chunk)
+
+        elapsed = time.monotonic() - started
+        return {
+            **self.stats,
+            'dry_run': self.dry_run,
+            'elapsed_seconds': round(elapsed, 3),
+            'rows_per_second': round(self.stats['rows'] / elapsed, 1) if elapsed else None,
+            'errors': self.errors,
+            'errors_truncated': self.errors_truncated,
+        }
+
+    def add_error(self, row_number, errors, kind='invalid'):
+        self.stats[kind] += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({'row': row_number, 'errors': errors})
+        else:
+            self.errors_truncated = True
+
+    def build_customer(self, row_number, row):
+        """Validate a row and turn it into an unsaved Customer"""
+        if '__error__' in row:
+            self.add_error(row_number, {'non_field_errors': [row['__error__']]})
+            return None
+
+        errors = {}
+        name = _clean(row.get('name'))
+        if not name:
+            errors['name'] = ['This field is required.']
+        elif len(name) > 100:
+            errors['name'] = ['Ensure this field has no more than 100 characters.']
+
+        phone = _clean(row.get('phone'))
+        phone_e164 = normalize_phone(phone)
+        if not phone:
+            errors['phone'] = ['This field is required.']
+        elif len(phone) > 20 or phone_e164 is None:
+            errors['phone'] = ['Enter a valid phone number.']
+
+        birth_date = None
+        raw_birth_date = _clean(row.get('birth_date'))
+        try:
+            birth_date = parse_date(raw_birth_date) if raw_birth_date else None
+        except ValueError:
+            pass
+        if birth_date is None:
+            errors['birth_date'] = ['Enter a valid date in YYYY-MM-DD format.']
+
+        email = _clean(row.get('email')) or None
+        if email:
+            try:
+                validate_email(email)
+            except ValidationError:
+                errors['email'] = ['Enter a valid email address.']
+
+        if errors:
+            self.add_error(row_number, errors)
+            return None
+
+        if phone_e164 in self.seen_phones:
+            self.add_error(row_number, {'phone': ['Duplicate phone number in this file.']}, kind='duplicates')
+            return None
+        self.seen_phones.add(phone_e164)
+
+        return Customer(
+            id=uuid.uuid4(),
+            name=name,
+            email=email,
+            phone=phone,
+            phone_digits=phone_digits(phone),
+            phone_e164=phone_e164,
+            birth_date=birth_date,
+            birth_month_day=birth_date.month * 100 + birth_date.day,
+        )
+
+    def build_profile(self, customer, row):
+        values = {field: _clean(row.get(field)) for field in PROFILE_FIELDS}
+        if not any(values.values()):
+            return None
+        is_vip = values.pop('is_vip').lower() in TRUE_VALUES
+        return CustomerProfile(
+            customer=customer,
+            is_vip=is_vip,
+            **{field: value or None for field, value in values.items()},
+        )
+
+    def write_chunk(self, chunk):
+        """Drop rows whose phone already exists, then insert the rest"""
+        if not chunk:
+            return
+        existing = Customer.objects.filter(
+            models.Q(phone_e164__in=[customer.phone_e164 for _, customer, _ in chunk]) |
+            models.Q(phone__in=[customer.phone for _, customer, _ in chunk])
+        ).values_list('phone_e164', 'phone')
+        taken = {value for pair in existing for value in pair if value}
+
+        fresh = []
+        for row_number, customer, row in chunk:
+            if customer.phone_e164 in taken or customer.phone in taken:
+                self.add_error(row_number, {'phone': ['A customer with this phone number already exists.']},
+                               kind='duplicates')
+            else:
+                fresh.append((row_number, customer, row))
+
+        if self.dry_run:
+            self.stats['created'] += len(fresh)
+            return
+
+        try:
+            self.insert(fresh)
+        except IntegrityError:
+            # Another writer took one of the phones since the duplicate
+            # check; retry row by row so only the conflicting rows fail.
+            for entry in fresh:
+                try:
+                    self.insert([entry])
+                except IntegrityError:
+                    self.add_error(entry[0], {'phone': ['A customer with this phone number already exists.']},
+                                   kind='duplicates')
+
+    def insert(self, entries):
+        customers = [customer for _, customer, _ in entries]
+        profiles = []
+        if self.with_profiles:
+            profiles = [
+                profile for profile in (self.build_profile(customer, row) for _, customer, row in entries)
+                if profile is not None
+            ]
+        with transaction.atomic():
+            Customer.objects.bulk_create(customers)
+            CustomerProfile.objects.bulk_create(profiles)
+            index_customers(customers, replace=False)
+        self.stats['created'] += len(customers)
+        self.stats['profiles_created'] += len(profiles)
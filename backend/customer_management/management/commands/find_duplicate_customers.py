@@ -0,0 +1,68 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from customer_management.duplicates import (
+    DEFAULT_THRESHOLD, MAX_BLOCK_SIZE, duplicate_groups, find_duplicates, merge_customers, phone_collisions,
+    store_duplicates,
+)
+from customer_management.models import Customer
+
+
+class Command(BaseCommand):
+    help = 'Find duplicate customers and optionally merge them'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                            help='Minimum score (0-1) for a pair to be reported')
+        parser.add_argument('--max-block-size', type=int, default=MAX_BLOCK_SIZE,
+                            help='Skip blocking keys shared by more customers than this')
+        parser.add_argument('--merge-above', type=float,
+                            help='Merge every group of customers whose pairs score at least this much '
+                                 'into its oldest customer')
+        parser.add_argument('--phone-collisions', action='store_true',
+                            help='Only list customers whose phone number normalizes to another '
+                                 "customer's (left without phone_e164 by migration 0003)")
+        parser.add_argument('--json', action='store_true',
+                            help='Print candidates as NDJSON instead of text')
+
+    def handle(self, *args, **options):
+        if options['phone_collisions']:
+            collisions = phone_collisions()
+            for customer_id, owner_id, phone_e164 in collisions:
+                self.stdout.write(f'{customer_id}  {owner_id}  {phone_e164}')
+            self.stderr.write(f'{len(collisions)} customers share their phone number with an older customer')
+            return
+
+        candidates = find_duplicates(
+            threshold=options['threshold'],
+            max_block_size=options['max_block_size'],
+        )
+        if options['max_block_size'] == MAX_BLOCK_SIZE:
+            # The duplicates endpoint serves these until they expire or a merge
+            store_duplicates(options['threshold'], candidates)
+        for candidate in candidates:
+            first, second = candidate['customer_ids']
+            if options['json']:
+                self.stdout.write(json.dumps({**candidate, 'customer_ids': [str(first), str(second)]}))
+            else:
+                self.stdout.write(
+                    f"{candidate['score']:.3f}  {first}  {second}  {','.join(candidate['reasons'])}"
+                )
+        self.stderr.write(f'{len(candidates)} duplicate candidates')
+
+        if options['merge_above'] is None:
+            return
+
+        groups = duplicate_groups(
+            [candidate for candidate in candidates if candidate['score'] >= options['merge_above']]
+        )
+        merged = 0
+        for group in groups:
+            oldest = Customer.objects.filter(pk__in=group).order_by('created_at', 'id').values_list('pk', flat=True)
+            primary_id = oldest.first()
+            summary = merge_customers(primary_id, [pk for pk in group if pk != primary_id])
+            merged += summary['merged']
+        self.stdout.write(self.style.SUCCESS(
+            f'Merged {merged} customers into {len(groups)} records'
+        ))
@@ -0,0 +1,58 @@
+import json
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from customer_management.importer import FORMATS, CustomerImporter, FileDecodeError, detect_format, iter_rows
+
+
+class Command(BaseCommand):
+    help = 'Bulk import customers from a CSV or NDJSON file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to import, or '-' to read from stdin")
+        parser.add_argument('--format', dest='file_format', choices=FORMATS,
+                            help='File format (detected from the extension by default)')
+        parser.add_argument('--chunk-size', type=int, default=1000,
+                            help='Rows inserted per transaction')
+        parser.add_argument('--with-profiles', action='store_true',
+                            help='Create customer profiles from the address/city/country/notes/is_vip columns')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Validate and check duplicates without writing anything')
+        parser.add_argument('--max-errors', type=int, default=1000,
+                            help='Maximum number of row errors included in the report')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['file_format'] or detect_format(path)
+        importer = CustomerImporter(
+            chunk_size=options['chunk_size'],
+            with_profiles=options['with_profiles'],
+            dry_run=options['dry_run'],
+            max_errors=options['max_errors'],
+        )
+
+        try:
+            if path == '-':
+                report = importer.run(iter_rows(sys.stdin.buffer, file_format))
+            else:
+                try:
+                    stream = open(path, 'rb')
+                except OSError as exc:
+                    raise CommandError(f'Cannot open {path}: {exc}')
+                with stream:
+                    report = importer.run(iter_rows(stream, file_format))
+        except FileDecodeError as exc:
+            raise CommandError(f"{exc}; {importer.stats['created']} rows before it were imported")
+
+        for error in report['errors']:
+            self.stderr.write(f"Row {error['row']}: {json.dumps(error['errors'])}")
+        if report['errors_truncated']:
+            self.stderr.write('Further row errors were not reported')
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{'Validated' if report['dry_run'] else 'Imported'} {report['created']} of {report['rows']} rows "
+            f"({report['duplicates']} duplicates, {report['invalid']} invalid, "
+            f"{report['profiles_created']} profiles) in {report['elapsed_seconds']}s "
+            f"- {report['rows_per_second']} rows/s"
+        ))
@@ -0,0 +1,91 @@
+# Generated by Django 5.0.14 on 2026-10-18 05:00
+
+import re
+import unicodedata
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Frozen copies of customer_management.search as of this migration, so
+# later changes to the live index code do not change what it wrote
+_WORD_SPLIT = re.compile(r'[^0-9a-z]+')
+_NON_DIGITS = re.compile(r'\D+')
+
+
+def phone_digits(value):
+    return _NON_DIGITS.sub('', value or '')
+
+
+def _ngrams(value):
+    return {value[i:i + 3] for i in range(len(value) - 3 + 1)}
+
+
+def text_grams(value):
+    value = unicodedata.normalize('NFKD', value or '')
+    value = ''.join(ch for ch in value if not unicodedata.combining(ch)).lower()
+    grams = set()
+    for word in _WORD_SPLIT.split(value):
+        if word:
+            grams |= _ngrams(f' {word}')
+    return grams
+
+
+def customer_grams(name, email, phone):
+    for gram in text_grams(name):
+        yield 'name', gram
+    for gram in text_grams(email):
+        yield 'email', gram
+    for gram in _ngrams(phone_digits(phone)):
+        yield 'phone', gram
+
+
+def backfill_search_index(apps, schema_editor):
+    """Fill phone_digits and the trigram index for existing customers"""
+    Customer = apps.get_model('customer_management', 'Customer')
+    CustomerSearchGram = apps.get_model('customer_management', 'CustomerSearchGram')
+    
+    customers = []
+    grams = []
+    for customer in Customer.objects.only('id', 'name', 'email', 'phone').iterator(chunk_size=1000):
+        customer.phone_digits = phone_digits(customer.phone)
+        customers.append(customer)
+        grams.extend(
+            CustomerSearchGram(customer_id=customer.pk, field=field, gram=gram)
+            for field, gram in customer_grams(customer.name, customer.email, customer.phone)
+        )
+        if len(customers) >= 1000:
+            Customer.objects.bulk_update(customers, ['phone_digits'])
+            CustomerSearchGram.objects.bulk_create(grams, batch_size=1000)
+            customers, grams = [], []
+    Customer.objects.bulk_update(customers, ['phone_digits'])
+    CustomerSearchGram.objects.bulk_create(grams, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer_management', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customer',
+            name='phone_digits',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=20),
+        ),
+        migrations.CreateModel(
+            name='CustomerSearchGram',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('field', models.CharField(choices=[('name', 'Name'), ('email', 'Email'), ('phone', 'Phone')], max_length=10)),
+                ('gram', models.CharField(max_length=3)),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_grams', to='customer_management.customer')),
+            ],
+            options={
+                'verbose_name': 'Customer Search Gram',
+                'verbose_name_plural': 'Customer Search Grams',
+                'indexes': [models.Index(fields=['gram', 'field', 'customer'], name='customer_search_gram_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_search_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 5.0.14 on 2026-10-18 05:01
+
+import re
+
+from django.conf import settings
+from django.db import migrations, models
+
+# Frozen copy of customer_management.phone.normalize_phone as of this
+# migration, so later changes to the live normalizer do not change it;
+# the default country code stays a deployment setting
+_E164_PATTERN = re.compile(r'^\+[1-9]\d{7,14}$')
+_NON_DIGITS = re.compile(r'\D+')
+
+
+def normalize_phone(value):
+    if not value:
+        return None
+    value = value.strip()
+    if _E164_PATTERN.match(value):
+        return value
+    digits = _NON_DIGITS.sub('', value)
+    if value.startswith('+'):
+        number = digits
+    elif digits.startswith('00'):
+        number = digits[2:]
+    else:
+        number = getattr(settings, 'PHONE_DEFAULT_COUNTRY_CODE', '1') + digits.lstrip('0')
+    candidate = f'+{number}'
+    return candidate if _E164_PATTERN.match(candidate) else None
+
+
+def backfill_phone_e164(apps, schema_editor):
+    """
+    Normalize existing phone numbers in bulk.
+
+    Rows whose number normalizes to one already taken by an older customer
+    are left empty so the unique index in the next migration can be built;
+    ``find_duplicate_customers --phone-collisions`` lists them for merging.
+    """
+    Customer = apps.get_model('customer_management', 'Customer')
+    
+    seen = set()
+    batch = []
+    for customer in Customer.objects.only('id', 'phone').order_by('created_at').iterator(chunk_size=1000):
+        phone_e164 = normalize_phone(customer.phone)
+        if phone_e164 in seen:
+            phone_e164 = None
+        elif phone_e164:
+            seen.add(phone_e164)
+        customer.phone_e164 = phone_e164
+        batch.append(customer)
+        if len(batch) >= 1000:
+            Customer.objects.bulk_update(batch, ['phone_e164'])
+            batch = []
+    Customer.objects.bulk_update(batch, ['phone_e164'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer_management', '0002_customer_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customer',
+            name='phone_e164',
+            field=models.CharField(blank=True, editable=False, max_length=16, null=True),
+        ),
+        migrations.RunPython(backfill_phone_e164, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.14 on 2026-10-18 05:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer_management', '0003_customer_phone_e164'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='customer',
+            name='phone_e164',
+            field=models.CharField(blank=True, editable=False, max_length=16, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.0.14 on 2026-10-18 05:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer_management', '0004_customer_phone_e164_unique'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['-created_at', '-id'], name='customer_created_id_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.0.14 on 2026-10-18 05:08
+
+from django.db import migrations, models
+from django.db.models.functions import ExtractDay, ExtractMonth
+
+
+def backfill_birth_month_day(apps, schema_editor):
+    """Compute month * 100 + day for existing rows in a single UPDATE"""
+    Customer = apps.get_model('customer_management', 'Customer')
+    Customer.objects.update(birth_month_day=ExtractMonth('birth_date') * 100 + ExtractDay('birth_date'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer_management', '0005_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customer',
+            name='birth_month_day',
+            field=models.PositiveSmallIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_birth_month_day, migrations.RunPython.noop),
+    ]
@@ -3,6 +3,9 @@ from django.contrib.auth.models import User
 from django.core.validators import EmailValidator
 import uuid
 
+from .phone import normalize_phone
+from .search import phone_digits
+
 class Customer(models.Model):
     """Customer model for hotel booking system"""
     
@@ -10,7 +13,10 @@ class Customer(models.Model):
     name = models.CharField(max_length=100)
     email = models.EmailField(validators=[EmailValidator()], blank=True, null=True)
     phone = models.CharField(max_length=20, unique=True)
+    phone_digits = models.CharField(max_length=20, blank=True, default='', db_index=True, editable=False)
+    phone_e164 = models.CharField(max_length=16, unique=True, blank=True, null=True, editable=False)
     birth_date = models.DateField()
+    birth_month_day = models.PositiveSmallIntegerField(default=0, db_index=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -18,9 +24,39 @@ class Customer(models.Model):
         ordering = ['-created_at']
         verbose_name = 'Customer'
         verbose_name_plural = 'Customers'
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='customer_created_id_idx'),
+        ]
     
     def __str__(self):
         return f"{self.name} ({self.phone})"
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remembered so saves that keep the phone keep its stored normalizations
+        instance._loaded_phone = instance.__dict__.get('phone')
+        return instance
+    
+    def save(self, *args, **kwargs):
+        # A number left without phone_e164 because another customer has the
+        # same one (see migration 0003) must not fail every later save
+        phone = self.__dict__.get('phone')
+        if self._state.adding or (phone is not None and phone != getattr(self, '_loaded_phone', None)):
+            self.phone_digits = phone_digits(self.phone)
+            self.phone_e164 = normalize_phone(self.phone)
+        # Recurring birthdays are looked up by month and day (see events.anniversaries)
+        birth_date = self._meta.get_field('birth_date').to_python(self.birth_date)
+        self.birth_month_day = birth_date.month * 100 + birth_date.day
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'phone' in update_fields:
+            update_fields = set(update_fields) | {'phone_digits', 'phone_e164'}
+        if update_fields is not None and 'birth_date' in update_fields:
+            update_fields = set(update_fields) | {'birth_month_day'}
+        if update_fields is not None:
+            kwargs['update_fields'] = update_fields
+        super().save(*args, **kwargs)
+        self._loaded_phone = phone
 
 class CustomerProfile(models.Model):
     """Extended customer profile with additional information"""
@@ -32,6 +68,30 @@ class CustomerProfile(models.Model):
     preferences = models.JSONField(default=dict, blank=True)
     notes = models.TextField(blank=True, null=True)
     is_vip = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"Profile for {self.customer.name}"
+
+class CustomerSearchGram(models.Model):
+    """Trigram posting used by the customer search index (see search.py)"""
+    
+    FIELD_CHOICES = [
+        ('name', 'Name'),
+        ('email', 'Email'),
+        ('phone', 'Phone'),
+    ]
+    
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='search_grams')
+    field = models.CharField(max_length=10, choices=FIELD_CHOICES)
+    gram = models.CharField(max_length=3)
+    
+    class Meta:
+        verbose_name = 'Customer Search Gram'
+        verbose_name_plural = 'Customer Search Grams'
+        indexes = [
+            models.Index(fields=['gram', 'field', 'customer'], name='customer_search_gram_idx'),
+        ]
     
     def __str__(self):
-        return f"Profile for {self.customer.name}"
\ No newline at end of file
+        return f"{self.field}:{self.gram}"
@@ -0,0 +1,104 @@
+"""
+Customer 360: everything the customer detail screen shows, in one call.
+
+The customer row comes back with its profile and game session joined and
+every summary total computed by correlated subqueries, then each section
+is one query with its foreign keys joined in. The whole payload therefore
+costs five queries however much history the customer has.
+"""
+from decimal import Decimal
+
+from django.db.models import Count, DecimalField, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from rest_framework.generics import get_object_or_404
+
+from .models import Customer
+
+DEFAULT_SECTION_LIMIT = 10
+MAX_SECTION_LIMIT = 100
+
+
+def _aggregate(queryset, expression, output_field):
+    """Correlated subquery computing one aggregate per customer"""
+    subquery = (
+        queryset
+        .filter(customer=OuterRef('pk'))
+        .order_by()
+        .values('customer')
+        .annotate(value=expression)
+        .values('value')
+    )
+    zero = Decimal('0.00') if isinstance(output_field, DecimalField) else 0
+    return Coalesce(Subquery(subquery, output_field=output_field), Value(zero), output_field=output_field)
+
+
+def customer_360_queryset():
+    from events.models import EventBooking, SpecialDate
+    from offers.models import OfferUsage
+    from spin_wheel.models import SpinWheelGame
+
+    money = DecimalField(max_digits=12, decimal_places=2)
+    active_bookings = EventBooking.objects.exclude(status='Cancelled')
+    return (
+        Customer.objects
+        .select_related('profile', 'game_session')
+        .annotate(
+            special_dates_count=_aggregate(SpecialDate.objects.all(), Count('id'), IntegerField()),
+            bookings_count=_aggregate(EventBooking.objects.all(), Count('id'), IntegerField()),
+            cancelled_bookings_count=_aggregate(
+                EventBooking.objects.filter(status='Cancelled'), Count('id'), IntegerField()),
+            guests_booked=_aggregate(active_bookings, Sum('number_of_guests'), IntegerField()),
+            total_spent=_aggregate(active_bookings, Sum('total_price'), money),
+            offers_used_count=_aggregate(OfferUsage.objects.all(), Count('id'), IntegerField()),
+            total_discount=_aggregate(OfferUsage.objects.all(), Sum('discount_applied'), money),
+            spin_games_count=_aggregate(SpinWheelGame.objects.all(), Count('id'), IntegerField()),
+            unclaimed_prizes_count=_aggregate(
+                SpinWheelGame.objects.filter(is_claimed=False), Count('id'), IntegerField()),
+        )
+    )
+
+
+def _section(related_queryset, customer, limit):
+    """Fetch the newest ``limit`` rows and attach the customer already loaded"""
+    rows = list(related_queryset[:limit])
+    for row in rows:
+        row.customer = customer
+    return rows
+
+
+def build_customer_360(pk, limit=DEFAULT_SECTION_LIMIT):
+    from events.serializers import EventBookingSerializer, SpecialDateSerializer
+    from offers.serializers import OfferUsageSerializer
+    from spin_wheel.serializers import SpinWheelGameSerializer
+    from .serializers import CustomerDetailSerializer
+
+    customer = get_object_or_404(customer_360_queryset(), pk=pk)
+
+    special_dates = _section(customer.special_dates.order_by('date'), customer, limit)
+    bookings = _section(customer.event_bookings.select_related('event'), customer, limit)
+    offer_usages = _section(customer.offer_usages.select_related('offer'), customer, limit)
+    spin_games = _section(customer.spin_games.select_related('prize_won'), customer, limit)
+
+    game_session = getattr(customer, 'game_session', None)
+    return {
+        'customer': CustomerDetailSerializer(customer).data,
+        'game_status': {
+            'has_played': game_session.has_played if game_session else False,
+            'first_play_date': game_session.first_play_date if game_session else None,
+        },
+        'special_dates': SpecialDateSerializer(special_dates, many=True).data,
+        'bookings': EventBookingSerializer(bookings, many=True).data,
+        'offer_usages': OfferUsageSerializer(offer_usages, many=True).data,
+        'spin_games': SpinWheelGameSerializer(spin_games, many=True).data,
+        'summary': {
+            'special_dates': customer.special_dates_count,
+            'bookings': customer.bookings_count,
+            'cancelled_bookings': customer.cancelled_bookings_count,
+            'guests_booked': customer.guests_booked,
+            'total_spent': f'{customer.total_spent:.2f}',
+            'offers_used': customer.offers_used_count,
+            'total_discount': f'{customer.total_discount:.2f}',
+            'spin_games': customer.spin_games_count,
+            'unclaimed_prizes': customer.unclaimed_prizes_count,
+        },
+    }
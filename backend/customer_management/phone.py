@@ -0,0 +1,48 @@
+"""
+Phone number normalization.
+
+Customers type phone numbers in every format imaginable. ``normalize_phone``
+turns them into E.164 (``+<country code><number>``) once, on write, so
+duplicate checks, searches and WhatsApp sends can compare the stored value
+directly instead of re-parsing the free text each time.
+"""
+import re
+
+from django.conf import settings
+
+E164_PATTERN = re.compile(r'^\+[1-9]\d{7,14}$')
+
+_NON_DIGITS = re.compile(r'\D+')
+
+
+def is_e164(value):
+    """Return True if value is already a normalized E.164 number"""
+    return bool(value) and bool(E164_PATTERN.match(value))
+
+
+def normalize_phone(value, default_country_code=None):
+    """
+    Return ``value`` as an E.164 string, or None if it cannot be one.
+
+    Numbers written with a leading ``+`` or ``00`` keep their country code.
+    Anything else is treated as a national number: leading zeros are
+    dropped and ``PHONE_DEFAULT_COUNTRY_CODE`` is prepended.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if is_e164(value):
+        return value
+
+    digits = _NON_DIGITS.sub('', value)
+    if value.startswith('+'):
+        number = digits
+    elif digits.startswith('00'):
+        number = digits[2:]
+    else:
+        if default_country_code is None:
+            default_country_code = getattr(settings, 'PHONE_DEFAULT_COUNTRY_CODE', '1')
+        number = default_country_code + digits.lstrip('0')
+
+    candidate = f'+{number}'
+    return candidate if is_e164(candidate) else None
@@ -0,0 +1,79 @@
+"""
+Partial updates of ``CustomerProfile.preferences`` merged inside the database.
+
+Reading the preferences document, updating it in Python and saving the
+whole row loses writes when the concierge and the app update the same
+profile at once, and rewrites every column each time. ``JSONMerge`` turns
+the merge into part of the ``UPDATE`` statement instead, so concurrent
+patches touching different keys all survive and only ``preferences`` and
+``updated_at`` are written.
+
+The merge is shallow, like ``dict.update``: top-level keys in the patch
+replace the stored value, other keys are left alone.
+"""
+import json
+
+from django.db.models import F, Func, JSONField
+from django.utils import timezone
+
+from .models import CustomerProfile
+
+
+class JSONMerge(Func):
+    """``expression`` with the top-level keys of ``patch`` set on it"""
+
+    output_field = JSONField()
+
+    def __init__(self, expression, patch):
+        super().__init__(expression)
+        self.patch = patch
+
+    def as_sql(self, compiler, connection, **extra_context):
+        # SQLite and MySQL: json_set(doc, '$."key"', json(value), ...)
+        sql, params = compiler.compile(self.source_expressions[0])
+        sql = f"COALESCE({sql}, '{{}}')"
+        for key, value in self.patch.items():
+            sql = f'JSON_SET({sql}, %s, {self._json_value(connection)})'
+            params = (*params, self._path(key, connection), json.dumps(value))
+        return sql, params
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        sql, params = compiler.compile(self.source_expressions[0])
+        return f"(COALESCE({sql}, '{{}}'::jsonb) || %s::jsonb)", (*params, json.dumps(self.patch))
+
+    @staticmethod
+    def _json_value(connection):
+        return 'CAST(%s AS JSON)' if connection.vendor == 'mysql' else 'JSON(%s)'
+
+    @staticmethod
+    def _path(key, connection):
+        key = str(key)
+        if connection.vendor == 'mysql':
+            key = key.replace('\\', '\\\\').replace('"', '\\"')
+        elif '"' in key:
+            # SQLite JSON paths have no way to escape a double quote
+            raise ValueError(f'Preference keys cannot contain double quotes: {key!r}')
+        return f'$."{key}"'
+
+
+def merge_preferences(queryset, patch):
+    """
+    Merge ``patch`` into the preferences of every profile in ``queryset`` with one UPDATE.
+
+    Returns the number of profiles updated. Raises ValueError for keys the
+    database cannot address.
+    """
+    if not patch:
+        return queryset.count()
+    return queryset.update(
+        preferences=JSONMerge(F('preferences'), patch),
+        updated_at=timezone.now(),
+    )
+
+
+def merge_profile_preferences(pk, patch):
+    """Merge ``patch`` into one profile and return its preferences, or None if it does not exist"""
+    profiles = CustomerProfile.objects.filter(pk=pk)
+    if not merge_preferences(profiles, patch):
+        return None
+    return profiles.values_list('preferences', flat=True).first()
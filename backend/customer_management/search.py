@@ -0,0 +1,252 @@
+"""
+Trigram search index for customers.
+
+Every customer is broken into overlapping three character grams over the
+name, the email and the phone digits, stored in ``CustomerSearchGram``.
+A query is broken into the same grams and candidates are ranked by how
+many grams they share with it, so a lookup walks the gram index instead
+of scanning the customer table with ``LIKE '%...%'``.
+
+The index is a plain table maintained through the ORM, which keeps SQLite
+in development and PostgreSQL in production on the same code path.
+"""
+import math
+import re
+import unicodedata
+
+from django.db import connections, models, router
+
+from .phone import normalize_phone
+
+GRAM_SIZE = 3
+
+# Share of the query grams a candidate must contain to be returned
+MIN_SIMILARITY = 0.5
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 200
+
+# Words are runs of Unicode letters and digits, so names in any script index
+_WORD_SPLIT = re.compile(r'[\W_]+')
+_NON_DIGITS = re.compile(r'\D+')
+
+
+def normalize_text(value):
+    """Casefold and strip accents so 'José' and 'jose' index the same"""
+    if not value:
+        return ''
+    value = unicodedata.normalize('NFKD', value)
+    value = ''.join(ch for ch in value if not unicodedata.combining(ch))
+    return value.casefold()
+
+
+def phone_digits(value):
+    """Return only the digits of a phone number"""
+    return _NON_DIGITS.sub('', value or '')
+
+
+def _ngrams(value):
+    return {value[i:i + GRAM_SIZE] for i in range(len(value) - GRAM_SIZE + 1)}
+
+
+def text_grams(value, padded=True):
+    """
+    Trigrams for free text.
+
+    Each word is prefixed with a space when ``padded`` so grams at the start
+    of a word (' jo') rank prefix matches above matches in the middle and
+    let two character queries hit the index.
+    """
+    grams = set()
+    for word in _WORD_SPLIT.split(normalize_text(value)):
+        if not word:
+            continue
+        grams |= _ngrams(f' {word}' if padded else word)
+    return grams
+
+
+def digit_grams(value):
+    """Trigrams over the digits of a phone number"""
+    return _ngrams(phone_digits(value))
+
+
+def customer_grams(name, email, phone):
+    """Yield (field, gram) pairs for one customer"""
+    for gram in text_grams(name):
+        yield 'name', gram
+    for gram in text_grams(email):
+        yield 'email', gram
+    for gram in digit_grams(phone):
+        yield 'phone', gram
+
+
+def digit_prefix_filter(field, prefix):
+    """
+    Range predicate matching values that start with a digit prefix.
+
+    ``startswith`` compiles to ``LIKE ... ESCAPE`` which SQLite cannot serve
+    from an index, whereas ``prefix <= value < next_prefix`` is a plain
+    index range scan on every backend.
+    """
+    lookup = models.Q(**{f'{field}__gte': prefix})
+    upper = prefix.rstrip('9')
+    if upper:
+        upper = upper[:-1] + str(int(upper[-1]) + 1)
+        lookup &= models.Q(**{f'{field}__lt': upper})
+    return lookup
+
+
+def index_customers(customers, replace=True):
+    """
+    Rebuild the index entries for the given customers.
+
+    Postings are written with a single ``executemany`` rather than through
+    model instances, which would dominate the cost of bulk imports. Pass
+    ``replace=False`` for customers that were just created and have no
+    entries to remove.
+    """
+    from .models import CustomerSearchGram
+
+    customers = list(customers)
+    if not customers:
+        return
+    if replace:
+        CustomerSearchGram.objects.filter(customer_id__in=[c.pk for c in customers]).delete()
+
+    meta = CustomerSearchGram._meta
+    connection = connections[router.db_for_write(CustomerSearchGram)]
+    customer_field = meta.get_field('customer')
+    quote = connection.ops.quote_name
+    sql = 'INSERT INTO {} ({}, {}, {}) VALUES (%s, %s, %s)'.format(
+        quote(meta.db_table), quote(customer_field.column), quote('field'), quote('gram'),
+    )
+    params = []
+    for customer in customers:
+        customer_id = customer_field.get_db_prep_save(customer.pk, connection)
+        params.extend(
+            (customer_id, field, gram)
+            for field, gram in customer_grams(customer.name, customer.email, customer.phone)
+        )
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, params)
+
+
+def index_customer(customer):
+    """Rebuild the index entries for a single customer"""
+    index_customers([customer])
+
+
+def rebuild_index(chunk_size=1000):
+    """Reindex every customer, returning the number of customers indexed"""
+    from .models import Customer, CustomerSearchGram
+
+    CustomerSearchGram.objects.all().delete()
+    total = 0
+    chunk = []
+    for customer in Customer.objects.only('id', 'name', 'email', 'phone').iterator(chunk_size=chunk_size):
+        chunk.append(customer)
+        if len(chunk) >= chunk_size:
+            index_customers(chunk, replace=False)
+            total += len(chunk)
+            chunk = []
+    index_customers(chunk, replace=False)
+    return total + len(chunk)
+
+
+def matching_customer_ids(field, value):
+    """
+    Subquery of customers whose ``field`` contains every gram of ``value``.
+
+    The result is a superset of ``field__icontains=value`` and is meant to
+    narrow the candidates before that check. Returns None when the value is
+    too short to produce any gram.
+    """
+    from .models import CustomerSearchGram
+
+    grams = digit_grams(value) if field == 'phone' else text_grams(value, padded=False)
+    if not grams:
+        return None
+    return (
+        CustomerSearchGram.objects
+        .filter(field=field, gram__in=grams)
+        .values('customer_id')
+        .annotate(hits=models.Count('id'))
+        .filter(hits=len(grams))
+        .values('customer_id')
+    )
+
+
+def search_customers(query, limit=DEFAULT_LIMIT):
+    """
+    Return customers matching ``query``, best match first.
+
+    Each result carries a ``search_score`` between 0 and 1. Phone-like
+    queries are first answered from the ``phone_e164`` index as an exact
+    match and from the ``phone_digits`` index as a prefix match, then
+    topped up with trigram matches over all fields.
+    """
+    from .models import Customer, CustomerSearchGram
+
+    limit = max(1, min(int(limit), MAX_LIMIT))
+    scores = {}
+
+    digits = phone_digits(query)
+    if digits and len(digits) * 2 >= len(query.replace(' ', '')):
+        phone_e164 = normalize_phone(query)
+        if phone_e164:
+            for customer_id in Customer.objects.filter(phone_e164=phone_e164).values_list('id', flat=True):
+                scores[customer_id] = 1.0
+        prefix_ids = (
+            Customer.objects
+            .filter(digit_prefix_filter('phone_digits', digits))
+            .order_by('phone_digits')
+            .values_list('id', flat=True)[:limit]
+        )
+        for customer_id in prefix_ids:
+            scores.setdefault(customer_id, 1.0)
+
+    grams_by_field = {
+        'name': text_grams(query),
+        'email': text_grams(query),
+        'phone': digit_grams(query),
+    }
+    lookup = models.Q()
+    for field, grams in grams_by_field.items():
+        if grams:
+            lookup |= models.Q(field=field, gram__in=grams)
+
+    if lookup and len(scores) < limit:
+        min_hits = min(
+            max(1, math.ceil(len(grams) * MIN_SIMILARITY))
+            for grams in grams_by_field.values() if grams
+        )
+        rows = (
+            CustomerSearchGram.objects
+            .filter(lookup)
+            .values('customer_id', 'field')
+            .annotate(hits=models.Count('id'))
+            .filter(hits__gte=min_hits)
+            .order_by('-hits')[:limit * len(grams_by_field)]
+        )
+        for row in rows:
+            total = len(grams_by_field[row['field']])
+            score = row['hits'] / total
+            if score < MIN_SIMILARITY:
+                continue
+            customer_id = row['customer_id']
+            scores[customer_id] = max(scores.get(customer_id, 0), score)
+
+    if not lookup and not scores:
+        # Single character queries produce no gram, only match name prefixes
+        for customer_id in Customer.objects.filter(name__istartswith=query).values_list('id', flat=True)[:limit]:
+            scores[customer_id] = MIN_SIMILARITY
+
+    ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+    customers = Customer.objects.in_bulk([customer_id for customer_id, _ in ranked])
+    results = []
+    for customer_id, score in ranked:
+        customer = customers.get(customer_id)
+        if customer is not None:
+            customer.search_score = round(score, 3)
+            results.append(customer)
+    return results
@@ -1,23 +1,55 @@
 from rest_framework import serializers
+from hotel_backend.serializers import DynamicFieldsMixin
 from .models import Customer, CustomerProfile
+from .phone import normalize_phone
 
-class CustomerSerializer(serializers.ModelSerializer):
+
+def validate_unique_phone(value, instance=None):
+    """
+    Reject phone numbers that are invalid or already used in any format.
+    
+    An unchanged number is accepted as is, so legacy numbers that do not
+    normalize and numbers that collided with an older customer's (left
+    without ``phone_e164``, see ``find_duplicate_customers
+    --phone-collisions``) do not block edits to the rest of the customer.
+    """
+    if instance is not None and value == instance.phone:
+        return value
+    phone_e164 = normalize_phone(value)
+    if phone_e164 is None:
+        raise serializers.ValidationError("Enter a valid phone number.")
+    
+    duplicates = Customer.objects.filter(phone_e164=phone_e164)
+    if instance is not None:
+        duplicates = duplicates.exclude(pk=instance.pk)
+    if duplicates.exists():
+        raise serializers.ValidationError("A customer with this phone number already exists.")
+    return value
+
+class CustomerSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Serializer for Customer model"""
     
     class Meta:
         model = Customer
         fields = ['id', 'name', 'email', 'phone', 'birth_date', 'created_at', 'updated_at']
         read_only_fields = ['id', 'created_at', 'updated_at']
+        expandable_fields = {
+            'profile': 'customer_management.serializers.CustomerProfileSerializer',
+        }
+    
+    def validate_phone(self, value):
+        """Validate phone number uniqueness"""
+        return validate_unique_phone(value, instance=self.instance)
 
-class CustomerProfileSerializer(serializers.ModelSerializer):
+class CustomerProfileSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Serializer for CustomerProfile model"""
     
     class Meta:
         model = CustomerProfile
-        fields = ['id', 'address', 'city', 'country', 'preferences', 'notes', 'is_vip']
-        read_only_fields = ['id']
+        fields = ['id', 'address', 'city', 'country', 'preferences', 'notes', 'is_vip', 'updated_at']
+        read_only_fields = ['id', 'updated_at']
 
-class CustomerDetailSerializer(serializers.ModelSerializer):
+class CustomerDetailSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Detailed serializer for Customer with profile"""
     
     profile = CustomerProfileSerializer(read_only=True)
@@ -36,6 +68,4 @@ class CustomerCreateSerializer(serializers.ModelSerializer):
     
     def validate_phone(self, value):
         """Validate phone number uniqueness"""
-        if Customer.objects.filter(phone=value).exists():
-            raise serializers.ValidationError("A customer with this phone number already exists.")
-        return value
+        return validate_unique_phone(value)
@@ -0,0 +1,16 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .models import Customer
+from .search import index_customer
+
+SEARCHABLE_FIELDS = {'name', 'email', 'phone'}
+
+@receiver(post_save, sender=Customer)
+def update_customer_search_index(sender, instance, created, update_fields=None, raw=False, **kwargs):
+    """Keep the trigram index in step with customer writes"""
+    if raw:
+        return
+    if update_fields is not None and not SEARCHABLE_FIELDS & set(update_fields):
+        return
+    index_customer(instance)
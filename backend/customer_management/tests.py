@@ -1,3 +1,490 @@
-from django.test import TestCase
+import csv
+import gzip
+import io
+import json
+import uuid
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db.models import F
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import NotFound
+from rest_framework.test import APIClient
+
+from hotel_backend.pagination import decode_cursor, encode_cursor, keyset_page
+
+from .duplicates import cached_duplicates, find_duplicates, merge_customers, name_key, phone_collisions
+from .importer import CustomerImporter, FileDecodeError, iter_rows
+from .models import Customer, CustomerProfile
+from .phone import normalize_phone
+from .preferences import JSONMerge, merge_preferences
+from .search import rebuild_index, search_customers, text_grams
+
+
+def make_customer(phone, name=None, **fields):
+    return Customer.objects.create(name=name or f'Guest {phone}', phone=phone,
+                                   birth_date=fields.pop('birth_date', date(1990, 1, 1)), **fields)
+
+
+@override_settings(PHONE_DEFAULT_COUNTRY_CODE='1')
+class PhoneNormalizationTests(TestCase):
+    """Phone numbers are stored once in E.164 and matched in any format"""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_normalize_phone(self):
+        self.assertEqual(normalize_phone('+1 (555) 010-2030'), '+15550102030')
+        self.assertEqual(normalize_phone('0044 20 7946 0958'), '+442079460958')
+        self.assertEqual(normalize_phone('555-010-2030'), '+15550102030')
+        self.assertIsNone(normalize_phone('12'))
+        self.assertIsNone(normalize_phone(''))
+
+    def test_save_fills_e164_and_keeps_it_on_other_saves(self):
+        customer = make_customer('(555) 010-2030')
+        self.assertEqual(customer.phone_e164, '+15550102030')
+
+        customer = Customer.objects.get(pk=customer.pk)
+        customer.name = 'Renamed'
+        customer.save()
+        customer.refresh_from_db()
+        self.assertEqual(customer.phone_e164, '+15550102030')
+
+    def test_filter_matches_any_format(self):
+        customer = make_customer('+1 555 010 2030')
+        response = self.client.get('/api/customers/customers/', {'phone': '555.010.2030'})
+        self.assertEqual([row['id'] for row in response.data['results']], [str(customer.pk)])
+
+    def test_duplicate_in_other_format_is_rejected(self):
+        make_customer('+15550102030')
+        response = self.client.post('/api/customers/customers/', {
+            'name': 'Twin', 'phone': '(555) 010-2030', 'birth_date': '1990-01-01',
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('phone', response.data)
+
+    def test_unchanged_legacy_phone_can_be_edited_around(self):
+        legacy = make_customer('ext. 12')
+        self.assertIsNone(legacy.phone_e164)
+        response = self.client.patch(f'/api/customers/customers/{legacy.pk}/',
+                                     {'name': 'Renamed', 'phone': 'ext. 12'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.client.patch(f'/api/customers/customers/{legacy.pk}/', {'phone': 'ext. 13'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_collided_customer_can_be_edited_and_is_listed(self):
+        owner = make_customer('+15550102030')
+        collided = make_customer('+1 555 010 2031')
+        # As left by the phone_e164 backfill for a number an older customer has
+        Customer.objects.filter(pk=collided.pk).update(phone='555-010-2030', phone_e164=None)
+
+        response = self.client.patch(f'/api/customers/customers/{collided.pk}/',
+                                     {'name': 'Renamed', 'phone': '555-010-2030'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        collided.refresh_from_db()
+        self.assertIsNone(collided.phone_e164)
+        self.assertEqual(list(phone_collisions()), [(collided.pk, owner.pk, '+15550102030')])
+
+
+class ImportTests(TestCase):
+    """Imports stream rows in chunks and report every rejected row"""
+
+    def run_import(self, content, file_format='csv', **options):
+        importer = CustomerImporter(**options)
+        return importer, importer.run(iter_rows(io.BytesIO(content.encode()), file_format))
+
+    def test_csv_with_profiles_and_rejected_rows(self):
+        make_customer('+15550401000')
+        _, report = self.run_import(
+            'name,phone,birth_date,email,city,is_vip\n'
+            'Ada,+15550401001,1990-02-03,ada@example.com,Paris,yes\n'
+            'Bob,+15550401002,1985-12-31,,,\n'
+            'Again,(555) 040-1001,1990-01-01,,,\n'
+            'Taken,+15550401000,1990-01-01,,,\n'
+            ',+15550401003,1990-13-01,not-an-email,,\n',
+            chunk_size=2, with_profiles=True,
+        )
+        self.assertEqual({key: report[key] for key in ('rows', 'created', 'profiles_created', 'duplicates', 'invalid')},
+                         {'rows': 5, 'created': 2, 'profiles_created': 1, 'duplicates': 2, 'invalid': 1})
+        self.assertEqual([error['row'] for error in report['errors']], [4, 6, 5])
+        self.assertEqual(set(report['errors'][1]['errors']), {'name', 'birth_date', 'email'})
+
+        ada = Customer.objects.get(phone='+15550401001')
+        self.assertEqual((ada.phone_e164, ada.birth_month_day), ('+15550401001', 203))
+        self.assertTrue(CustomerProfile.objects.get(customer=ada).is_vip)
+        self.assertEqual(search_customers('ada'), [ada])
+
+    def test_ndjson_and_dry_run(self):
+        _, report = self.run_import(
+            '{"name": "Ada", "phone": "+15550402001", "birth_date": "1990-02-03"}\n'
+            '\n'
+            '[1, 2]\n',
+            file_format='ndjson', dry_run=True,
+        )
+        self.assertEqual((report['created'], report['invalid']), (1, 1))
+        self.assertEqual(report['errors'][0]['row'], 3)
+        self.assertFalse(Customer.objects.exists())
+
+    def test_phone_taken_during_the_import_fails_only_its_row(self):
+        importer = CustomerImporter(chunk_size=10)
+        insert = importer.insert
+
+        def racing_insert(entries):
+            if len(entries) > 1:
+                # Another writer takes a phone after the duplicate check
+                make_customer('+15550403002')
+            insert(entries)
+
+        importer.insert = racing_insert
+        report = importer.run(iter_rows(io.BytesIO(
+            b'name,phone,birth_date\n'
+            b'Ada,+15550403001,1990-01-01\n'
+            b'Bob,+15550403002,1990-01-01\n'
+            b'Cy,+15550403003,1990-01-01\n'
+        ), 'csv'))
+        self.assertEqual((report['created'], report['duplicates']), (2, 1))
+        self.assertEqual(report['errors'][0]['row'], 3)
+        self.assertEqual(Customer.objects.count(), 3)
+
+    def test_bad_bytes_stop_the_import_after_the_good_rows(self):
+        rows = ''.join(f'Guest {index},+1555041{index:04d},1990-01-01\n' for index in range(400))
+        content = b'name,phone,birth_date\n' + rows.encode() + b'Bad,\xff\xfe,1990-01-01\n'
+        importer = CustomerImporter(chunk_size=50)
+        with self.assertRaises(FileDecodeError):
+            importer.run(iter_rows(io.BytesIO(content), 'csv'))
+        self.assertEqual(Customer.objects.count(), importer.stats['created'])
+        self.assertGreater(importer.stats['created'], 0)
+
+        Customer.objects.all().delete()
+        response = APIClient().post('/api/customers/customers/bulk_import/', {
+            'file': SimpleUploadedFile('guests.csv', content), 'chunk_size': '50',
+        })
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('after row', response.data['error'])
+        self.assertEqual(response.data['created'], Customer.objects.count())
+
+    def test_import_endpoint(self):
+        response = APIClient().post('/api/customers/customers/bulk_import/', {
+            'file': SimpleUploadedFile('guests.ndjson', b'{"name": "Ada", "phone": "+15550405001", '
+                                                         b'"birth_date": "1990-02-03"}\n'),
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['created'], 1)
+
+        response = APIClient().post('/api/customers/customers/bulk_import/', {
+            'file': SimpleUploadedFile('guests.txt', b''), 'file_format': 'xml',
+        })
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ExportTests(TestCase):
+    """Exports stream every customer with profile and special dates"""
+
+    def setUp(self):
+        from events.models import SpecialDate
+
+        self.client = APIClient()
+        self.customers = [make_customer(f'+1555050{index:04d}', name=f'Guest {index}') for index in range(5)]
+        CustomerProfile.objects.create(customer=self.customers[1], city='Lyon', is_vip=True)
+        for customer in self.customers[::2]:
+            SpecialDate.objects.create(customer=customer, special_date_type='Birthday', date=customer.birth_date)
+        SpecialDate.objects.create(customer=self.customers[2], special_date_type='Anniversary', date=date(2015, 6, 1))
+
+    def content(self, response):
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content)
+
+    def test_csv(self):
+        response = self.client.get('/api/customers/customers/export/')
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        rows = list(csv.DictReader(io.StringIO(self.content(response).decode())))
+        self.assertEqual(len(rows), 5)
+        by_id = {row['id']: row for row in rows}
+        self.assertEqual(by_id[str(self.customers[2].pk)]['special_dates'],
+                         'Birthday:1990-01-01;Anniversary:2015-06-01')
+        self.assertEqual(by_id[str(self.customers[1].pk)]['special_dates'], '')
+        self.assertEqual(by_id[str(self.customers[1].pk)]['city'], 'Lyon')
+
+    def test_gzipped_ndjson(self):
+        response = self.client.get('/api/customers/customers/export/', {'output': 'ndjson', 'gzip': 'true'})
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertTrue(response['Content-Disposition'].endswith('.ndjson.gz"'))
+        rows = [json.loads(line) for line in gzip.decompress(self.content(response)).splitlines()]
+        by_id = {row['id']: row for row in rows}
+        self.assertEqual(by_id[str(self.customers[1].pk)]['profile']['is_vip'], True)
+        self.assertIsNone(by_id[str(self.customers[0].pk)]['profile'])
+        self.assertEqual(len(by_id[str(self.customers[4].pk)]['special_dates']), 1)
+
+    def test_unknown_output(self):
+        response = self.client.get('/api/customers/customers/export/', {'output': 'xml'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class Customer360Tests(TestCase):
+    """The 360 view costs the same queries however much history there is"""
+
+    def setUp(self):
+        from events.models import EventBooking, SpecialDate
+        from events.reservations import reserve
+        from events.tests import make_event
+        from offers.models import OfferUsage
+        from offers.tests import make_offer
+        from spin_wheel.models import GameSession, Prize, SpinWheelGame
+
+        self.client = APIClient()
+        self.customer = make_customer('+15550601000')
+        CustomerProfile.objects.create(customer=self.customer, city='Lyon')
+        GameSession.objects.create(customer=self.customer, has_played=True, first_play_date=timezone.now())
+        prize = Prize.objects.create(name='Dessert', description='A free dessert')
+        for index in range(3):
+            SpecialDate.objects.create(customer=self.customer, special_date_type='Other', date=date(2020, 1, index + 1))
+            reserve(make_event(capacity=10), self.customer.pk, 2)
+            OfferUsage.objects.create(offer=make_offer(), customer=self.customer, discount_applied=Decimal('10.00'))
+            SpinWheelGame.objects.create(customer=self.customer, prize_won=prize, is_claimed=index == 0)
+        EventBooking.objects.filter(pk=EventBooking.objects.first().pk).update(status='Cancelled')
+
+    def test_query_count_and_summary(self):
+        with self.assertNumQueries(5):
+            response = self.client.get(f'/api/customers/customers/{self.customer.pk}/customer_360/', {'limit': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['bookings']), 2)
+        self.assertEqual(response.data['game_status']['has_played'], True)
+        self.assertEqual(response.data['summary'], {
+            'special_dates': 3,
+            'bookings': 3,
+            'cancelled_bookings': 1,
+            'guests_booked': 4,
+            'total_spent': '200.00',
+            'offers_used': 3,
+            'total_discount': '30.00',
+            'spin_games': 3,
+            'unclaimed_prizes': 2,
+        })
+
+    def test_unknown_or_malformed_customer(self):
+        for pk in (uuid.uuid4(), 'not-a-uuid'):
+            response = self.client.get(f'/api/customers/customers/{pk}/customer_360/')
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class PreferenceMergeTests(TestCase):
+    """Preference patches are merged by the UPDATE, keeping other keys"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.vip = CustomerProfile.objects.create(
+            customer=make_customer('+15550801000'), city='Lyon', is_vip=True,
+            preferences={'room': 'sea view', 'diet': {'vegan': True}},
+        )
+        self.guest = CustomerProfile.objects.create(customer=make_customer('+15550802000'), city='Paris')
+
+    def test_merge_is_shallow_and_keeps_types(self):
+        with self.assertNumQueries(1):
+            merge_preferences(CustomerProfile.objects.filter(pk=self.vip.pk),
+                              {'diet': {'gluten': False}, 'pillows': 2, 'late_checkout': None})
+        self.vip.refresh_from_db()
+        self.assertEqual(self.vip.preferences,
+                         {'room': 'sea view', 'diet': {'gluten': False}, 'pillows': 2, 'late_checkout': None})
+
+    def test_merge_into_empty_preferences(self):
+        merge_preferences(CustomerProfile.objects.filter(pk=self.guest.pk), {'room': 'quiet'})
+        self.guest.refresh_from_db()
+        self.assertEqual(self.guest.preferences, {'room': 'quiet'})
+
+    def test_key_with_a_double_quote_is_rejected(self):
+        with self.assertRaises(ValueError):
+            merge_preferences(CustomerProfile.objects.all(), {'say "hi"': 1})
+
+    def test_postgresql_concatenates_jsonb(self):
+        class Compiler:
+            def compile(self, expression):
+                return '"preferences"', ()
+
+        sql, params = JSONMerge(F('preferences'), {'room': 'quiet'}).as_postgresql(Compiler(), None)
+        self.assertEqual(sql, "(COALESCE(\"preferences\", '{}'::jsonb) || %s::jsonb)")
+        self.assertEqual(params, ('{"room": "quiet"}',))
+
+    def test_update_preferences_endpoint(self):
+        response = self.client.patch(f'/api/customers/profiles/{self.vip.pk}/update_preferences/',
+                                     {'preferences': {'room': 'garden'}}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['preferences'], {'room': 'garden', 'diet': {'vegan': True}})
+
+        response = self.client.patch('/api/customers/profiles/999999/update_preferences/',
+                                     {'preferences': {'room': 'garden'}}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_bulk_update_by_filters(self):
+        response = self.client.patch('/api/customers/profiles/bulk_update_preferences/',
+                                     {'preferences': {'welcome_gift': True}, 'filters': {'city': 'lyon'}}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.vip.refresh_from_db()
+        self.guest.refresh_from_db()
+        self.assertTrue(self.vip.preferences['welcome_gift'])
+        self.assertNotIn('welcome_gift', self.guest.preferences)
+
+        for filters in ({}, {'floor': 3}, {'all': True, 'city': 'Lyon'}, {'ids': ['x']}):
+            response = self.client.patch('/api/customers/profiles/bulk_update_preferences/',
+                                         {'preferences': {'a': 1}, 'filters': filters}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class SearchTests(TestCase):
+    """The trigram index finds names in any script, accents folded"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.jose = make_customer('+15550301000', name='José Álvarez', email='jose.alvarez@example.com')
+        self.ivan = make_customer('+15550302000', name='Иван Петров')
+        self.grete = make_customer('+15550303000', name='GRETE STRAßE')
+
+    def test_text_grams(self):
+        self.assertEqual(text_grams('José'), {' jo', 'jos', 'ose'})
+        self.assertEqual(text_grams('Иван', padded=False), {'ива', 'ван'})
+        self.assertEqual(text_grams('mc_ivan', padded=False), {'iva', 'van'})
+        self.assertEqual(text_grams('ab', padded=False), set())
+
+    def test_search_finds_any_script_and_folds_case(self):
+        self.assertEqual(search_customers('Петров'), [self.ivan])
+        self.assertEqual(search_customers('jose'), [self.jose])
+        self.assertEqual(search_customers('strasse'), [self.grete])
+        self.assertEqual(search_customers('+1 555 030 2000')[0], self.ivan)
+
+    def test_name_filter_uses_the_index(self):
+        # icontains still checks the candidates, and SQLite only folds ASCII case
+        response = self.client.get('/api/customers/customers/', {'name': 'Иван'})
+        self.assertEqual([row['id'] for row in response.data['results']], [str(self.ivan.pk)])
+
+    def test_rebuild_index(self):
+        self.assertEqual(rebuild_index(chunk_size=2), 3)
+        self.assertEqual(search_customers('Петров'), [self.ivan])
+
+    def test_name_key_keeps_non_latin_words(self):
+        self.assertEqual(name_key('Smith John'), name_key('Jon Smyth'))
+        self.assertEqual(name_key('Петров Иван'), name_key('Иван Петров'))
+        self.assertNotEqual(name_key('Иван Петров'), name_key('Игорь Петров'))
+
+
+class KeysetPaginationTests(TestCase):
+    """Cursor pages walk the whole list once, ties included"""
+
+    def setUp(self):
+        self.client = APIClient()
+        created_at = timezone.now()
+        self.customers = [make_customer(f'+1555020{index:04d}') for index in range(7)]
+        # The last four rows share a timestamp so the id has to break the tie
+        for index, customer in enumerate(self.customers):
+            Customer.objects.filter(pk=customer.pk).update(created_at=created_at - timedelta(minutes=min(index, 3)))
+
+    def test_cursor_round_trip(self):
+        customer = Customer.objects.get(pk=self.customers[0].pk)
+        token = encode_cursor(customer.created_at, customer.pk)
+        self.assertEqual(decode_cursor(token, Customer.objects.all(), '-created_at'), (customer.created_at, customer.pk))
+
+    def test_invalid_cursor_is_not_found(self):
+        with self.assertRaises(NotFound):
+            decode_cursor('not-a-cursor', Customer.objects.all(), '-created_at')
+        response = self.client.get('/api/customers/customers/', {'cursor': 'bm9wZQ'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_pages_cover_every_row_once(self):
+        seen = []
+        cursor = None
+        while True:
+            rows, cursor = keyset_page(Customer.objects.all(), '-created_at', 2, cursor)
+            seen.extend(row.pk for row in rows)
+            if cursor is None:
+                break
+        expected = list(Customer.objects.order_by('-created_at', '-pk').values_list('pk', flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_api_cursor_mode_follows_next(self):
+        response = self.client.get('/api/customers/customers/', {'pagination': 'cursor', 'page_size': 3})
+        seen = [row['id'] for row in response.data['results']]
+        self.assertEqual(len(seen), 3)
+        while response.data['next']:
+            response = self.client.get(response.data['next'])
+            seen.extend(row['id'] for row in response.data['results'])
+        self.assertEqual(sorted(seen), sorted(str(customer.pk) for customer in self.customers))
+
+    def test_page_number_mode_ignores_page_size(self):
+        response = self.client.get('/api/customers/customers/', {'page_size': 2})
+        self.assertEqual(len(response.data['results']), 7)
+        self.assertEqual(response.data['count'], 7)
+
+
+class DuplicateTests(TestCase):
+    """Duplicates are found within blocks, served from the cache and merged"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.first = make_customer('+15550103040', name='Anna Smith', email='anna@example.com')
+        self.second = make_customer('+445550103040', name='Anna  Smith', email='anna@example.org')
+        self.other = make_customer('+15550109999', name='Boris Petrov', email='boris@example.com',
+                                   birth_date=date(1980, 5, 5))
+
+    def test_find_duplicates_pairs_matching_customers(self):
+        candidates = find_duplicates()
+        self.assertEqual(len(candidates), 1)
+        self.assertEqual(candidates[0]['customer_ids'], (self.first.pk, self.second.pk))
+        self.assertEqual(set(candidates[0]['reasons']), {'name', 'phone', 'birth_date'})
+        self.assertEqual(find_duplicates(threshold=0.99), [])
+
+    def test_endpoint_is_paginated_and_served_from_the_cache(self):
+        response = self.client.get('/api/customers/customers/duplicates/', {'page_size': 1})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 1)
+        self.assertEqual([row['id'] for row in response.data['results'][0]['customers']],
+                         [str(self.first.pk), str(self.second.pk)])
+
+        make_customer('+15550209999', name='Boris Petrov', email='boris@example.com', birth_date=date(1980, 5, 5))
+        response = self.client.get('/api/customers/customers/duplicates/')
+        self.assertEqual(response.data['count'], 1)
+
+        call_command('find_duplicate_customers', stdout=StringIO(), stderr=StringIO())
+        response = self.client.get('/api/customers/customers/duplicates/')
+        self.assertEqual(response.data['count'], 2)
+
+    def test_invalid_threshold(self):
+        response = self.client.get('/api/customers/customers/duplicates/', {'threshold': 'high'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_merge_moves_related_rows_and_gives_uses_back(self):
+        from events.models import SpecialDate
+        from offers.models import Offer, OfferUsage
+
+        today = timezone.localdate()
+        offer = Offer.objects.create(
+            title='Ten off', description='Ten off any booking', offer_type='fixed',
+            discount_value=Decimal('10.00'), valid_from=today, valid_to=today,
+            max_usage=2, current_usage=2, status='exhausted',
+        )
+        for customer in (self.first, self.second):
+            OfferUsage.objects.create(offer=offer, customer=customer, discount_applied=Decimal('10.00'))
+        SpecialDate.objects.create(customer=self.second, special_date_type='Anniversary', date=date(2015, 6, 1))
+        self.assertEqual(len(cached_duplicates()), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            summary = merge_customers(self.first.pk, [self.second.pk])
+
+        self.assertEqual(summary['merged'], 1)
+        self.assertEqual(summary['offer_usages_dropped'], 1)
+        self.assertEqual(summary['special_dates'], 1)
+        self.assertFalse(Customer.objects.filter(pk=self.second.pk).exists())
+        self.assertEqual(OfferUsage.objects.get().customer_id, self.first.pk)
+        offer.refresh_from_db()
+        self.assertEqual((offer.current_usage, offer.status), (1, 'active'))
+        self.assertEqual(cached_duplicates(), [])
+
+    def test_merge_unknown_customer(self):
+        response = self.client.post(f'/api/customers/customers/{uuid.uuid4()}/merge/',
+                                    {'duplicate_ids': [str(self.second.pk)]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
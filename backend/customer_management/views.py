@@ -2,9 +2,24 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework.pagination import PageNumberPagination
 from django.shortcuts import get_object_or_404
+from django.http import StreamingHttpResponse
+from django.utils import timezone
 from django.db import models
+from django.core.exceptions import ValidationError
+import uuid
+from hotel_backend.mixins import SparseFieldsetMixin
+from hotel_backend.pagination import OptionalKeysetPagination
 from .models import Customer, CustomerProfile
+from .duplicates import DEFAULT_THRESHOLD, cached_duplicates, merge_customers
+from .exporters import FORMATS as EXPORT_FORMATS, export_customers
+from .overview import DEFAULT_SECTION_LIMIT, MAX_SECTION_LIMIT, build_customer_360
+from .importer import FORMATS, CustomerImporter, FileDecodeError, detect_format, iter_rows
+from .phone import normalize_phone
+from .preferences import merge_preferences, merge_profile_preferences
+from .search import DEFAULT_LIMIT, matching_customer_ids, search_customers
 from .serializers import (
     CustomerSerializer, 
     CustomerDetailSerializer, 
@@ -12,11 +27,23 @@ from .serializers import (
     CustomerProfileSerializer
 )
 
-class CustomerViewSet(viewsets.ModelViewSet):
+# Filters accepted by CustomerProfileViewSet.bulk_update_preferences (besides {"all": true})
+BULK_PREFERENCE_FILTERS = {'ids', 'customer_ids', 'is_vip', 'city', 'country'}
+
+class DuplicatePagination(PageNumberPagination):
+    """Pages of duplicate candidates, up to 1000 per page"""
+    
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+class CustomerViewSet(SparseFieldsetMixin, viewsets.ModelViewSet):
     """ViewSet for Customer model"""
     
     queryset = Customer.objects.all()
     permission_classes = [AllowAny]  # Temporarily allow unauthenticated access for development
+    pagination_class = OptionalKeysetPagination
+    keyset_ordering = '-created_at'
     
     def get_serializer_class(self):
         if self.action == 'create':
@@ -29,39 +56,142 @@ class CustomerViewSet(viewsets.ModelViewSet):
         """Filter customers based on query parameters"""
         queryset = Customer.objects.all()
         
-        # Filter by name
-        name = self.request.query_params.get('name', None)
-        if name:
-            queryset = queryset.filter(name__icontains=name)
-        
-        # Filter by phone
-        phone = self.request.query_params.get('phone', None)
-        if phone:
-            queryset = queryset.filter(phone__icontains=phone)
-        
-        # Filter by email
-        email = self.request.query_params.get('email', None)
-        if email:
-            queryset = queryset.filter(email__icontains=email)
+        # Filter by name, phone and email. The trigram index narrows the
+        # candidates first so icontains only runs on rows that can match,
+        # and a complete phone number also matches the normalized column.
+        for field in ('name', 'phone', 'email'):
+            value = self.request.query_params.get(field, None)
+            if not value:
+                continue
+            lookup = models.Q(**{f'{field}__icontains': value})
+            candidates = matching_customer_ids(field, value)
+            if candidates is not None:
+                lookup &= models.Q(id__in=candidates)
+            if field == 'phone' and normalize_phone(value):
+                lookup |= models.Q(phone_e164=normalize_phone(value))
+            queryset = queryset.filter(lookup)
         
         return queryset
     
     @action(detail=False, methods=['get'])
     def search(self, request):
-        """Search customers by various criteria"""
+        """Search customers by name, phone or email, best matches first"""
         query = request.query_params.get('q', '')
         if not query:
             return Response({'error': 'Query parameter is required'}, status=status.HTTP_400_BAD_REQUEST)
         
-        customers = Customer.objects.filter(
-            models.Q(name__icontains=query) |
-            models.Q(phone__icontains=query) |
-            models.Q(email__icontains=query)
-        )
+        try:
+            limit = int(request.query_params.get('limit', DEFAULT_LIMIT))
+        except ValueError:
+            return Response({'error': 'Limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        customers = search_customers(query, limit=limit)
         
         serializer = self.get_serializer(customers, many=True)
         return Response(serializer.data)
     
+    @action(detail=False, methods=['post'], parser_classes=[MultiPartParser, FormParser])
+    def bulk_import(self, request):
+        """Import customers from an uploaded CSV or NDJSON file"""
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'error': 'A CSV or NDJSON file is required'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        file_format = request.data.get('file_format') or detect_format(upload.name)
+        if file_format not in FORMATS:
+            return Response({'error': f'File format must be one of: {", ".join(FORMATS)}'},
+                           status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            chunk_size = int(request.data.get('chunk_size', 1000))
+        except ValueError:
+            return Response({'error': 'Chunk size must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        importer = CustomerImporter(
+            chunk_size=min(chunk_size, 5000),
+            with_profiles=str(request.data.get('with_profiles', '')).lower() == 'true',
+            dry_run=str(request.data.get('dry_run', '')).lower() == 'true',
+        )
+        try:
+            report = importer.run(iter_rows(upload.file, file_format))
+        except FileDecodeError as e:
+            # Rows before the bad bytes are already saved
+            return Response({'error': str(e), 'created': importer.stats['created']}, 
+                           status=status.HTTP_400_BAD_REQUEST)
+        return Response(report)
+    
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """Stream every customer with profile and special dates as CSV or NDJSON"""
+        output = request.query_params.get('output', 'csv')
+        if output not in EXPORT_FORMATS:
+            return Response({'error': f'Output must be one of: {", ".join(EXPORT_FORMATS)}'},
+                           status=status.HTTP_400_BAD_REQUEST)
+        compress = request.query_params.get('gzip', '').lower() == 'true'
+        
+        content_type, extension = EXPORT_FORMATS[output]
+        filename = f'customers-{timezone.now():%Y%m%d}.{extension}'
+        if compress:
+            content_type = 'application/gzip'
+            filename += '.gz'
+        
+        response = StreamingHttpResponse(export_customers(output, compress=compress), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+    
+    @action(detail=True, methods=['get'])
+    def customer_360(self, request, pk=None):
+        """Customer with profile, history and summary totals in a fixed number of queries"""
+        try:
+            limit = int(request.query_params.get('limit', DEFAULT_SECTION_LIMIT))
+        except ValueError:
+            return Response({'error': 'Limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response(build_customer_360(pk, limit=max(0, min(limit, MAX_SECTION_LIMIT))))
+    
+    @action(detail=False, methods=['get'])
+    def duplicates(self, request):
+        """Likely duplicate customers, scored within shared phone, email and name blocks"""
+        try:
+            threshold = float(request.query_params.get('threshold', DEFAULT_THRESHOLD))
+        except ValueError:
+            return Response({'error': 'Threshold must be a number'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        # Served from the cache between runs; only the page asked for is loaded
+        paginator = DuplicatePagination()
+        candidates = paginator.paginate_queryset(cached_duplicates(threshold), request, view=self)
+        ids = {pk for candidate in candidates for pk in candidate['customer_ids']}
+        customers = {customer.pk: customer for customer in Customer.objects.filter(pk__in=ids)}
+        
+        return paginator.get_paginated_response([
+            {
+                'score': candidate['score'],
+                'reasons': candidate['reasons'],
+                'customers': CustomerSerializer(
+                    [customers[pk] for pk in candidate['customer_ids'] if pk in customers], many=True
+                ).data,
+            }
+            for candidate in candidates
+        ])
+    
+    @action(detail=True, methods=['post'])
+    def merge(self, request, pk=None):
+        """Merge duplicate customers into this one and delete them"""
+        duplicate_ids = request.data.get('duplicate_ids')
+        if not isinstance(duplicate_ids, list) or not duplicate_ids:
+            return Response({'error': 'duplicate_ids must be a non-empty list'},
+                           status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            duplicate_ids = [uuid.UUID(str(value)) for value in duplicate_ids]
+            summary = merge_customers(uuid.UUID(str(pk)), duplicate_ids)
+        except ValueError:
+            return Response({'error': 'Customer ids must be UUIDs'}, status=status.HTTP_400_BAD_REQUEST)
+        except Customer.DoesNotExist:
+            return Response({'error': 'Customer not found'}, status=status.HTTP_404_NOT_FOUND)
+        
+        return Response(summary)
+    
     @action(detail=True, methods=['get'])
     def special_dates(self, request, pk=None):
         """Get special dates for a customer"""
@@ -89,7 +219,7 @@ class CustomerViewSet(viewsets.ModelViewSet):
                 'first_play_date': None
             })
 
-class CustomerProfileViewSet(viewsets.ModelViewSet):
+class CustomerProfileViewSet(SparseFieldsetMixin, viewsets.ModelViewSet):
     """ViewSet for CustomerProfile model"""
     
     queryset = CustomerProfile.objects.all()
@@ -98,14 +228,76 @@ class CustomerProfileViewSet(viewsets.ModelViewSet):
     
     @action(detail=True, methods=['patch'])
     def update_preferences(self, request, pk=None):
-        """Update customer preferences"""
-        profile = self.get_object()
+        """Merge keys into customer preferences without rewriting the profile"""
         preferences = request.data.get('preferences', {})
+        if not isinstance(preferences, dict):
+            return Response({'error': 'Preferences must be a valid JSON object'}, 
+                           status=status.HTTP_400_BAD_REQUEST)
         
-        if isinstance(preferences, dict):
-            profile.preferences.update(preferences)
-            profile.save()
-            return Response({'message': 'Preferences updated successfully'})
+        try:
+            pk = int(pk)
+        except ValueError:
+            return Response({'error': 'Customer profile not found'}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            merged = merge_profile_preferences(pk, preferences)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if merged is None:
+            return Response({'error': 'Customer profile not found'}, status=status.HTTP_404_NOT_FOUND)
+        
+        return Response({
+            'message': 'Preferences updated successfully',
+            'preferences': merged
+        })
+    
+    @action(detail=False, methods=['patch'])
+    def bulk_update_preferences(self, request):
+        """
+        Merge one preferences patch into many profiles with a single UPDATE.
+        
+        ``filters`` selects the profiles by ``ids``, ``customer_ids``,
+        ``is_vip``, ``city`` and/or ``country``; ``{"all": true}`` targets
+        every profile.
+        """
+        preferences = request.data.get('preferences', {})
+        filters = request.data.get('filters') or {}
+        if not isinstance(preferences, dict):
+            return Response({'error': 'Preferences must be a valid JSON object'}, 
+                           status=status.HTTP_400_BAD_REQUEST)
+        if not isinstance(filters, dict) or not filters:
+            return Response({'error': 'filters is required; use {"all": true} to update every profile'}, 
+                           status=status.HTTP_400_BAD_REQUEST)
+        unknown = set(filters) - BULK_PREFERENCE_FILTERS - {'all'}
+        if unknown:
+            return Response({'error': f"Unknown filters: {', '.join(sorted(unknown))}"}, 
+                           status=status.HTTP_400_BAD_REQUEST)
+        # Only the exact {"all": true} selects every profile
+        if 'all' in filters and filters != {'all': True}:
+            return Response({'error': '"all" must be true and cannot be combined with other filters'}, 
+                           status=status.HTTP_400_BAD_REQUEST)
+        
+        profiles = CustomerProfile.objects.all()
+        try:
+            if 'ids' in filters:
+                profiles = profiles.filter(id__in=[int(value) for value in filters['ids']])
+            if 'customer_ids' in filters:
+                profiles = profiles.filter(customer_id__in=filters['customer_ids'])
+            if 'is_vip' in filters:
+                profiles = profiles.filter(is_vip=str(filters['is_vip']).lower() in ('1', 'true'))
+            for field in ('city', 'country'):
+                if field in filters:
+                    profiles = profiles.filter(**{f'{field}__iexact': filters[field]})
+            # Evaluate the filters now so bad values are reported as such
+            profiles.exists()
+        except (TypeError, ValueError, ValidationError):
+            return Response({'error': 'Invalid filters'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            updated = merge_preferences(profiles, preferences)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         
-        return Response({'error': 'Preferences must be a valid JSON object'}, 
-                       status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+        return Response({
+            'message': 'Preferences updated successfully',
+            'updated': updated
+        })
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import SpecialDate, Event, EventBooking
+from .models import SpecialDate, Event, EventBooking, EventSeries, WaitlistEntry
 
 @admin.register(SpecialDate)
 class SpecialDateAdmin(admin.ModelAdmin):
@@ -17,10 +17,26 @@ class EventAdmin(admin.ModelAdmin):
     readonly_fields = ['id', 'current_bookings', 'created_at', 'updated_at']
     ordering = ['-start_date']
 
+@admin.register(EventSeries)
+class EventSeriesAdmin(admin.ModelAdmin):
+    list_display = ['title', 'event_type', 'frequency', 'interval', 'starts_at', 'until', 'is_active']
+    list_filter = ['event_type', 'frequency', 'is_active']
+    search_fields = ['title', 'description']
+    readonly_fields = ['id', 'created_at', 'updated_at']
+    ordering = ['title']
+
 @admin.register(EventBooking)
 class EventBookingAdmin(admin.ModelAdmin):
     list_display = ['customer', 'event', 'booking_date', 'number_of_guests', 'status']
     list_filter = ['status', 'booking_date', 'event__event_type']
     search_fields = ['customer__name', 'event__title']
     readonly_fields = ['id', 'booking_date']
-    ordering = ['-booking_date']
\ No newline at end of file
+    ordering = ['-booking_date']
+
+@admin.register(WaitlistEntry)
+class WaitlistEntryAdmin(admin.ModelAdmin):
+    list_display = ['customer', 'event', 'number_of_guests', 'status', 'created_at', 'promoted_at']
+    list_filter = ['status', 'created_at']
+    search_fields = ['customer__name', 'event__title']
+    readonly_fields = ['id', 'booking', 'created_at', 'promoted_at']
+    ordering = ['created_at']
\ No newline at end of file
@@ -0,0 +1,149 @@
+"""
+Recurring anniversary calendar.
+
+Birthdays and anniversaries recur every year, so matching on the stored
+date (which includes the birth or wedding year) never finds them. Every
+SpecialDate and Customer stores ``month * 100 + day`` of its date in an
+indexed ``month_day`` column instead, and a window of calendar days turns
+into one or two ``month_day`` ranges: one when the window stays inside a
+year, two when it wraps past December 31st. Each range is an index range
+scan already in calendar order, so results can be limited in the database.
+
+People born on February 29th celebrate on February 28th in common years.
+"""
+import calendar
+from datetime import date, timedelta
+
+MAX_WINDOW_DAYS = 366
+
+FEB_28 = 228
+FEB_29 = 229
+
+
+def month_day(value):
+    """Ordinal stored in the month_day columns, e.g. June 12th is 612"""
+    return value.month * 100 + value.day
+
+
+def occurrence_in_year(original, year):
+    """Date on which ``original`` is celebrated in ``year``"""
+    if original.month == 2 and original.day == 29 and not calendar.isleap(year):
+        return date(year, 2, 28)
+    return original.replace(year=year)
+
+
+def next_occurrence(original, today):
+    """First celebration of ``original`` on or after ``today``"""
+    occurrence = occurrence_in_year(original, today.year)
+    if occurrence < today:
+        occurrence = occurrence_in_year(original, today.year + 1)
+    return occurrence
+
+
+def window_ranges(start, days):
+    """
+    ``month_day`` ranges (inclusive, in calendar order) for ``days`` days from ``start``.
+
+    A window of 365 days or more covers every day, still starting at
+    ``start``. When the window contains February 28th of a common year, a
+    (229, 229) range is slotted right after it so leap day celebrations
+    are not lost.
+    """
+    days = max(1, min(days, MAX_WINDOW_DAYS))
+    if days >= 365:
+        first = month_day(start)
+        if first == 101:
+            return [(101, 1231)]
+        return [(first, 1231), (101, first - 1)]
+
+    end = start + timedelta(days=days - 1)
+    if end.year == start.year:
+        ranges = [(start.year, month_day(start), month_day(end))]
+    else:
+        ranges = [(start.year, month_day(start), 1231), (end.year, 101, month_day(end))]
+
+    result = []
+    for year, lo, hi in ranges:
+        result.append((lo, hi))
+        if not calendar.isleap(year) and lo <= FEB_28 <= hi < FEB_29:
+            result.append((FEB_29, FEB_29))
+    return result
+
+
+def month_ranges(year, month):
+    """``month_day`` ranges covering a calendar month"""
+    return window_ranges(date(year, month, 1), calendar.monthrange(year, month)[1])
+
+
+def _in_order(queryset, field, ranges, limit):
+    rows = []
+    for lo, hi in ranges:
+        if limit is not None and len(rows) >= limit:
+            break
+        page = queryset.filter(**{f'{field}__range': (lo, hi)}).order_by(field, 'pk')
+        rows.extend(page if limit is None else page[:limit - len(rows)])
+    return rows
+
+
+def special_dates_in(ranges, queryset=None, limit=None):
+    """SpecialDates whose anniversary falls in ``ranges``, in calendar order"""
+    from .models import SpecialDate
+
+    if queryset is None:
+        queryset = SpecialDate.objects.all()
+    return _in_order(queryset.select_related('customer'), 'month_day', ranges, limit)
+
+
+def celebrations(start, days, limit=None, date_type=None):
+    """
+    Celebrations for ``days`` days from ``start``, ordered by date.
+
+    Combines special dates with customers' own ``birth_date``; a birthday
+    already recorded as a Birthday special date is reported once.
+    """
+    from customer_management.models import Customer
+    from .models import SpecialDate
+
+    ranges = window_ranges(start, days)
+    entries = []
+
+    special_dates = SpecialDate.objects.all()
+    if date_type:
+        special_dates = special_dates.filter(special_date_type=date_type)
+    birthdays = set()
+    for special_date in special_dates_in(ranges, special_dates, limit):
+        occurs_on = next_occurrence(special_date.date, start)
+        if special_date.special_date_type == 'Birthday':
+            birthdays.add((special_date.customer_id, occurs_on))
+        entries.append({
+            'source': 'special_date',
+            'id': special_date.id,
+            'customer_id': special_date.customer_id,
+            'customer_name': special_date.customer.name,
+            'customer_phone': special_date.customer.phone,
+            'special_date_type': special_date.special_date_type,
+            'date': special_date.date,
+            'occurs_on': occurs_on,
+            'years': occurs_on.year - special_date.date.year,
+        })
+
+    if date_type in (None, '', 'Birthday'):
+        customers = Customer.objects.only('id', 'name', 'phone', 'birth_date', 'birth_month_day')
+        for customer in _in_order(customers, 'birth_month_day', ranges, limit):
+            occurs_on = next_occurrence(customer.birth_date, start)
+            if (customer.id, occurs_on) in birthdays:
+                continue
+            entries.append({
+                'source': 'birth_date',
+                'id': customer.id,
+                'customer_id': customer.id,
+                'customer_name': customer.name,
+                'customer_phone': customer.phone,
+                'special_date_type': 'Birthday',
+                'date': customer.birth_date,
+                'occurs_on': occurs_on,
+                'years': occurs_on.year - customer.birth_date.year,
+            })
+
+    entries.sort(key=lambda entry: entry['occurs_on'])
+    return entries if limit is None else entries[:limit]
@@ -0,0 +1,116 @@
+import random
+import threading
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, connections
+from django.utils import timezone
+
+from customer_management.models import Customer
+from customer_management.phone import normalize_phone
+from customer_management.search import index_customers, phone_digits
+from events.models import Event, EventBooking
+from events.reservations import NotEnoughSpots, reserve
+
+
+class Command(BaseCommand):
+    help = 'Rush a temporary event with concurrent bookings and check it is never oversold'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=16,
+                            help='Number of concurrent booking clients (threads)')
+        parser.add_argument('--capacity', type=int, default=2000,
+                            help='Capacity of the benchmark event')
+        parser.add_argument('--guests', type=int, default=1,
+                            help='Guests per booking')
+        parser.add_argument('--duration', type=float, default=30.0,
+                            help='Stop after this many seconds even if the event has spots left')
+        parser.add_argument('--wal', action='store_true',
+                            help='Switch SQLite to WAL journal mode first (this persists in the database file)')
+        parser.add_argument('--keep', action='store_true',
+                            help='Keep the benchmark event, customers and bookings afterwards')
+
+    def handle(self, *args, **options):
+        if connection.vendor == 'sqlite' and options['wal']:
+            with connection.cursor() as cursor:
+                cursor.execute('PRAGMA journal_mode=WAL')
+                self.stdout.write(f'SQLite journal mode: {cursor.fetchone()[0]}')
+
+        now = timezone.now()
+        event = Event.objects.create(
+            title='Booking benchmark',
+            description='Temporary event created by benchmark_bookings',
+            event_type='Other',
+            start_date=now,
+            end_date=now + timedelta(hours=1),
+            capacity=options['capacity'],
+            price=10,
+        )
+        # Digit-only numbers with the derived columns Customer.save() would
+        # fill, indexed like imported customers
+        run = random.randrange(1000)
+        customers = []
+        for i in range(options['clients']):
+            phone = f'+1555{run:03d}{i:04d}'
+            customers.append(Customer(
+                name=f'Benchmark client {i}',
+                phone=phone,
+                phone_digits=phone_digits(phone),
+                phone_e164=normalize_phone(phone),
+                birth_date=now.date(),
+                birth_month_day=now.month * 100 + now.day,
+            ))
+        customers = Customer.objects.bulk_create(customers)
+        index_customers(customers, replace=False)
+
+        stats = {'booked': 0, 'sold_out': 0, 'errors': 0}
+        lock = threading.Lock()
+        deadline = time.monotonic() + options['duration']
+
+        def client(customer):
+            counts = {'booked': 0, 'sold_out': 0, 'errors': 0}
+            try:
+                while time.monotonic() < deadline:
+                    try:
+                        reserve(event, customer.pk, options['guests'])
+                        counts['booked'] += 1
+                    except NotEnoughSpots:
+                        counts['sold_out'] += 1
+                        break
+                    except OperationalError:
+                        counts['errors'] += 1
+            finally:
+                connections.close_all()
+                with lock:
+                    for key, value in counts.items():
+                        stats[key] += value
+
+        threads = [threading.Thread(target=client, args=(customer,)) for customer in customers]
+        started = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - started
+
+        event.refresh_from_db()
+        guests_booked = sum(EventBooking.objects.filter(event=event).values_list('number_of_guests', flat=True))
+        oversold = event.current_bookings > event.capacity or guests_booked != event.current_bookings
+
+        self.stdout.write(
+            f"{connection.vendor}: {options['clients']} clients, {stats['booked']} bookings in {elapsed:.2f}s "
+            f"({stats['booked'] / elapsed:.0f} bookings/s), {stats['errors']} database errors"
+        )
+        self.stdout.write(
+            f'capacity {event.capacity}, current_bookings {event.current_bookings}, '
+            f'guests in booking rows {guests_booked}'
+        )
+
+        if not options['keep']:
+            event.delete()
+            Customer.objects.filter(pk__in=[customer.pk for customer in customers]).delete()
+
+        if oversold:
+            raise CommandError('Event was oversold or its count drifted from the bookings')
+        self.stdout.write(self.style.SUCCESS('No overselling'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from events.schedule import rebuild_event_days
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the calendar day buckets of long events, e.g. after TIME_ZONE changed'
+
+    def handle(self, *args, **options):
+        events, days = rebuild_event_days()
+        self.stdout.write(f'Rebuilt {days} days for {events} long events')
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.14 on 2026-10-18 05:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer_management', '0005_keyset_pagination_indexes'),
+        ('events', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='eventbooking',
+            index=models.Index(fields=['-booking_date', '-id'], name='booking_date_id_idx'),
+        ),
+    ]
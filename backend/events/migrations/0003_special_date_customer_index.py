@@ -0,0 +1,18 @@
+# Generated by Django 5.0.14 on 2026-10-18 05:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer_management', '0005_keyset_pagination_indexes'),
+        ('events', '0002_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='specialdate',
+            index=models.Index(fields=['customer', 'date'], name='special_date_customer_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.0.14 on 2026-10-18 05:08
+
+from django.db import migrations, models
+from django.db.models.functions import ExtractDay, ExtractMonth
+
+
+def backfill_month_day(apps, schema_editor):
+    """Compute month * 100 + day for existing rows in a single UPDATE"""
+    SpecialDate = apps.get_model('events', 'SpecialDate')
+    SpecialDate.objects.update(month_day=ExtractMonth('date') * 100 + ExtractDay('date'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0003_special_date_customer_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='specialdate',
+            name='month_day',
+            field=models.PositiveSmallIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_month_day, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.14 on 2026-10-18 05:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer_management', '0007_customerprofile_updated_at'),
+        ('events', '0004_special_date_month_day'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='eventbooking',
+            index=models.Index(fields=['event', '-booking_date', '-id'], name='booking_event_date_id_idx'),
+        ),
+    ]
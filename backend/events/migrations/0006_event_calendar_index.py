@@ -0,0 +1,63 @@
+# Generated by Django 5.0.14 on 2026-10-18 05:18
+
+from datetime import timedelta
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils import timezone
+
+# Frozen copies of events.schedule as of this migration, so later changes
+# to the live calendar code do not change what it wrote
+_EPSILON = timedelta(microseconds=1)
+
+
+def is_long(start, end):
+    return end - start > timedelta(days=1)
+
+
+def covered_days(start, end):
+    first = timezone.localtime(start).date()
+    last = timezone.localtime(max(start, end - _EPSILON)).date()
+    return [first + timedelta(days=offset) for offset in range((last - first).days + 1)]
+
+
+def backfill_event_days(apps, schema_editor):
+    """Bucket existing long events by the days they cover"""
+    Event = apps.get_model('events', 'Event')
+    EventDay = apps.get_model('events', 'EventDay')
+    days = []
+    for pk, start, end in Event.objects.values_list('pk', 'start_date', 'end_date').iterator():
+        if is_long(start, end):
+            days.extend(EventDay(event_id=pk, day=day) for day in covered_days(start, end))
+    EventDay.objects.bulk_create(days, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0005_booking_event_date_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['start_date', 'end_date'], name='event_start_end_idx'),
+        ),
+        migrations.AddField(
+            model_name='eventday',
+            name='event',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='days', to='events.event'),
+        ),
+        migrations.AddConstraint(
+            model_name='eventday',
+            constraint=models.UniqueConstraint(fields=('day', 'event'), name='event_day_unique'),
+        ),
+        migrations.RunPython(backfill_event_days, migrations.RunPython.noop),
+    ]
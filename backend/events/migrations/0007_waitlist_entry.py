@@ -0,0 +1,36 @@
+# Generated by Django 5.0.14 on 2026-10-18 05:21
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer_management', '0007_customerprofile_updated_at'),
+        ('events', '0006_event_calendar_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WaitlistEntry',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('number_of_guests', models.PositiveIntegerField(default=1)),
+                ('status', models.CharField(choices=[('Waiting', 'Waiting'), ('Promoted', 'Promoted')], default='Waiting', max_length=20)),
+                ('notes', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('promoted_at', models.DateTimeField(blank=True, null=True)),
+                ('booking', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='waitlist_entry', to='events.eventbooking')),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='waitlist_entries', to='customer_management.customer')),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='waitlist', to='events.event')),
+            ],
+            options={
+                'verbose_name': 'Waitlist Entry',
+                'verbose_name_plural': 'Waitlist Entries',
+                'ordering': ['created_at', 'id'],
+                'indexes': [models.Index(fields=['event', 'status', 'created_at', 'id'], name='waitlist_queue_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.14 on 2026-10-18 05:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer_management', '0007_customerprofile_updated_at'),
+        ('events', '0007_waitlist_entry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='eventbooking',
+            name='cancelled_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='eventbooking',
+            index=models.Index(fields=['cancelled_at'], name='booking_cancelled_at_idx'),
+        ),
+    ]
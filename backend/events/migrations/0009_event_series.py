@@ -0,0 +1,55 @@
+# Generated by Django 5.0.14 on 2026-10-18 05:25
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0008_booking_cancelled_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventSeries',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('title', models.CharField(max_length=200)),
+                ('description', models.TextField()),
+                ('event_type', models.CharField(choices=[('Restaurant', 'Restaurant'), ('Bar', 'Bar'), ('Conference', 'Conference'), ('Wedding', 'Wedding'), ('Party', 'Party'), ('Other', 'Other')], max_length=20)),
+                ('starts_at', models.DateTimeField()),
+                ('duration', models.DurationField()),
+                ('frequency', models.CharField(choices=[('Daily', 'Daily'), ('Weekly', 'Weekly'), ('Monthly', 'Monthly')], default='Weekly', max_length=10)),
+                ('interval', models.PositiveIntegerField(default=1)),
+                ('weekdays', models.JSONField(blank=True, default=list)),
+                ('until', models.DateField(blank=True, null=True)),
+                ('occurrence_count', models.PositiveIntegerField(blank=True, null=True)),
+                ('capacity', models.PositiveIntegerField()),
+                ('price', models.DecimalField(decimal_places=2, default=0.0, max_digits=10)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Event Series',
+                'verbose_name_plural': 'Event Series',
+                'ordering': ['title'],
+            },
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='occurrence_start',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='series',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='occurrences', to='events.eventseries'),
+        ),
+        migrations.AddConstraint(
+            model_name='event',
+            constraint=models.UniqueConstraint(fields=('series', 'occurrence_start'), name='event_series_occurrence_unique'),
+        ),
+    ]
@@ -1,5 +1,8 @@
 from django.db import models
+from django.utils import timezone
 from customer_management.models import Customer
+from .anniversaries import month_day
+from .schedule import sync_event_days
 import uuid
 
 class SpecialDate(models.Model):
@@ -16,6 +19,7 @@ class SpecialDate(models.Model):
     customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='special_dates')
     special_date_type = models.CharField(max_length=20, choices=SPECIAL_DATE_TYPES)
     date = models.DateField()
+    month_day = models.PositiveSmallIntegerField(default=0, db_index=True, editable=False)
     notes = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -24,9 +28,19 @@ class SpecialDate(models.Model):
         ordering = ['date']
         verbose_name = 'Special Date'
         verbose_name_plural = 'Special Dates'
+        indexes = [
+            models.Index(fields=['customer', 'date'], name='special_date_customer_idx'),
+        ]
     
     def __str__(self):
         return f"{self.customer.name} - {self.special_date_type} ({self.date})"
+    
+    def save(self, *args, **kwargs):
+        self.month_day = month_day(self._meta.get_field('date').to_python(self.date))
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'date' in update_fields:
+            kwargs['update_fields'] = set(update_fields) | {'month_day'}
+        super().save(*args, **kwargs)
 
 class Event(models.Model):
     """Hotel events and activities"""
@@ -50,6 +64,10 @@ class Event(models.Model):
     current_bookings = models.PositiveIntegerField(default=0)
     price = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
     is_active = models.BooleanField(default=True)
+    series = models.ForeignKey('EventSeries', on_delete=models.SET_NULL, null=True, blank=True,
+                               related_name='occurrences')
+    # Scheduled start of the series occurrence this event was created for
+    occurrence_start = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -57,10 +75,39 @@ class Event(models.Model):
         ordering = ['-start_date']
         verbose_name = 'Event'
         verbose_name_plural = 'Events'
+        indexes = [
+            models.Index(fields=['start_date', 'end_date'], name='event_start_end_idx'),
+        ]
+        constraints = [
+            # One stored event per occurrence, however many bookings race to create it
+            models.UniqueConstraint(fields=['series', 'occurrence_start'], name='event_series_occurrence_unique'),
+        ]
     
     def __str__(self):
         return f"{self.title} ({self.start_date.date()})"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remembered so a capacity increase can promote the waitlist (see signals.py)
+        instance._loaded_capacity = instance.__dict__.get('capacity')
+        return instance
+    
+    def save(self, *args, **kwargs):
+        # current_bookings only changes through the conditional UPDATEs of
+        # reservations.py; saving a loaded event must not write back the
+        # count it read, which bookings made since may have moved
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.attname in self.__dict__ and field.name != 'current_bookings'
+            ]
+        super().save(*args, **kwargs)
+        # Long events are found by the calendar through their day buckets
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or {'start_date', 'end_date'} & set(update_fields):
+            sync_event_days(self)
+    
     @property
     def available_spots(self):
         return self.capacity - self.current_bookings
@@ -69,6 +116,55 @@ class Event(models.Model):
     def is_full(self):
         return self.current_bookings >= self.capacity
 
+class EventDay(models.Model):
+    """Calendar day covered by a long event (see schedule.py)"""
+    
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='days')
+    day = models.DateField()
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'event'], name='event_day_unique'),
+        ]
+    
+    def __str__(self):
+        return f"{self.event.title} on {self.day}"
+
+class EventSeries(models.Model):
+    """Recurring events; occurrences are computed and only stored once booked"""
+    
+    FREQUENCIES = [
+        ('Daily', 'Daily'),
+        ('Weekly', 'Weekly'),
+        ('Monthly', 'Monthly'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    title = models.CharField(max_length=200)
+    description = models.TextField()
+    event_type = models.CharField(max_length=20, choices=Event.EVENT_TYPES)
+    starts_at = models.DateTimeField()  # start of the first occurrence
+    duration = models.DurationField()
+    frequency = models.CharField(max_length=10, choices=FREQUENCIES, default='Weekly')
+    interval = models.PositiveIntegerField(default=1)  # every N days, weeks or months
+    # Weekly series: days to repeat on, 0 = Monday (default: the weekday of starts_at)
+    weekdays = models.JSONField(default=list, blank=True)
+    until = models.DateField(null=True, blank=True)  # last day an occurrence may start on
+    occurrence_count = models.PositiveIntegerField(null=True, blank=True)
+    capacity = models.PositiveIntegerField()
+    price = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['title']
+        verbose_name = 'Event Series'
+        verbose_name_plural = 'Event Series'
+    
+    def __str__(self):
+        return f"{self.title} ({self.frequency.lower()})"
+
 class EventBooking(models.Model):
     """Bookings for events"""
     
@@ -84,11 +180,75 @@ class EventBooking(models.Model):
         ('Cancelled', 'Cancelled'),
     ], default='Confirmed')
     notes = models.TextField(blank=True, null=True)
+    cancelled_at = models.DateTimeField(null=True, blank=True)
     
     class Meta:
         ordering = ['-booking_date']
         verbose_name = 'Event Booking'
         verbose_name_plural = 'Event Bookings'
+        indexes = [
+            models.Index(fields=['-booking_date', '-id'], name='booking_date_id_idx'),
+            models.Index(fields=['event', '-booking_date', '-id'], name='booking_event_date_id_idx'),
+            # Finds the bookings a bulk cancellation just marked (see reservations.cancel_bookings)
+            models.Index(fields=['cancelled_at'], name='booking_cancelled_at_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.customer.name} - {self.event.title}"
+    
+    def save(self, *args, **kwargs):
+        if self.status == 'Cancelled' and self.cancelled_at is None:
+            self.cancelled_at = timezone.now()
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None and 'status' in update_fields:
+                kwargs['update_fields'] = set(update_fields) | {'cancelled_at'}
+        super().save(*args, **kwargs)
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remembered so a cancellation can promote the waitlist (see signals.py)
+        instance._loaded_status = instance.__dict__.get('status')
+        return instance
+
+class WaitlistEntry(models.Model):
+    """Customer waiting for spots on a full event, served first come first served"""
+    
+    STATUS_CHOICES = [
+        ('Waiting', 'Waiting'),
+        ('Promoted', 'Promoted'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='waitlist')
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='waitlist_entries')
+    number_of_guests = models.PositiveIntegerField(default=1)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Waiting')
+    notes = models.TextField(blank=True, null=True)
+    booking = models.OneToOneField(EventBooking, on_delete=models.SET_NULL, null=True, blank=True,
+                                   related_name='waitlist_entry')
+    created_at = models.DateTimeField(auto_now_add=True)
+    promoted_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['created_at', 'id']
+        verbose_name = 'Waitlist Entry'
+        verbose_name_plural = 'Waitlist Entries'
+        indexes = [
+            # Head of an event's queue: WHERE event = ? AND status = 'Waiting' ORDER BY created_at, id
+            models.Index(fields=['event', 'status', 'created_at', 'id'], name='waitlist_queue_idx'),
+        ]
     
     def __str__(self):
-        return f"{self.customer.name} - {self.event.title}"
\ No newline at end of file
+        return f"{self.customer.name} waiting for {self.event.title}"
+    
+    def position(self):
+        """1-based place in the event's queue, or None once promoted"""
+        if self.status != 'Waiting':
+            return None
+        ahead = WaitlistEntry.objects.filter(
+            models.Q(created_at__lt=self.created_at) | models.Q(created_at=self.created_at, id__lt=self.id),
+            event_id=self.event_id,
+            status='Waiting',
+        )
+        return ahead.count() + 1
\ No newline at end of file
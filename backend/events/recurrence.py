@@ -0,0 +1,243 @@
+"""
+Recurring event series.
+
+An ``EventSeries`` stores a recurrence rule instead of one Event row per
+occurrence. Occurrences are computed when a request asks about a window:
+the first one in the window is found arithmetically, so the work grows
+with the window and not with how long the series has been running.
+
+An occurrence becomes a real Event only when it is booked
+(``materialize``). The ``(series, occurrence_start)`` unique constraint
+makes concurrent first bookings agree on one row, and stored occurrences
+replace their computed counterparts in listings. ``MergedListing`` pages
+stored events and computed occurrences together while reading only the
+stored events of the page from the database.
+
+Occurrences keep the local wall-clock time of ``starts_at`` across
+daylight saving changes. Monthly series skip months without the day of
+month of ``starts_at`` (e.g. the 31st).
+"""
+from calendar import monthrange
+from datetime import date, datetime, timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .schedule import local_day
+
+_EPSILON = timedelta(microseconds=1)
+
+
+def _weekly_days(series, first, lo, hi):
+    """(index, day) of a weekly series from the week containing ``lo``"""
+    weekdays = sorted(set(series.weekdays or [first.weekday()]))
+    monday = first - timedelta(days=first.weekday())
+    first_week = [weekday for weekday in weekdays if weekday >= first.weekday()]
+    number = max(0, (lo - monday).days // 7 // series.interval)
+    while True:
+        week = monday + timedelta(weeks=number * series.interval)
+        if week > hi:
+            return
+        if number == 0:
+            days, index = first_week, 0
+        else:
+            days, index = weekdays, len(first_week) + (number - 1) * len(weekdays)
+        for offset, weekday in enumerate(days):
+            day = week + timedelta(days=weekday)
+            if lo <= day <= hi:
+                yield index + offset, day
+        number += 1
+
+
+def _daily_days(series, first, lo, hi):
+    number = max(0, -(-(lo - first).days // series.interval))
+    day = first + timedelta(days=number * series.interval)
+    while day <= hi:
+        yield number, day
+        number += 1
+        day += timedelta(days=series.interval)
+
+
+def _monthly_days(series, first, lo, hi):
+    # Skipped months make the index of a month unknown without counting from
+    # the start, so only series without ``occurrence_count`` jump ahead
+    # (they never look at the index).
+    number = 0
+    index = 0
+    if series.occurrence_count is None:
+        number = max(0, ((lo.year - first.year) * 12 + lo.month - first.month) // series.interval)
+    while True:
+        year, month = divmod(first.month - 1 + number * series.interval, 12)
+        year += first.year
+        month += 1
+        if date(year, month, 1) > hi:
+            return
+        if first.day <= monthrange(year, month)[1]:
+            day = date(year, month, first.day)
+            if lo <= day <= hi:
+                yield index, day
+            index += 1
+        number += 1
+
+
+_DAYS = {
+    'Daily': _daily_days,
+    'Weekly': _weekly_days,
+    'Monthly': _monthly_days,
+}
+
+
+def occurrences(series, start, end):
+    """(start, end) of the occurrences of ``series`` running at some point in [start, end)"""
+    local_start = timezone.localtime(series.starts_at)
+    first, at = local_start.date(), local_start.time()
+    # An occurrence starting up to one duration before the window may still run into it
+    lo = max(first, local_day(start - series.duration))
+    hi = local_day(max(start, end - _EPSILON))
+    if series.until is not None:
+        hi = min(hi, series.until)
+    if lo > hi:
+        return []
+
+    found = []
+    for index, day in _DAYS[series.frequency](series, first, lo, hi):
+        if series.occurrence_count is not None and index >= series.occurrence_count:
+            break
+        occurrence_start = timezone.make_aware(datetime.combine(day, at))
+        occurrence_end = occurrence_start + series.duration
+        if occurrence_start < end and occurrence_end > start:
+            found.append((occurrence_start, occurrence_end))
+    return found
+
+
+def is_occurrence(series, occurrence_start):
+    return any(
+        start == occurrence_start
+        for start, _ in occurrences(series, occurrence_start, occurrence_start + _EPSILON)
+    )
+
+
+def expand_series(queryset, start, end):
+    """
+    Occurrences in [start, end) of the active series of ``queryset`` that
+    are not stored as events, as dicts shaped like event rows with ``id``
+    set to None, ordered by start.
+    """
+    from .models import Event
+
+    series_list = list(queryset.filter(is_active=True, starts_at__lt=end))
+    if not series_list:
+        return []
+
+    earliest = min(start - series.duration for series in series_list)
+    stored = set(
+        Event.objects
+        .filter(series__in=series_list, occurrence_start__gte=earliest, occurrence_start__lt=end)
+        .values_list('series_id', 'occurrence_start')
+    )
+
+    rows = []
+    for series in series_list:
+        for occurrence_start, occurrence_end in occurrences(series, start, end):
+            if (series.pk, occurrence_start) in stored:
+                continue
+            rows.append({
+                'id': None,
+                'series': series.pk,
+                'occurrence_start': occurrence_start,
+                'title': series.title,
+                'description': series.description,
+                'event_type': series.event_type,
+                'start_date': occurrence_start,
+                'end_date': occurrence_end,
+                'capacity': series.capacity,
+                'current_bookings': 0,
+                'available_spots': series.capacity,
+                'is_full': series.capacity == 0,
+                'price': series.price,
+                'is_active': True,
+            })
+    rows.sort(key=lambda row: (row['start_date'], str(row['series'])))
+    return rows
+
+
+class MergedListing:
+    """
+    Stored events and computed occurrence rows as one sequence, latest first.
+
+    Slicing it, as the paginator does, reads only the events of the slice:
+    how many occurrences come before it is found by a binary search over
+    COUNT queries, so a page costs a few queries however many events the
+    window holds. An event sorts before an occurrence starting with it.
+    """
+
+    def __init__(self, events, rows):
+        # Annotated so sorting works even when ?fields= defers start_date
+        self.events = events.annotate(sort_start=F('start_date')).order_by('-start_date', '-pk')
+        self.rows = sorted(rows, key=lambda row: (row['start_date'], str(row['series'])), reverse=True)
+        self._count = None
+
+    def __len__(self):
+        if self._count is None:
+            self._count = self.events.count() + len(self.rows)
+        return self._count
+
+    def _position(self, index):
+        # Where the occurrence at ``index`` lands in the merged sequence
+        return index + self.events.filter(start_date__gte=self.rows[index]['start_date']).count()
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return self[key:key + 1][0]
+        start, stop, _ = key.indices(len(self))
+        if start >= stop:
+            return []
+
+        # Occurrences placed before ``start``; positions grow with the index
+        lo, hi = 0, min(start, len(self.rows))
+        while lo < hi:
+            middle = (lo + hi) // 2
+            if self._position(middle) < start:
+                lo = middle + 1
+            else:
+                hi = middle
+        size = stop - start
+        events = list(self.events[start - lo:start - lo + size])
+        merged = events + self.rows[lo:lo + size]
+        merged.sort(key=lambda row: (row['start_date'], False) if isinstance(row, dict) else (row.sort_start, True),
+                    reverse=True)
+        return merged[:size]
+
+
+def materialize(series, occurrence_start):
+    """
+    The Event of one occurrence, created from the series on first use.
+
+    Raises ValueError when ``occurrence_start`` is not an occurrence of
+    the series.
+    """
+    from .models import Event
+
+    event = Event.objects.filter(series=series, occurrence_start=occurrence_start).first()
+    if event is not None:
+        return event
+    if not series.is_active or not is_occurrence(series, occurrence_start):
+        raise ValueError('Not an occurrence of this series')
+
+    try:
+        with transaction.atomic():
+            return Event.objects.create(
+                series=series,
+                occurrence_start=occurrence_start,
+                title=series.title,
+                description=series.description,
+                event_type=series.event_type,
+                start_date=occurrence_start,
+                end_date=occurrence_start + series.duration,
+                capacity=series.capacity,
+                price=series.price,
+            )
+    except IntegrityError:
+        # Another request stored it first
+        return Event.objects.get(series=series, occurrence_start=occurrence_start)
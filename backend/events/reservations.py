@@ -0,0 +1,290 @@
+"""
+Event capacity reservations.
+
+Checking ``available_spots`` on a loaded event and saving the incremented
+count lets two requests both see the last free spot and both book it,
+and the second ``save()`` overwrites the first count. A reservation is
+instead admitted by one conditional UPDATE::
+
+    UPDATE events_event
+       SET current_bookings = current_bookings + n
+     WHERE id = %s AND current_bookings <= capacity - n
+
+The database serialises concurrent UPDATEs of the row, so the condition is
+always checked against the latest count, and the booking row is inserted
+in the same transaction so a failed insert gives the spots back.
+
+Cancellations give spots back the same way, with ``current_bookings``
+decremented inside the database, one UPDATE per batch of events.
+"""
+import uuid
+from collections import Counter
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, IntegerField, Sum, Value, When
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import Event, EventBooking
+
+
+class ReservationError(Exception):
+    """A booking could not be made"""
+
+    def __init__(self, message, rejected=None):
+        super().__init__(message)
+        self.rejected = rejected or []
+
+
+class NotEnoughSpots(ReservationError):
+    pass
+
+
+def claim_spots(event_id, number_of_guests):
+    """Take ``number_of_guests`` spots if they are free; return whether it worked"""
+    return Event.objects.filter(
+        pk=event_id,
+        current_bookings__lte=F('capacity') - number_of_guests,
+    ).update(
+        current_bookings=F('current_bookings') + number_of_guests,
+        updated_at=timezone.now(),
+    ) == 1
+
+
+def reserve(event, customer_id, number_of_guests=1, notes=None):
+    """
+    Book ``number_of_guests`` spots on ``event`` for a customer.
+
+    Returns the new EventBooking. Raises NotEnoughSpots when the event
+    cannot take that many guests and ReservationError for an unknown
+    customer; in both cases nothing is written.
+    """
+    if number_of_guests < 1:
+        raise ReservationError('Number of guests must be at least 1')
+
+    try:
+        with transaction.atomic():
+            # The UPDATE comes first so the transaction starts by taking the
+            # write lock (SQLite) and never holds a stale read.
+            if not claim_spots(event.pk, number_of_guests):
+                raise NotEnoughSpots('Not enough available spots')
+            booking = EventBooking.objects.create(
+                event=event,
+                customer_id=customer_id,
+                number_of_guests=number_of_guests,
+                total_price=event.price * number_of_guests,
+                notes=notes,
+            )
+    except (IntegrityError, ValidationError):
+        raise ReservationError('Customer not found')
+    return booking
+
+
+def reserve_with_offers(event, customer_id, number_of_guests, offer_ids, notes=None):
+    """
+    Book like ``reserve`` and redeem ``offer_ids`` on the booking.
+
+    The booking is priced with ``offers.pricing`` and its ``total_price``
+    is the discounted total. Spots, offer uses, usages and the booking are
+    written in one transaction, so an offer that cannot be used leaves
+    nothing behind. Raises ReservationError naming the first offer that
+    cannot be used.
+    """
+    from offers.pricing import offer_terms, quote_batch
+    from offers.redemption import RedemptionError, redeem
+
+    try:
+        with transaction.atomic():
+            booking = reserve(event, customer_id, number_of_guests, notes=notes)
+            quote, = quote_batch([{
+                'event_id': event.pk,
+                'customer_id': customer_id,
+                'number_of_guests': number_of_guests,
+                'offer_ids': offer_ids,
+            }])
+            if 'error' in quote:
+                raise ReservationError(quote['error'])
+            if quote['rejected']:
+                raise ReservationError('Offer {offer_id}: {reason}'.format(**quote['rejected'][0]))
+            offers = offer_terms([applied['offer_id'] for applied in quote['applied']])
+            for applied in quote['applied']:
+                redeem(offers[applied['offer_id']], customer_id, order_id=str(booking.pk),
+                       discount=applied['discount'])
+            booking.total_price = quote['total']
+            booking.save(update_fields=['total_price'])
+    except RedemptionError as e:
+        raise ReservationError(str(e))
+    except (IntegrityError, ValidationError):
+        raise ReservationError('Customer not found')
+    return booking
+
+
+# How often a partial group booking re-reads the free spots when
+# concurrent bookings keep taking them
+PARTIAL_ATTEMPTS = 5
+
+
+def _validate_group(entries):
+    """Split group entries into (valid, rejected), checking customers with one query"""
+    from customer_management.models import Customer
+
+    parsed = []
+    rejected = []
+    for index, entry in enumerate(entries):
+        try:
+            customer_id = uuid.UUID(str(entry.get('customer_id')))
+            number_of_guests = int(entry.get('number_of_guests', 1))
+        except (AttributeError, TypeError, ValueError):
+            rejected.append({'index': index, 'error': 'Invalid customer_id or number_of_guests'})
+            continue
+        if number_of_guests < 1:
+            rejected.append({'index': index, 'error': 'Number of guests must be at least 1'})
+            continue
+        parsed.append((index, customer_id, number_of_guests, entry.get('notes')))
+
+    existing = set(
+        Customer.objects.filter(pk__in={customer_id for _, customer_id, _, _ in parsed}).values_list('pk', flat=True)
+    )
+    valid = []
+    for index, customer_id, number_of_guests, notes in parsed:
+        if customer_id in existing:
+            valid.append((index, customer_id, number_of_guests, notes))
+        else:
+            rejected.append({'index': index, 'error': 'Customer not found'})
+    return valid, rejected
+
+
+def _fitting(entries, free):
+    """Entries (in order) that fit into ``free`` spots, and those that do not"""
+    admitted = []
+    left_out = []
+    for entry in entries:
+        if entry[2] <= free:
+            admitted.append(entry)
+            free -= entry[2]
+        else:
+            left_out.append(entry)
+    return admitted, left_out
+
+
+def reserve_group(event, entries, partial=False, notes=None):
+    """
+    Book several customers onto ``event`` at once.
+
+    ``entries`` are dicts with ``customer_id``, optional ``number_of_guests``
+    (default 1) and ``notes``. The combined guests are claimed with one
+    conditional UPDATE and every booking is inserted with one
+    ``bulk_create``, in a single transaction.
+
+    Without ``partial`` the group is all-or-nothing: any invalid entry or a
+    shortage of spots raises ReservationError and nothing is written. With
+    ``partial`` invalid entries are skipped and entries are admitted in
+    order while spots last. Returns (bookings, rejected) where rejected
+    lists ``{'index', 'error'}`` for the entries not booked.
+    """
+    valid, rejected = _validate_group(entries)
+    if rejected and not partial:
+        raise ReservationError('Some bookings are invalid', rejected)
+
+    admitted = valid
+    left_out = []
+    with transaction.atomic():
+        for _ in range(PARTIAL_ATTEMPTS if partial else 1):
+            guests = sum(entry[2] for entry in admitted)
+            if not admitted or claim_spots(event.pk, guests):
+                break
+            if not partial:
+                raise NotEnoughSpots(f'Not enough available spots for {guests} guests')
+            # Fit the group into whatever is free now; retry if a
+            # concurrent booking takes those spots first.
+            free = Event.objects.filter(pk=event.pk).values_list('capacity', 'current_bookings').first()
+            admitted, left_out = _fitting(valid, max(0, free[0] - free[1]) if free else 0)
+        else:
+            admitted, left_out = [], valid
+
+        bookings = EventBooking.objects.bulk_create([
+            EventBooking(
+                event=event,
+                customer_id=customer_id,
+                number_of_guests=number_of_guests,
+                total_price=event.price * number_of_guests,
+                notes=entry_notes or notes,
+            )
+            for _, customer_id, number_of_guests, entry_notes in admitted
+        ])
+
+    rejected.extend({'index': index, 'error': 'Not enough available spots'} for index, *_ in left_out)
+    rejected.sort(key=lambda item: item['index'])
+    return bookings, rejected
+
+
+# Events whose spots are given back per UPDATE statement
+RELEASE_BATCH = 500
+
+# Bookings marked cancelled per UPDATE statement
+CANCEL_BATCH = 5000
+
+
+def release_spots(guests_by_event, now=None):
+    """
+    Give spots back: ``guests_by_event`` maps event ids to guest counts.
+
+    Each batch of events is one UPDATE whose CASE picks every event's own
+    count; the result never drops below zero.
+    """
+    now = now or timezone.now()
+    event_ids = [event_id for event_id, guests in guests_by_event.items() if guests]
+    for start in range(0, len(event_ids), RELEASE_BATCH):
+        batch = event_ids[start:start + RELEASE_BATCH]
+        released = Case(
+            *(When(pk=event_id, then=Value(guests_by_event[event_id])) for event_id in batch),
+            default=Value(0),
+            output_field=IntegerField(),
+        )
+        Event.objects.filter(pk__in=batch).update(
+            current_bookings=Greatest(F('current_bookings') - released, Value(0)),
+            updated_at=now,
+        )
+
+
+def cancel_bookings(queryset):
+    """
+    Cancel the bookings of ``queryset`` that are not cancelled yet.
+
+    The live bookings are locked and their ids collected, then marked and
+    their guests summed per event by id (one UPDATE and one grouped query
+    per ``CANCEL_BATCH`` ids) and given back with ``release_spots``;
+    waitlists of the events are promoted once the transaction commits.
+    Returns ``{event_id: guests released}``.
+    """
+    from .waitlist import promote_waitlist
+
+    now = timezone.now()
+    guests_by_event = Counter()
+    with transaction.atomic():
+        # Only rows this call marks are released: they are picked by id and
+        # still live, and a concurrent cancel waits for the row locks
+        # (PostgreSQL) or fails to take the write lock (SQLite) instead of
+        # releasing the same guests twice.
+        pks = list(queryset.exclude(status='Cancelled').select_for_update().values_list('pk', flat=True))
+        for start in range(0, len(pks), CANCEL_BATCH):
+            batch = pks[start:start + CANCEL_BATCH]
+            marked = EventBooking.objects.filter(pk__in=batch).exclude(status='Cancelled')
+            if not marked.update(status='Cancelled', cancelled_at=now):
+                continue
+            guests_by_event.update(dict(
+                EventBooking.objects
+                .filter(pk__in=batch, status='Cancelled', cancelled_at=now)
+                .order_by()
+                .values('event_id')
+                .annotate(guests=Sum('number_of_guests'))
+                .values_list('event_id', 'guests')
+            ))
+        if not guests_by_event:
+            return {}
+        guests_by_event = dict(guests_by_event)
+        release_spots(guests_by_event, now)
+        for event_id in guests_by_event:
+            transaction.on_commit(lambda event_id=event_id: promote_waitlist(event_id))
+    return guests_by_event
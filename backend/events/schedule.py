@@ -0,0 +1,147 @@
+"""
+Event calendar: overlap queries and per-day occupancy.
+
+An event overlaps a window when it starts before the window ends and ends
+after it starts. Both predicates are open-ended ranges, so on their own an
+index can only bound one side and the scan grows with the table. Events
+are therefore split by length:
+
+* Events of up to ``LONG_EVENT_DURATION`` must start at most that long
+  before the window, which turns the overlap into a bounded range scan of
+  the ``(start_date, end_date)`` index.
+* Longer events are precomputed into ``EventDay`` rows, one per calendar
+  day they cover, and found through the ``day`` index.
+
+Calendar days are in the current time zone, so the buckets have to be
+rebuilt (``manage.py rebuild_event_days``) after ``TIME_ZONE`` changes.
+"""
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+LONG_EVENT_DURATION = timedelta(days=1)
+
+MAX_CALENDAR_DAYS = 92
+
+# Day rows written per INSERT by rebuild_event_days
+REBUILD_BATCH = 1000
+
+_EPSILON = timedelta(microseconds=1)
+
+
+def local_day(value):
+    return timezone.localtime(value).date()
+
+
+def day_start(day):
+    """Aware datetime for the start of ``day`` in the current time zone"""
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def covered_days(start, end):
+    """Calendar days touched by the interval [start, end)"""
+    first = local_day(start)
+    last = local_day(max(start, end - _EPSILON))
+    return [first + timedelta(days=offset) for offset in range((last - first).days + 1)]
+
+
+def is_long(start, end):
+    return end - start > LONG_EVENT_DURATION
+
+
+def sync_event_days(event):
+    """Rebuild the day buckets of one event after its dates changed"""
+    from .models import EventDay
+
+    start, end = (_as_datetime(event, field) for field in ('start_date', 'end_date'))
+    EventDay.objects.filter(event=event).delete()
+    if is_long(start, end):
+        EventDay.objects.bulk_create(EventDay(event=event, day=day) for day in covered_days(start, end))
+
+
+def rebuild_event_days():
+    """Rebuild the day buckets of every event in the current time zone; return (events, days)"""
+    from .models import Event, EventDay
+
+    events = days = 0
+    with transaction.atomic():
+        EventDay.objects.all().delete()
+        batch = []
+        for pk, start, end in Event.objects.values_list('pk', 'start_date', 'end_date').iterator():
+            if not is_long(start, end):
+                continue
+            events += 1
+            batch.extend(EventDay(event_id=pk, day=day) for day in covered_days(start, end))
+            if len(batch) >= REBUILD_BATCH:
+                EventDay.objects.bulk_create(batch)
+                days += len(batch)
+                batch = []
+        EventDay.objects.bulk_create(batch)
+        days += len(batch)
+    return events, days
+
+
+def _as_datetime(event, field):
+    """Aware datetime of a date field that may still hold the string it was set to"""
+    value = event._meta.get_field(field).to_python(getattr(event, field))
+    return timezone.make_aware(value) if timezone.is_naive(value) else value
+
+
+def overlapping_events(queryset, start, end):
+    """Events of ``queryset`` running at some point in [start, end)"""
+    from .models import Event, EventDay
+
+    short_events = Event.objects.filter(
+        start_date__gte=start - LONG_EVENT_DURATION,
+        start_date__lt=end,
+    ).values('pk')
+    long_events = EventDay.objects.filter(
+        day__range=(local_day(start), local_day(max(start, end - _EPSILON))),
+    ).values('event_id')
+    return queryset.filter(
+        Q(pk__in=short_events) | Q(pk__in=long_events),
+        start_date__lt=end,
+        end_date__gt=start,
+    )
+
+
+def occupancy_grid(events, first_day, last_day):
+    """
+    One row per day from ``first_day`` to ``last_day``.
+
+    ``events`` are dicts with ``start_date``, ``end_date``, ``capacity``
+    and ``current_bookings``; an event counts towards every day it covers.
+    """
+    grid = {
+        first_day + timedelta(days=offset): {'events': 0, 'capacity': 0, 'booked': 0}
+        for offset in range((last_day - first_day).days + 1)
+    }
+    for event in events:
+        for day in covered_days(event['start_date'], event['end_date']):
+            cell = grid.get(day)
+            if cell is None:
+                continue
+            cell['events'] += 1
+            cell['capacity'] += event['capacity']
+            cell['booked'] += event['current_bookings']
+    return [
+        {'date': day, **cell, 'available': max(0, cell['capacity'] - cell['booked'])}
+        for day, cell in grid.items()
+    ]
+
+
+def free_slots(events, start, end, min_duration=timedelta(0)):
+    """Gaps in [start, end) during which none of ``events`` is running"""
+    slots = []
+    cursor = start
+    for event in sorted(events, key=lambda event: event['start_date']):
+        if event['start_date'] > cursor and event['start_date'] - cursor >= max(min_duration, _EPSILON):
+            slots.append({'start': cursor, 'end': min(event['start_date'], end)})
+        cursor = max(cursor, event['end_date'])
+        if cursor >= end:
+            break
+    if cursor < end and end - cursor >= max(min_duration, _EPSILON):
+        slots.append({'start': cursor, 'end': end})
+    return slots
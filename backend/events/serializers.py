@@ -1,8 +1,18 @@
+from urllib.parse import urlencode
+
+from django.urls import reverse
 from rest_framework import serializers
-from .models import SpecialDate, Event, EventBooking
+from hotel_backend.pagination import keyset_page
+from hotel_backend.serializers import DynamicFieldsMixin
+from .models import SpecialDate, Event, EventBooking, EventSeries, WaitlistEntry
 from customer_management.serializers import CustomerSerializer
 
-class SpecialDateSerializer(serializers.ModelSerializer):
+# Bookings embedded in EventDetailSerializer, newest first like the bookings list
+BOOKINGS_ORDERING = '-booking_date'
+BOOKINGS_PAGE_SIZE = 20
+MAX_BOOKINGS_PAGE_SIZE = 100
+
+class SpecialDateSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Serializer for SpecialDate model"""
     
     customer_name = serializers.CharField(source='customer.name', read_only=True)
@@ -13,8 +23,24 @@ class SpecialDateSerializer(serializers.ModelSerializer):
         fields = ['id', 'customer', 'customer_name', 'customer_phone', 'special_date_type', 
                  'date', 'notes', 'created_at', 'updated_at']
         read_only_fields = ['id', 'created_at', 'updated_at']
+        expandable_fields = {
+            'customer': CustomerSerializer,
+        }
+
+class CelebrationSerializer(serializers.Serializer):
+    """Serializer for calendar entries built by events.anniversaries"""
+    
+    source = serializers.CharField()
+    id = serializers.UUIDField()
+    customer_id = serializers.UUIDField()
+    customer_name = serializers.CharField()
+    customer_phone = serializers.CharField()
+    special_date_type = serializers.CharField()
+    date = serializers.DateField()
+    occurs_on = serializers.DateField()
+    years = serializers.IntegerField()
 
-class EventSerializer(serializers.ModelSerializer):
+class EventSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Serializer for Event model"""
     
     available_spots = serializers.ReadOnlyField()
@@ -24,10 +50,59 @@ class EventSerializer(serializers.ModelSerializer):
         model = Event
         fields = ['id', 'title', 'description', 'event_type', 'start_date', 'end_date',
                  'capacity', 'current_bookings', 'available_spots', 'is_full', 'price',
+                 'is_active', 'series', 'occurrence_start', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'current_bookings', 'series', 'occurrence_start', 'created_at', 'updated_at']
+        field_dependencies = {
+            'available_spots': ['capacity', 'current_bookings'],
+            'is_full': ['capacity', 'current_bookings'],
+        }
+
+class EventSeriesSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    """Serializer for EventSeries model"""
+    
+    class Meta:
+        model = EventSeries
+        fields = ['id', 'title', 'description', 'event_type', 'starts_at', 'duration', 'frequency',
+                 'interval', 'weekdays', 'until', 'occurrence_count', 'capacity', 'price',
                  'is_active', 'created_at', 'updated_at']
-        read_only_fields = ['id', 'current_bookings', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'created_at', 'updated_at']
+    
+    def validate_duration(self, value):
+        if value.total_seconds() <= 0:
+            raise serializers.ValidationError('Duration must be positive')
+        return value
+    
+    def validate_interval(self, value):
+        if value < 1:
+            raise serializers.ValidationError('Interval must be at least 1')
+        return value
+    
+    def validate_weekdays(self, value):
+        if not isinstance(value, list) or any(
+            not isinstance(day, int) or isinstance(day, bool) or not 0 <= day <= 6 for day in value
+        ):
+            raise serializers.ValidationError('Weekdays must be a list of numbers from 0 (Monday) to 6 (Sunday)')
+        return sorted(set(value))
+
+class OccurrenceSerializer(serializers.Serializer):
+    """An occurrence of a recurring series that is not stored as an event yet"""
+    
+    id = serializers.UUIDField(allow_null=True)
+    title = serializers.CharField()
+    description = serializers.CharField()
+    event_type = serializers.CharField()
+    start_date = serializers.DateTimeField()
+    end_date = serializers.DateTimeField()
+    capacity = serializers.IntegerField()
+    current_bookings = serializers.IntegerField()
+    available_spots = serializers.IntegerField()
+    is_full = serializers.BooleanField()
+    price = serializers.DecimalField(max_digits=10, decimal_places=2)
+    is_active = serializers.BooleanField()
+    series = serializers.UUIDField()
+    occurrence_start = serializers.DateTimeField()
 
-class EventBookingSerializer(serializers.ModelSerializer):
+class EventBookingSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Serializer for EventBooking model"""
     
     customer_name = serializers.CharField(source='customer.name', read_only=True)
@@ -36,13 +111,51 @@ class EventBookingSerializer(serializers.ModelSerializer):
     class Meta:
         model = EventBooking
         fields = ['id', 'event', 'event_title', 'customer', 'customer_name', 
-                 'booking_date', 'number_of_guests', 'total_price', 'status', 'notes']
-        read_only_fields = ['id', 'booking_date']
+                 'booking_date', 'number_of_guests', 'total_price', 'status', 'notes', 'cancelled_at']
+        read_only_fields = ['id', 'booking_date', 'cancelled_at']
+        expandable_fields = {
+            'event': EventSerializer,
+            'customer': CustomerSerializer,
+        }
+
+class EventBookingCreateSerializer(EventBookingSerializer):
+    """Serializer for new bookings; the status and price come from the reservation"""
+    
+    class Meta(EventBookingSerializer.Meta):
+        read_only_fields = EventBookingSerializer.Meta.read_only_fields + ['total_price', 'status']
+
+class WaitlistEntrySerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    """Serializer for WaitlistEntry model"""
+    
+    customer_name = serializers.CharField(source='customer.name', read_only=True)
+    event_title = serializers.CharField(source='event.title', read_only=True)
+    
+    class Meta:
+        model = WaitlistEntry
+        fields = ['id', 'event', 'event_title', 'customer', 'customer_name', 'number_of_guests',
+                 'status', 'notes', 'booking', 'created_at', 'promoted_at']
+        read_only_fields = ['id', 'status', 'booking', 'created_at', 'promoted_at']
+        expandable_fields = {
+            'event': EventSerializer,
+            'customer': CustomerSerializer,
+            'booking': EventBookingSerializer,
+        }
+    
+    def validate_number_of_guests(self, value):
+        if value < 1:
+            raise serializers.ValidationError('Number of guests must be at least 1')
+        return value
 
-class EventDetailSerializer(serializers.ModelSerializer):
-    """Detailed serializer for Event with bookings"""
+class EventDetailSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    """
+    Detailed serializer for Event with the first page of its bookings.
+    
+    ``bookings`` holds ``count``, ``next`` (a cursor link into the bookings
+    list filtered to this event) and the newest ``results``; the page size
+    is ``?bookings_page_size=`` (default 20, max 100).
+    """
     
-    bookings = EventBookingSerializer(many=True, read_only=True)
+    bookings = serializers.SerializerMethodField()
     available_spots = serializers.ReadOnlyField()
     is_full = serializers.ReadOnlyField()
     
@@ -50,5 +163,39 @@ class EventDetailSerializer(serializers.ModelSerializer):
         model = Event
         fields = ['id', 'title', 'description', 'event_type', 'start_date', 'end_date',
                  'capacity', 'current_bookings', 'available_spots', 'is_full', 'price',
-                 'is_active', 'bookings', 'created_at', 'updated_at']
-        read_only_fields = ['id', 'current_bookings', 'created_at', 'updated_at']
+                 'is_active', 'series', 'occurrence_start', 'bookings', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'current_bookings', 'series', 'occurrence_start', 'created_at', 'updated_at']
+        field_dependencies = {
+            **EventSerializer.Meta.field_dependencies,
+            'bookings': [],
+        }
+    
+    def get_bookings(self, obj):
+        request = self.context.get('request')
+        page_size = BOOKINGS_PAGE_SIZE
+        if request is not None:
+            try:
+                page_size = int(request.query_params.get('bookings_page_size', BOOKINGS_PAGE_SIZE))
+            except ValueError:
+                pass
+        page_size = max(1, min(page_size, MAX_BOOKINGS_PAGE_SIZE))
+        
+        bookings, cursor = keyset_page(
+            obj.bookings.select_related('customer'), BOOKINGS_ORDERING, page_size
+        )
+        for booking in bookings:
+            booking.event = obj
+        
+        next_link = None
+        if cursor is not None:
+            next_link = reverse('eventbooking-list') + '?' + urlencode({
+                'event_id': obj.pk, 'page_size': page_size, 'cursor': cursor,
+            })
+            if request is not None:
+                next_link = request.build_absolute_uri(next_link)
+        
+        return {
+            'count': obj.bookings.count(),
+            'next': next_link,
+            'results': EventBookingSerializer(bookings, many=True).data,
+        }
@@ -0,0 +1,35 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .models import Event, EventBooking
+from .reservations import release_spots
+from .waitlist import promote_waitlist
+
+@receiver(post_save, sender=Event)
+def promote_on_capacity_increase(sender, instance, created, raw=False, **kwargs):
+    """Offer spots added by a capacity increase to the waitlist"""
+    loaded_capacity = getattr(instance, '_loaded_capacity', None)
+    instance._loaded_capacity = instance.capacity
+    if raw or created or loaded_capacity is None:
+        return
+    if int(instance.capacity) > loaded_capacity:
+        transaction.on_commit(partial(promote_waitlist, instance.pk))
+
+@receiver(post_save, sender=EventBooking)
+def release_on_cancellation(sender, instance, created, raw=False, **kwargs):
+    """
+    Give back the spots of a booking saved as cancelled and offer them to the waitlist.
+    
+    The API cancels through ``reservations.cancel_bookings``, which does
+    not send signals; this covers saves from the admin and scripts.
+    """
+    loaded_status = getattr(instance, '_loaded_status', None)
+    instance._loaded_status = instance.status
+    if raw or created:
+        return
+    if instance.status == 'Cancelled' and loaded_status not in (None, 'Cancelled'):
+        release_spots({instance.event_id: instance.number_of_guests})
+        transaction.on_commit(partial(promote_waitlist, instance.event_id))
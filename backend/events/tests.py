@@ -1,3 +1,717 @@
-from django.test import TestCase
+import uuid
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
 
-# Create your tests here.
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from customer_management.models import Customer, CustomerProfile
+from customer_management.serializers import CustomerSerializer
+from offers.models import Offer, OfferUsage
+from .anniversaries import celebrations, month_day, next_occurrence, window_ranges
+from .models import Event, EventBooking, EventDay, EventSeries, SpecialDate, WaitlistEntry
+from .recurrence import MergedListing, expand_series, materialize, occurrences
+from .schedule import covered_days, free_slots, overlapping_events, rebuild_event_days
+from .reservations import (
+    NotEnoughSpots, ReservationError, cancel_bookings, reserve, reserve_group, reserve_with_offers,
+)
+from .waitlist import join_waitlist, promote_waitlist
+
+
+def make_customer(phone):
+    return Customer.objects.create(name=f'Guest {phone}', phone=phone, birth_date=date(1990, 1, 1))
+
+
+def make_event(capacity=3, start=None, hours=2, **fields):
+    start = start or timezone.now() + timedelta(days=7)
+    return Event.objects.create(
+        title=fields.pop('title', 'Wine tasting'),
+        description='Tasting in the bar',
+        event_type=fields.pop('event_type', 'Bar'),
+        start_date=start,
+        end_date=start + timedelta(hours=hours),
+        capacity=capacity,
+        price=Decimal('50.00'),
+        **fields,
+    )
+
+
+class ReservationTests(TestCase):
+    """Spots are claimed with one conditional UPDATE"""
+
+    def setUp(self):
+        self.event = make_event(capacity=3)
+        self.customer = make_customer('+15550000020')
+
+    def assertBooked(self, count):
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.current_bookings, count)
+
+    def test_reserve_claims_spots(self):
+        booking = reserve(self.event, self.customer.pk, 2)
+        self.assertEqual(booking.total_price, Decimal('100.00'))
+        self.assertBooked(2)
+
+    def test_not_enough_spots_writes_nothing(self):
+        reserve(self.event, self.customer.pk, 2)
+        with self.assertRaises(NotEnoughSpots):
+            reserve(self.event, self.customer.pk, 2)
+        self.assertBooked(2)
+        self.assertEqual(EventBooking.objects.count(), 1)
+
+    def test_stale_save_keeps_bookings_made_since(self):
+        stale = Event.objects.get(pk=self.event.pk)
+        reserve(self.event, self.customer.pk, 2)
+
+        stale.title = 'Wine and cheese tasting'
+        stale.save()
+
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.title, 'Wine and cheese tasting')
+        self.assertBooked(2)
+
+
+class ReservationCommitTests(TransactionTestCase):
+    """Foreign keys are checked when the reservation commits"""
+
+    def test_unknown_customer_gives_spots_back(self):
+        event = make_event(capacity=3)
+        with self.assertRaises(ReservationError):
+            reserve(event, '00000000-0000-0000-0000-000000000000', 2)
+        event.refresh_from_db()
+        self.assertEqual(event.current_bookings, 0)
+        self.assertFalse(EventBooking.objects.exists())
+
+
+class BookAPITests(TestCase):
+    """POST /api/events/events/{id}/book/ never oversells"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.event = make_event(capacity=3)
+        self.customer = make_customer('+15550000040')
+
+    def book(self, guests):
+        return self.client.post(f'/api/events/events/{self.event.pk}/book/', {
+            'customer_id': str(self.customer.pk),
+            'number_of_guests': guests,
+        }, format='json')
+
+    def test_book_until_full(self):
+        self.assertEqual(self.book(2).status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.book(2).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.book(1).status_code, status.HTTP_201_CREATED)
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.current_bookings, 3)
+
+    def test_number_of_guests_must_be_an_integer(self):
+        self.assertEqual(self.book('two').status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_update_after_booking_keeps_count(self):
+        event = Event.objects.get(pk=self.event.pk)
+        self.book(2)
+
+        response = self.client.put(f'/api/events/events/{event.pk}/', {
+            'title': 'Renamed',
+            'description': event.description,
+            'event_type': event.event_type,
+            'start_date': event.start_date.isoformat(),
+            'end_date': event.end_date.isoformat(),
+            'capacity': 5,
+            'price': '50.00',
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.event.refresh_from_db()
+        self.assertEqual((self.event.title, self.event.capacity, self.event.current_bookings), ('Renamed', 5, 2))
+
+
+class CancellationTests(TestCase):
+    """Cancelling gives spots back exactly once"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.event = make_event(capacity=3)
+        self.customer = make_customer('+15550000050')
+
+    def assertBooked(self, count):
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.current_bookings, count)
+
+    def test_cancel_bookings_releases_spots_once(self):
+        booking = reserve(self.event, self.customer.pk, 2)
+        self.assertEqual(cancel_bookings(EventBooking.objects.filter(pk=booking.pk)), {self.event.pk: 2})
+        self.assertBooked(0)
+        booking.refresh_from_db()
+        self.assertEqual(booking.status, 'Cancelled')
+        self.assertIsNotNone(booking.cancelled_at)
+
+        # Cancelling again gives nothing back
+        self.assertFalse(cancel_bookings(EventBooking.objects.filter(pk=booking.pk)))
+        self.assertBooked(0)
+
+    def test_cancel_endpoint_rejects_second_cancel(self):
+        booking = reserve(self.event, self.customer.pk, 2)
+        url = f'/api/events/bookings/{booking.pk}/cancel/'
+        self.assertEqual(self.client.post(url).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.post(url).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertBooked(0)
+
+    def test_cancelled_booking_cannot_be_reinstated(self):
+        booking = reserve(self.event, self.customer.pk, 1)
+        self.client.post(f'/api/events/bookings/{booking.pk}/cancel/')
+        response = self.client.patch(f'/api/events/bookings/{booking.pk}/', {'status': 'Confirmed'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertBooked(0)
+
+    def test_bulk_cancel_by_event(self):
+        other = make_event(capacity=3)
+        reserve(self.event, self.customer.pk, 1)
+        reserve(self.event, self.customer.pk, 2)
+        reserve(other, self.customer.pk, 1)
+
+        response = self.client.post('/api/events/bookings/bulk_cancel/', {'event_id': str(self.event.pk)}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data['events'], response.data['guests_released']), (1, 3))
+        self.assertBooked(0)
+        other.refresh_from_db()
+        self.assertEqual(other.current_bookings, 1)
+
+    def test_bulk_cancel_needs_a_filter(self):
+        response = self.client.post('/api/events/bookings/bulk_cancel/', {}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class BookingAPITests(TestCase):
+    """Bookings made and removed through the bookings API keep current_bookings in step"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.event = make_event(capacity=3)
+        self.customer = make_customer('+15550000030')
+
+    def book(self, guests):
+        return self.client.post('/api/events/bookings/', {
+            'event': str(self.event.pk),
+            'customer': str(self.customer.pk),
+            'number_of_guests': guests,
+        }, format='json')
+
+    def test_create_claims_and_delete_releases(self):
+        response = self.book(2)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.current_bookings, 2)
+
+        response = self.client.delete(f"/api/events/bookings/{response.data['id']}/")
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.current_bookings, 0)
+
+    def test_create_over_capacity_is_rejected(self):
+        self.assertEqual(self.book(2).status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.book(2).status_code, status.HTTP_400_BAD_REQUEST)
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.current_bookings, 2)
+
+    def test_guests_cannot_be_changed(self):
+        booking_id = self.book(1).data['id']
+        response = self.client.patch(f'/api/events/bookings/{booking_id}/', {'number_of_guests': 3}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ReserveWithOffersTests(TestCase):
+    """Bookings priced with offers are written together with the redemptions, or not at all"""
+
+    def setUp(self):
+        self.event = make_event(capacity=3)
+        self.customer = make_customer('+15550000070')
+        self.today = timezone.localdate()
+
+    def make_offer(self, **fields):
+        return Offer.objects.create(**{
+            'title': 'Ten off',
+            'description': 'Ten off any booking',
+            'offer_type': 'fixed',
+            'discount_value': Decimal('10.00'),
+            'valid_from': self.today,
+            'valid_to': self.today,
+            **fields,
+        })
+
+    def test_offer_discounts_booking(self):
+        offer = self.make_offer(max_usage=1)
+        booking = reserve_with_offers(self.event, self.customer.pk, 2, [str(offer.pk)])
+        self.assertEqual(booking.total_price, Decimal('90.00'))
+        offer.refresh_from_db()
+        self.assertEqual((offer.current_usage, offer.status), (1, 'exhausted'))
+        self.assertEqual(OfferUsage.objects.get().order_id, str(booking.pk))
+
+    def test_rejected_offer_rolls_booking_back(self):
+        offer = self.make_offer(valid_from=self.today - timedelta(days=10), valid_to=self.today - timedelta(days=1))
+        with self.assertRaises(ReservationError):
+            reserve_with_offers(self.event, self.customer.pk, 2, [str(offer.pk)])
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.current_bookings, 0)
+        self.assertFalse(EventBooking.objects.exists())
+        self.assertFalse(OfferUsage.objects.exists())
+
+
+def utc(*args):
+    return datetime(*args, tzinfo=dt_timezone.utc)
+
+
+class CalendarTests(TestCase):
+    """Long events are bucketed by local day; overlaps find short and long events alike"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.dinner = make_event(start=utc(2026, 3, 10, 19), hours=3, title='Dinner')
+        self.fair = make_event(start=utc(2026, 3, 1, 9), hours=24 * 20, title='Wedding fair')
+
+    def test_only_long_events_get_day_buckets(self):
+        self.assertFalse(EventDay.objects.filter(event=self.dinner).exists())
+        self.assertEqual(EventDay.objects.filter(event=self.fair).count(), 21)
+
+        self.fair.end_date = utc(2026, 3, 3, 9)
+        self.fair.save()
+        self.assertEqual(EventDay.objects.filter(event=self.fair).count(), 3)
+
+    def test_covered_days_excludes_end_at_midnight(self):
+        self.assertEqual(covered_days(utc(2026, 3, 1, 22), utc(2026, 3, 3)), [date(2026, 3, 1), date(2026, 3, 2)])
+
+    def test_overlapping_finds_short_and_long_events(self):
+        found = overlapping_events(Event.objects.all(), utc(2026, 3, 10, 20), utc(2026, 3, 10, 21))
+        self.assertEqual(set(found), {self.dinner, self.fair})
+        found = overlapping_events(Event.objects.all(), utc(2026, 3, 25), utc(2026, 3, 26))
+        self.assertFalse(found.exists())
+
+    def test_free_slots(self):
+        events = [{'start_date': utc(2026, 3, 10, 10), 'end_date': utc(2026, 3, 10, 12)}]
+        self.assertEqual(free_slots(events, utc(2026, 3, 10, 8), utc(2026, 3, 10, 18), timedelta(hours=3)), [
+            {'start': utc(2026, 3, 10, 12), 'end': utc(2026, 3, 10, 18)},
+        ])
+
+    def test_calendar_grid(self):
+        response = self.client.get('/api/events/events/calendar/', {'start': '2026-03-10', 'end': '2026-03-11'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        first, second = response.data['days']
+        self.assertEqual((first['events'], first['capacity']), (2, 6))
+        self.assertEqual(second['events'], 1)
+
+    def test_calendar_rejects_bad_ranges(self):
+        for params in ({'start': '2026-03-10', 'end': '2026-09-10'}, {'month': 'March'}, {'min_free_hours': 'nan'}):
+            response = self.client.get('/api/events/events/calendar/', params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_rebuild_follows_time_zone(self):
+        with timezone.override('Asia/Tokyo'):
+            self.assertEqual(rebuild_event_days(), (1, 21))
+            self.assertEqual(EventDay.objects.order_by('day').first().day, date(2026, 3, 1))
+        self.fair.start_date = utc(2026, 3, 1, 20)
+        self.fair.save()
+        with timezone.override('Asia/Tokyo'):
+            rebuild_event_days()
+            # 20:00 UTC is already the next day in Tokyo
+            self.assertEqual(EventDay.objects.order_by('day').first().day, date(2026, 3, 2))
+
+
+def make_series(starts_at, frequency='Weekly', **fields):
+    return EventSeries.objects.create(
+        title=fields.pop('title', 'Yoga'),
+        description='Morning yoga on the terrace',
+        event_type=fields.pop('event_type', 'Activity'),
+        starts_at=starts_at,
+        duration=fields.pop('duration', timedelta(hours=1)),
+        frequency=frequency,
+        capacity=fields.pop('capacity', 10),
+        **fields,
+    )
+
+
+class RecurrenceTests(TestCase):
+    """Occurrences are computed for a window and stored ones replace them"""
+
+    def starts(self, series, start, end):
+        return [occurrence_start for occurrence_start, _ in occurrences(series, start, end)]
+
+    def test_weekly_on_several_days(self):
+        # Monday 2030-01-07 09:00, repeating on Mondays and Thursdays
+        series = make_series(utc(2030, 1, 7, 9), weekdays=[0, 3])
+        self.assertEqual(self.starts(series, utc(2030, 1, 1), utc(2030, 1, 15)),
+                         [utc(2030, 1, 7, 9), utc(2030, 1, 10, 9), utc(2030, 1, 14, 9)])
+
+    def test_window_far_from_the_start_and_occurrence_count(self):
+        series = make_series(utc(2030, 1, 1, 9), frequency='Daily', interval=2)
+        self.assertEqual(self.starts(series, utc(2040, 1, 1), utc(2040, 1, 4)),
+                         [utc(2040, 1, 1, 9), utc(2040, 1, 3, 9)])
+
+        series = make_series(utc(2030, 1, 1, 9), frequency='Daily', occurrence_count=3)
+        self.assertEqual(len(self.starts(series, utc(2030, 1, 1), utc(2030, 2, 1))), 3)
+
+    def test_monthly_skips_short_months_and_stops_at_until(self):
+        series = make_series(utc(2030, 1, 31, 9), frequency='Monthly', until=date(2030, 5, 31))
+        self.assertEqual(self.starts(series, utc(2030, 1, 1), utc(2031, 1, 1)),
+                         [utc(2030, 1, 31, 9), utc(2030, 3, 31, 9), utc(2030, 5, 31, 9)])
+
+    def test_occurrence_running_into_the_window(self):
+        series = make_series(utc(2030, 1, 1, 23), frequency='Daily', duration=timedelta(hours=2))
+        self.assertEqual(self.starts(series, utc(2030, 1, 3), utc(2030, 1, 3, 12)), [utc(2030, 1, 2, 23)])
+
+    @override_settings(TIME_ZONE='Europe/Berlin')
+    def test_wall_clock_time_survives_daylight_saving(self):
+        # 19:00 in Berlin is 18:00 UTC until 2030-03-31 and 17:00 UTC after
+        series = make_series(utc(2030, 3, 18, 18))
+        self.assertEqual(self.starts(series, utc(2030, 3, 18), utc(2030, 4, 2)),
+                         [utc(2030, 3, 18, 18), utc(2030, 3, 25, 18), utc(2030, 4, 1, 17)])
+
+    def test_stored_occurrences_are_not_expanded(self):
+        series = make_series(utc(2030, 1, 7, 9))
+        event = materialize(series, utc(2030, 1, 14, 9))
+        self.assertEqual(materialize(series, utc(2030, 1, 14, 9)), event)
+        with self.assertRaises(ValueError):
+            materialize(series, utc(2030, 1, 15, 9))
+
+        rows = expand_series(EventSeries.objects.all(), utc(2030, 1, 1), utc(2030, 1, 22))
+        self.assertEqual([row['start_date'] for row in rows], [utc(2030, 1, 7, 9), utc(2030, 1, 21, 9)])
+
+
+class MergedListingTests(TestCase):
+    """Stored events and occurrences page together, newest first"""
+
+    def setUp(self):
+        self.client = APIClient()
+        # Daily at 09:00 for ten days, with a stored event at the same time on odd days
+        make_series(utc(2030, 1, 1, 9), frequency='Daily')
+        for day in range(1, 11, 2):
+            make_event(start=utc(2030, 1, day, 9), title=f'Event {day}')
+        make_event(start=utc(2030, 1, 4, 12), title='Noon')
+        self.window = (utc(2030, 1, 1), utc(2030, 1, 11))
+
+    def listing(self):
+        rows = expand_series(EventSeries.objects.all(), *self.window)
+        events = Event.objects.filter(start_date__gte=self.window[0], end_date__lte=self.window[1])
+        return MergedListing(events, rows)
+
+    def key(self, row):
+        return row['start_date'] if isinstance(row, dict) else row.start_date, isinstance(row, dict)
+
+    def test_every_slice_matches_the_full_order(self):
+        listing = self.listing()
+        everything = [self.key(row) for row in listing[:]]
+        self.assertEqual(len(listing), 16)
+        self.assertEqual(everything, sorted(everything, key=lambda key: (key[0], not key[1]), reverse=True))
+        for start in range(len(listing)):
+            for size in (1, 3, 7):
+                self.assertEqual([self.key(row) for row in listing[start:start + size]],
+                                 everything[start:start + size])
+
+    def test_a_page_reads_only_its_events(self):
+        listing = self.listing()
+        len(listing)
+        # Four COUNTs place ten occurrences, one LIMIT query reads the events
+        with self.assertNumQueries(5):
+            rows = listing[12:15]
+        self.assertEqual(len(rows), 3)
+
+    def test_api_pages_cover_every_row_once(self):
+        make_series(utc(2029, 12, 1, 8), frequency='Daily', title='Breakfast')
+        seen = []
+        response = self.client.get('/api/events/events/', {
+            'expand_series': 'true', 'start_date': '2030-01-01T00:00:00Z', 'end_date': '2030-01-11T00:00:00Z',
+        })
+        self.assertEqual(response.data['count'], 26)
+        while True:
+            seen.extend((row['start_date'], row['title']) for row in response.data['results'])
+            if not response.data['next']:
+                break
+            response = self.client.get(response.data['next'])
+        self.assertEqual(len(set(seen)), 26)
+        self.assertEqual([start for start, _ in seen], sorted((start for start, _ in seen), reverse=True))
+
+
+class AnniversaryTests(TestCase):
+    """Anniversaries recur every year, leap days and year ends included"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.leapling = Customer.objects.create(name='Leap', phone='+15550070001', birth_date=date(1996, 2, 29))
+        self.newyear = Customer.objects.create(name='New Year', phone='+15550070002', birth_date=date(1980, 1, 2))
+        SpecialDate.objects.create(customer=self.newyear, special_date_type='Birthday', date=date(1980, 1, 2))
+        SpecialDate.objects.create(customer=self.newyear, special_date_type='Wedding Anniversary',
+                                   date=date(2010, 12, 30))
+
+    def test_window_ranges(self):
+        self.assertEqual(month_day(date(2030, 6, 12)), 612)
+        self.assertEqual(window_ranges(date(2030, 6, 1), 30), [(601, 630)])
+        self.assertEqual(window_ranges(date(2030, 12, 20), 20), [(1220, 1231), (101, 108)])
+        # Ending on February 28th of a common year also takes leap day birthdays
+        self.assertEqual(window_ranges(date(2030, 2, 20), 9), [(220, 228), (229, 229)])
+        self.assertEqual(window_ranges(date(2032, 2, 20), 9), [(220, 228)])
+        self.assertEqual(window_ranges(date(2030, 2, 20), 14), [(220, 305)])
+        self.assertEqual(window_ranges(date(2030, 1, 1), 400), [(101, 1231)])
+        self.assertEqual(window_ranges(date(2030, 7, 1), 365), [(701, 1231), (101, 700)])
+
+    def test_leap_day_falls_on_the_28th_in_common_years(self):
+        self.assertEqual(next_occurrence(date(1996, 2, 29), date(2030, 1, 1)), date(2030, 2, 28))
+        self.assertEqual(next_occurrence(date(1996, 2, 29), date(2032, 1, 1)), date(2032, 2, 29))
+        entries = celebrations(date(2030, 2, 28), 1)
+        self.assertEqual([(entry['customer_id'], entry['occurs_on']) for entry in entries],
+                         [(self.leapling.pk, date(2030, 2, 28))])
+
+    def test_window_wrapping_the_year_is_in_date_order(self):
+        entries = celebrations(date(2030, 12, 25), 14)
+        self.assertEqual([(entry['special_date_type'], entry['occurs_on'], entry['years']) for entry in entries], [
+            ('Wedding Anniversary', date(2030, 12, 30), 20),
+            ('Birthday', date(2031, 1, 2), 51),
+        ])
+        # The birthday is recorded as a special date too and reported once
+        self.assertEqual(entries[1]['source'], 'special_date')
+        self.assertEqual(len(celebrations(date(2030, 12, 25), 14, limit=1)), 1)
+
+    def test_calendar_endpoint(self):
+        response = self.client.get('/api/events/special-dates/calendar/', {'start': '2030-12-25', 'days': 14,
+                                                                          'type': 'Wedding Anniversary'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([entry['occurs_on'] for entry in response.data], ['2030-12-30'])
+
+        response = self.client.get('/api/events/special-dates/calendar/', {'month': '2030-13'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class SparseFieldsetTests(TestCase):
+    """?fields=, ?exclude= and ?expand= trim the output and the query"""
+
+    def setUp(self):
+        self.client = APIClient()
+        for index in range(3):
+            customer = make_customer(f'+1555009{index:04d}')
+            CustomerProfile.objects.create(customer=customer, city='Lyon')
+            reserve(make_event(capacity=10, title=f'Event {index}'), customer.pk, 1)
+
+    def get(self, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/events/bookings/', params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data['results'], [query['sql'] for query in queries]
+
+    def test_fields_load_only_their_columns(self):
+        rows, queries = self.get(fields='id,customer_name')
+        self.assertEqual([set(row) for row in rows], [{'id', 'customer_name'}] * 3)
+        select = queries[-1]
+        self.assertIn('"customer_management_customer"."name"', select)
+        self.assertNotIn('"events_eventbooking"."notes"', select)
+        self.assertNotIn('"events_event"."description"', select)
+
+    def test_exclude(self):
+        rows, _ = self.get(exclude='notes,event_title')
+        self.assertNotIn('notes', rows[0])
+        self.assertNotIn('event_title', rows[0])
+        self.assertIn('customer_name', rows[0])
+
+    def test_nested_expand_costs_no_query_per_row(self):
+        rows, queries = self.get(fields='id,customer,event', expand='customer,event')
+        self.assertEqual(len(queries), 2)
+        self.assertEqual(rows[0]['customer']['phone'][:8], '+1555009')
+        self.assertIn('title', rows[0]['event'])
+
+    def test_serializer_keyword_arguments(self):
+        customer = Customer.objects.select_related('profile').first()
+        data = CustomerSerializer(customer, fields=['id', 'profile'], expand=['profile']).data
+        self.assertEqual(set(data), {'id', 'profile'})
+        self.assertEqual(data['profile']['city'], 'Lyon')
+
+    def test_writes_ignore_the_query_parameters(self):
+        event = make_event(capacity=10)
+        customer = Customer.objects.first()
+        response = self.client.post('/api/events/bookings/?fields=id', {
+            'event': str(event.pk), 'customer': str(customer.pk), 'number_of_guests': 1,
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertIn('total_price', response.data)
+
+
+class GroupBookingTests(TestCase):
+    """A group claims its spots with one UPDATE, all or nothing unless partial"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.event = make_event(capacity=5)
+        self.customers = [make_customer(f'+1555012{index:04d}') for index in range(3)]
+
+    def entries(self, *guests):
+        return [{'customer_id': str(customer.pk), 'number_of_guests': count}
+                for customer, count in zip(self.customers, guests)]
+
+    def assertBooked(self, count):
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.current_bookings, count)
+
+    def test_group_is_booked_at_once(self):
+        bookings, rejected = reserve_group(self.event, self.entries(2, 1, 2), notes='Wedding party')
+        self.assertEqual((len(bookings), rejected), (3, []))
+        self.assertEqual({booking.notes for booking in bookings}, {'Wedding party'})
+        self.assertBooked(5)
+
+    def test_all_or_nothing(self):
+        with self.assertRaises(NotEnoughSpots):
+            reserve_group(self.event, self.entries(2, 2, 2))
+        entries = self.entries(1, 1) + [{'customer_id': 'nobody'}, {'customer_id': str(uuid.uuid4())}]
+        with self.assertRaises(ReservationError) as raised:
+            reserve_group(self.event, entries)
+        self.assertEqual(raised.exception.rejected, [
+            {'index': 2, 'error': 'Invalid customer_id or number_of_guests'},
+            {'index': 3, 'error': 'Customer not found'},
+        ])
+        self.assertBooked(0)
+        self.assertFalse(EventBooking.objects.exists())
+
+    def test_partial_admits_entries_in_order_while_spots_last(self):
+        reserve(self.event, self.customers[0].pk, 2)
+        bookings, rejected = reserve_group(self.event, self.entries(2, 3, 1), partial=True)
+        self.assertEqual([booking.customer_id for booking in bookings], [self.customers[0].pk, self.customers[2].pk])
+        self.assertEqual(rejected, [{'index': 1, 'error': 'Not enough available spots'}])
+        self.assertBooked(5)
+
+    def test_book_group_endpoint(self):
+        url = f'/api/events/events/{self.event.pk}/book_group/'
+        response = self.client.post(url, {'bookings': self.entries(2, 2)}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['guests_booked'], 4)
+        self.assertEqual(response.data['bookings'][0]['customer_name'], self.customers[0].name)
+
+        response = self.client.post(url, {'bookings': self.entries(2)}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(url, {'bookings': self.entries(2), 'partial': True}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['rejected'], [{'index': 0, 'error': 'Not enough available spots'}])
+        response = self.client.post(url, {'bookings': []}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class EventBookingsPageTests(TestCase):
+    """Event details embed the newest bookings and link to the rest"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.event = make_event(capacity=10)
+        for index in range(5):
+            reserve(self.event, make_customer(f'+1555013{index:04d}').pk, 1)
+        reserve(make_event(capacity=10), make_customer('+15550139999').pk, 1)
+
+    def test_first_page_and_next_link_cover_every_booking(self):
+        response = self.client.get(f'/api/events/events/{self.event.pk}/', {'bookings_page_size': 2})
+        bookings = response.data['bookings']
+        self.assertEqual((bookings['count'], len(bookings['results'])), (5, 2))
+
+        seen = [row['id'] for row in bookings['results']]
+        next_link = bookings['next']
+        while next_link:
+            response = self.client.get(next_link)
+            seen.extend(row['id'] for row in response.data['results'])
+            next_link = response.data['next']
+        expected = self.event.bookings.order_by('-booking_date', '-pk').values_list('pk', flat=True)
+        self.assertEqual(seen, [str(pk) for pk in expected])
+
+    def test_bookings_left_out_are_not_queried(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(f'/api/events/events/{self.event.pk}/', {'fields': 'id,title'})
+        self.assertEqual(set(response.data), {'id', 'title'})
+        self.assertFalse(any('events_eventbooking' in query['sql'] for query in queries))
+
+
+class WaitlistTests(TestCase):
+    """Freed spots go to the waitlist first come first served"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.event = make_event(capacity=4)
+        self.booking = reserve(self.event, make_customer('+15550150000').pk, 4)
+        self.customers = [make_customer(f'+1555015{index:04d}') for index in range(1, 4)]
+
+    def statuses(self):
+        return list(self.event.waitlist.order_by('created_at', 'id').values_list('status', flat=True))
+
+    def test_full_event_joins_the_waitlist(self):
+        url = f'/api/events/events/{self.event.pk}/book/'
+        for position, customer in enumerate(self.customers[:2], start=1):
+            response = self.client.post(url, {'customer_id': str(customer.pk), 'join_waitlist': True}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+            self.assertEqual(response.data['position'], position)
+
+        response = self.client.post(url, {'customer_id': str(self.customers[2].pk)}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        with self.assertRaises(ReservationError):
+            join_waitlist(self.event, self.customers[2].pk, 5)
+
+    def test_cancellation_promotes_in_order_skipping_parties_too_large(self):
+        join_waitlist(self.event, self.customers[0].pk, 2)
+        join_waitlist(self.event, self.customers[1].pk, 3)
+        join_waitlist(self.event, self.customers[2].pk, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            cancel_bookings(EventBooking.objects.filter(pk=self.booking.pk))
+
+        self.assertEqual(self.statuses(), ['Promoted', 'Waiting', 'Promoted'])
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.current_bookings, 3)
+        entry = self.event.waitlist.get(customer=self.customers[0])
+        self.assertEqual((entry.booking.number_of_guests, entry.booking.status), (2, 'Confirmed'))
+
+    def test_capacity_increase_promotes(self):
+        join_waitlist(self.event, self.customers[0].pk, 2)
+        event = Event.objects.get(pk=self.event.pk)
+        event.capacity = 6
+        with self.captureOnCommitCallbacks(execute=True):
+            event.save()
+        self.assertEqual(self.statuses(), ['Promoted'])
+
+    def test_inactive_event_is_not_promoted(self):
+        join_waitlist(self.event, self.customers[0].pk, 1)
+        Event.objects.filter(pk=self.event.pk).update(capacity=8, is_active=False)
+        self.assertEqual(promote_waitlist(self.event.pk), [])
+        self.assertEqual(WaitlistEntry.objects.get().status, 'Waiting')
+
+
+class ConditionalListingTests(TestCase):
+    """Event listings answer 304 until a matching event or series changes"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.event = make_event(capacity=4)
+
+    def etag(self, **params):
+        response = self.client.get('/api/events/events/', params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response['ETag']
+
+    def assertNotModified(self, etag, **params):
+        response = self.client.get('/api/events/events/', params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_unchanged_listing_is_not_modified(self):
+        response = self.client.get('/api/events/events/')
+        self.assertIn('Last-Modified', response)
+        self.assertNotModified(response['ETag'])
+        self.assertNotEqual(self.etag(type='Bar'), response['ETag'])
+
+    def test_saves_bookings_and_deletes_change_the_etag(self):
+        def rename():
+            self.event.title = 'Renamed'
+            self.event.save()
+
+        other = make_event()
+        for change in (rename, lambda: reserve(self.event, make_customer('+15550180000').pk, 1), other.delete):
+            etag = self.etag()
+            change()
+            self.assertNotEqual(self.etag(), etag)
+
+    def test_series_changes_the_expanded_listing(self):
+        params = {'expand_series': 'true', 'start_date': '2030-01-01T00:00:00Z', 'end_date': '2030-01-11T00:00:00Z'}
+        etag = self.etag(**params)
+        self.assertNotModified(etag, **params)
+        make_series(utc(2030, 1, 1, 9), frequency='Daily')
+        self.assertNotEqual(self.etag(**params), etag)
@@ -1,11 +1,13 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import SpecialDateViewSet, EventViewSet, EventBookingViewSet
+from .views import SpecialDateViewSet, EventViewSet, EventSeriesViewSet, EventBookingViewSet, WaitlistEntryViewSet
 
 router = DefaultRouter()
 router.register(r'special-dates', SpecialDateViewSet)
 router.register(r'events', EventViewSet)
+router.register(r'series', EventSeriesViewSet)
 router.register(r'bookings', EventBookingViewSet)
+router.register(r'waitlist', WaitlistEntryViewSet)
 
 urlpatterns = [
     path('', include(router.urls)),
@@ -1,18 +1,45 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import models, transaction
 from django.utils import timezone
-from datetime import datetime, timedelta
-from .models import SpecialDate, Event, EventBooking
+from datetime import date, datetime, timedelta
+from calendar import monthrange
+import math
+import uuid
+from hotel_backend.mixins import ConditionalGetMixin, SparseFieldsetMixin
+from hotel_backend.pagination import OptionalKeysetPagination
+from .models import SpecialDate, Event, EventBooking, EventSeries, WaitlistEntry
+from .recurrence import MergedListing, expand_series, materialize
+from .reservations import NotEnoughSpots, ReservationError, cancel_bookings, reserve, reserve_group, reserve_with_offers
+from .schedule import MAX_CALENDAR_DAYS, day_start, free_slots, occupancy_grid, overlapping_events
+from .anniversaries import MAX_WINDOW_DAYS, celebrations, month_ranges, special_dates_in, window_ranges
 from .serializers import (
     SpecialDateSerializer, 
     EventSerializer, 
     EventDetailSerializer,
-    EventBookingSerializer
+    EventBookingSerializer,
+    EventBookingCreateSerializer,
+    EventSeriesSerializer,
+    OccurrenceSerializer,
+    WaitlistEntrySerializer,
+    CelebrationSerializer
 )
+from .waitlist import join_waitlist, promote_waitlist
 
-class SpecialDateViewSet(viewsets.ModelViewSet):
+# Largest group accepted by EventViewSet.book_group
+MAX_GROUP_BOOKINGS = 1000
+
+# Entries listed by EventViewSet.waitlist
+MAX_WAITLIST_ENTRIES = 200
+
+# Largest id list accepted by EventBookingViewSet.bulk_cancel
+MAX_BULK_CANCEL_IDS = 10000
+
+class SpecialDateViewSet(SparseFieldsetMixin, viewsets.ModelViewSet):
     """ViewSet for SpecialDate model"""
     
     queryset = SpecialDate.objects.all()
@@ -41,33 +68,58 @@ class SpecialDateViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['get'])
     def upcoming(self, request):
-        """Get upcoming special dates"""
-        today = timezone.now().date()
-        upcoming_dates = SpecialDate.objects.filter(date__gte=today).order_by('date')
+        """Get special dates whose anniversary falls in the next N days"""
+        try:
+            days = int(request.query_params.get('days', 30))
+        except ValueError:
+            return Response({'error': 'Days must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        today = timezone.localdate()
+        upcoming_dates = special_dates_in(window_ranges(today, days), self.sparse_queryset(self.get_queryset()))
         
         serializer = self.get_serializer(upcoming_dates, many=True)
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
     def this_month(self, request):
-        """Get special dates for this month"""
-        today = timezone.now().date()
-        start_of_month = today.replace(day=1)
-        
-        # Calculate end of month
-        if today.month == 12:
-            end_of_month = today.replace(year=today.year + 1, month=1, day=1) - timedelta(days=1)
-        else:
-            end_of_month = today.replace(month=today.month + 1, day=1) - timedelta(days=1)
-        
-        this_month_dates = SpecialDate.objects.filter(
-            date__gte=start_of_month,
-            date__lte=end_of_month
-        ).order_by('date')
+        """Get special dates whose anniversary falls in this month"""
+        today = timezone.localdate()
+        this_month_dates = special_dates_in(month_ranges(today.year, today.month), self.sparse_queryset(self.get_queryset()))
         
         serializer = self.get_serializer(this_month_dates, many=True)
         return Response(serializer.data)
     
+    @action(detail=False, methods=['get'])
+    def calendar(self, request):
+        """
+        Celebrations from special dates and customer birthdays, in date order.
+        
+        Either ?date=YYYY-MM-DD for a single day, ?month=YYYY-MM for a
+        month, or ?start=YYYY-MM-DD&days=N (defaults: today, 30 days).
+        """
+        try:
+            if request.query_params.get('date'):
+                start = date.fromisoformat(request.query_params['date'])
+                days = 1
+            elif request.query_params.get('month'):
+                year, month = (int(part) for part in request.query_params['month'].split('-'))
+                start = date(year, month, 1)
+                days = monthrange(year, month)[1]
+            else:
+                start = date.fromisoformat(request.query_params.get('start') or timezone.localdate().isoformat())
+                days = int(request.query_params.get('days', 30))
+            limit = int(request.query_params.get('limit', 500))
+        except ValueError:
+            return Response({'error': 'Invalid date, month, days or limit'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        entries = celebrations(
+            start,
+            min(max(days, 1), MAX_WINDOW_DAYS),
+            limit=min(max(limit, 1), 5000),
+            date_type=request.query_params.get('type'),
+        )
+        return Response(CelebrationSerializer(entries, many=True).data)
+    
     @action(detail=False, methods=['get'])
     def stats(self, request):
         """Get statistics for special dates"""
@@ -83,7 +135,63 @@ class SpecialDateViewSet(viewsets.ModelViewSet):
             'other_count': other_count
         })
 
-class EventViewSet(viewsets.ModelViewSet):
+def parse_datetime_param(value):
+    """Aware datetime from a query parameter holding a date or a datetime"""
+    parsed = Event._meta.get_field('start_date').to_python(value)
+    if parsed is None:
+        raise ValueError('A date is required')
+    return timezone.make_aware(parsed) if timezone.is_naive(parsed) else parsed
+
+def book_event(event, data):
+    """
+    Book ``event`` from request data, redeeming ``offer_ids`` on the booking,
+    or join its waitlist when asked to
+    """
+    customer_id = data.get('customer_id')
+
+    if not customer_id:
+        return Response({'error': 'Customer ID is required'}, 
+                       status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        number_of_guests = int(data.get('number_of_guests', 1))
+    except (TypeError, ValueError):
+        return Response({'error': 'Number of guests must be an integer'}, 
+                       status=status.HTTP_400_BAD_REQUEST)
+
+    offer_ids = data.get('offer_ids')
+    if offer_ids is not None and not isinstance(offer_ids, list):
+        return Response({'error': 'offer_ids must be a list'}, 
+                       status=status.HTTP_400_BAD_REQUEST)
+
+    # Spots are claimed and the booking created in one transaction
+    try:
+        if offer_ids:
+            booking = reserve_with_offers(event, customer_id, number_of_guests, offer_ids, notes=data.get('notes'))
+        else:
+            booking = reserve(event, customer_id, number_of_guests, notes=data.get('notes'))
+    except NotEnoughSpots as e:
+        if str(data.get('join_waitlist', '')).lower() != 'true':
+            return Response({'error': str(e)}, 
+                           status=status.HTTP_400_BAD_REQUEST)
+        try:
+            entry = join_waitlist(event, customer_id, number_of_guests, notes=data.get('notes'))
+        except ReservationError as e:
+            return Response({'error': str(e)}, 
+                           status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            'waitlisted': True,
+            'position': entry.position(),
+            'entry': WaitlistEntrySerializer(entry).data
+        }, status=status.HTTP_202_ACCEPTED)
+    except ReservationError as e:
+        return Response({'error': str(e)}, 
+                       status=status.HTTP_400_BAD_REQUEST)
+
+    serializer = EventBookingSerializer(booking)
+    return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+class EventViewSet(ConditionalGetMixin, SparseFieldsetMixin, viewsets.ModelViewSet):
     """ViewSet for Event model"""
     
     queryset = Event.objects.all()
@@ -119,44 +227,221 @@ class EventViewSet(viewsets.ModelViewSet):
         
         return queryset
     
+    def series_queryset(self):
+        """Series matching the ``type`` and ``active`` filters of the events"""
+        queryset = EventSeries.objects.all()
+        
+        event_type = self.request.query_params.get('type', None)
+        if event_type:
+            queryset = queryset.filter(event_type=event_type)
+        
+        is_active = self.request.query_params.get('active', None)
+        if is_active is not None and is_active.lower() != 'true':
+            queryset = queryset.none()
+        
+        return queryset
+    
+    def list(self, request, *args, **kwargs):
+        """
+        List events.
+        
+        With ``?expand_series=true`` (which needs ``start_date`` and
+        ``end_date``, at most 92 days apart) occurrences of recurring series
+        that are not stored yet are listed too, with ``id`` null; book them
+        through the series. Both are paginated together, newest first.
+        
+        Responses carry an ETag; polling with ``If-None-Match`` gets 304
+        while none of the matching events (or series) has changed.
+        """
+        if request.query_params.get('expand_series', '').lower() != 'true':
+            return self.conditional_response(
+                [self.get_queryset()],
+                lambda: super(EventViewSet, self).list(request, *args, **kwargs),
+            )
+        return self.conditional_response(
+            [self.get_queryset(), self.series_queryset()],
+            lambda: self.list_with_series(request),
+        )
+    
+    def list_with_series(self, request):
+        try:
+            start = parse_datetime_param(request.query_params.get('start_date'))
+            end = parse_datetime_param(request.query_params.get('end_date'))
+        except (TypeError, ValueError, DjangoValidationError):
+            return Response({'error': 'expand_series needs valid start_date and end_date'}, 
+                           status=status.HTTP_400_BAD_REQUEST)
+        if end <= start or end - start > timedelta(days=MAX_CALENDAR_DAYS):
+            return Response({'error': f'The range must cover 1 to {MAX_CALENDAR_DAYS} days'}, 
+                           status=status.HTTP_400_BAD_REQUEST)
+        
+        virtual = [
+            row for row in expand_series(self.series_queryset(), start, end)
+            if row['start_date'] >= start and row['end_date'] <= end
+        ]
+        rows = MergedListing(self.filter_queryset(self.get_queryset()), virtual)
+        
+        # Paginated like the plain list; only the events of the page are read
+        page = self.paginate_queryset(rows)
+        data = [
+            self.get_serializer(row).data if isinstance(row, Event) else OccurrenceSerializer(row).data
+            for row in (rows[:] if page is None else page)
+        ]
+        if page is None:
+            return Response(data)
+        return self.get_paginated_response(data)
+    
     @action(detail=True, methods=['post'])
     def book(self, request, pk=None):
-        """Book an event"""
+        """
+        Book an event.
+        
+        ``offer_ids`` are redeemed on the booking and its ``total_price`` is
+        the discounted price. With ``"join_waitlist": true`` a request the
+        event has no room for joins the event's waitlist instead and gets
+        202 with the entry.
+        """
+        return book_event(self.get_object(), request.data)
+    
+    @action(detail=True, methods=['post'])
+    def book_group(self, request, pk=None):
+        """
+        Book many customers onto an event in one request.
+        
+        Body: ``{"bookings": [{"customer_id", "number_of_guests", "notes"}, ...],
+        "partial": false, "notes": "..."}``. Without ``partial`` nothing is
+        booked unless every entry is valid and fits; with it, the entries
+        that fit are booked and the rest are reported in ``rejected``.
+        """
         event = self.get_object()
-        customer_id = request.data.get('customer_id')
-        number_of_guests = request.data.get('number_of_guests', 1)
+        entries = request.data.get('bookings')
         
-        if not customer_id:
-            return Response({'error': 'Customer ID is required'}, 
+        if not isinstance(entries, list) or not entries:
+            return Response({'error': 'bookings must be a non-empty list'}, 
+                           status=status.HTTP_400_BAD_REQUEST)
+        if len(entries) > MAX_GROUP_BOOKINGS:
+            return Response({'error': f'At most {MAX_GROUP_BOOKINGS} bookings per request'}, 
                            status=status.HTTP_400_BAD_REQUEST)
         
-        # Check if event has available spots
-        if event.available_spots < number_of_guests:
-            return Response({'error': 'Not enough available spots'}, 
+        partial = str(request.data.get('partial', '')).lower() == 'true'
+        try:
+            bookings, rejected = reserve_group(event, entries, partial=partial, notes=request.data.get('notes'))
+        except ReservationError as e:
+            return Response({'error': str(e), 'rejected': e.rejected}, 
                            status=status.HTTP_400_BAD_REQUEST)
         
-        # Create booking
-        total_price = event.price * number_of_guests
-        booking = EventBooking.objects.create(
-            event=event,
-            customer_id=customer_id,
-            number_of_guests=number_of_guests,
-            total_price=total_price
+        from customer_management.models import Customer
+        customers = Customer.objects.in_bulk({booking.customer_id for booking in bookings})
+        for booking in bookings:
+            booking.event = event
+            booking.customer = customers[booking.customer_id]
+        return Response({
+            'guests_booked': sum(booking.number_of_guests for booking in bookings),
+            'bookings': EventBookingSerializer(bookings, many=True).data,
+            'rejected': rejected
+        }, status=status.HTTP_201_CREATED if bookings else status.HTTP_200_OK)
+    
+    @action(detail=True, methods=['get'])
+    def waitlist(self, request, pk=None):
+        """Waiting entries of an event in queue order"""
+        event = self.get_object()
+        entries = event.waitlist.filter(status='Waiting').select_related('customer').order_by('created_at', 'id')
+        
+        return Response({
+            'waiting': entries.count(),
+            'guests_waiting': entries.aggregate(total=models.Sum('number_of_guests'))['total'] or 0,
+            'entries': WaitlistEntrySerializer(entries[:MAX_WAITLIST_ENTRIES], many=True).data
+        })
+    
+    @action(detail=True, methods=['post'])
+    def promote(self, request, pk=None):
+        """Book waiting customers onto free spots now, in queue order"""
+        event = self.get_object()
+        bookings = promote_waitlist(event.pk)
+        
+        return Response({
+            'promoted': len(bookings),
+            'guests_booked': sum(booking.number_of_guests for booking in bookings),
+            'bookings': [booking.pk for booking in bookings]
+        })
+    
+    @action(detail=False, methods=['get'])
+    def calendar(self, request):
+        """
+        Events running in a range of days with a per-day occupancy grid.
+        
+        ``?month=YYYY-MM`` (default: this month) or ``?start=YYYY-MM-DD&end=YYYY-MM-DD``
+        (inclusive, at most 92 days), including occurrences of recurring series
+        (``id`` null until booked). ``type`` and ``active`` filter the events;
+        ``free_slots`` lists the gaps of at least ``?min_free_hours=`` (default 1,
+        above 0 and at most the longest range) during which none of them is
+        running.
+        """
+        try:
+            if request.query_params.get('start') or request.query_params.get('end'):
+                first_day = date.fromisoformat(request.query_params.get('start', ''))
+                last_day = date.fromisoformat(request.query_params.get('end', ''))
+            else:
+                month = request.query_params.get('month') or timezone.localdate().strftime('%Y-%m')
+                year, month = (int(part) for part in month.split('-'))
+                first_day = date(year, month, 1)
+                last_day = date(year, month, monthrange(year, month)[1])
+            min_free_hours = float(request.query_params.get('min_free_hours', 1))
+            # nan, inf and gaps longer than any range would break timedelta
+            if not math.isfinite(min_free_hours) or not 0 < min_free_hours <= MAX_CALENDAR_DAYS * 24:
+                raise ValueError(min_free_hours)
+        except ValueError:
+            return Response({'error': 'Invalid month, start, end or min_free_hours'}, 
+                           status=status.HTTP_400_BAD_REQUEST)
+        
+        if last_day < first_day or (last_day - first_day).days >= MAX_CALENDAR_DAYS:
+            return Response({'error': f'The range must cover 1 to {MAX_CALENDAR_DAYS} days'}, 
+                           status=status.HTTP_400_BAD_REQUEST)
+        
+        start = day_start(first_day)
+        end = day_start(last_day + timedelta(days=1))
+        fields = ['id', 'title', 'event_type', 'start_date', 'end_date', 'capacity', 'current_bookings', 'series']
+        events = list(
+            overlapping_events(self.get_queryset(), start, end)
+            .order_by('start_date', 'id')
+            .values(*fields)
+        )
+        # Occurrences of recurring series not stored as events yet
+        events.extend(
+            {field: row[field] for field in fields}
+            for row in expand_series(self.series_queryset(), start, end)
         )
+        events.sort(key=lambda row: row['start_date'])
         
-        # Update event bookings count
-        event.current_bookings += number_of_guests
-        event.save()
+        return Response({
+            'start': first_day,
+            'end': last_day,
+            'days': occupancy_grid(events, first_day, last_day),
+            'free_slots': free_slots(events, start, end, timedelta(hours=min_free_hours)),
+            'events': events
+        })
+    
+    @action(detail=True, methods=['get'])
+    def overlapping(self, request, pk=None):
+        """Other events running at the same time as this one"""
+        event = self.get_object()
+        events = overlapping_events(Event.objects.exclude(pk=event.pk), event.start_date, event.end_date)
         
-        serializer = EventBookingSerializer(booking)
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
+        serializer = self.get_serializer(self.sparse_queryset(events), many=True)
+        return Response(serializer.data)
 
-class EventBookingViewSet(viewsets.ModelViewSet):
+class EventBookingViewSet(SparseFieldsetMixin, viewsets.ModelViewSet):
     """ViewSet for EventBooking model"""
     
     queryset = EventBooking.objects.all()
     serializer_class = EventBookingSerializer
     permission_classes = [AllowAny]  # Temporarily allow unauthenticated access for development
+    pagination_class = OptionalKeysetPagination
+    keyset_ordering = '-booking_date'
+    
+    def get_serializer_class(self):
+        if self.action == 'create':
+            return EventBookingCreateSerializer
+        return EventBookingSerializer
     
     def get_queryset(self):
         """Filter bookings based on query parameters"""
@@ -177,4 +462,197 @@ class EventBookingViewSet(viewsets.ModelViewSet):
         if status_filter:
             queryset = queryset.filter(status=status_filter)
         
-        return queryset
\ No newline at end of file
+        return queryset
+    
+    def perform_create(self, serializer):
+        """Book through ``reserve`` so the spots are claimed; status and total_price are not taken from the request"""
+        data = serializer.validated_data
+        try:
+            serializer.instance = reserve(
+                data['event'],
+                data['customer'].pk,
+                data.get('number_of_guests', 1),
+                notes=data.get('notes'),
+            )
+        except ReservationError as e:
+            raise ValidationError({'error': str(e)})
+    
+    def perform_update(self, serializer):
+        booking = serializer.instance
+        for field in ('event', 'number_of_guests'):
+            if field in serializer.validated_data and serializer.validated_data[field] != getattr(booking, field):
+                raise ValidationError({field: 'Cancel the booking and book again to change it'})
+        new_status = serializer.validated_data.get('status', booking.status)
+        if booking.status == 'Cancelled' and new_status != 'Cancelled':
+            raise ValidationError({'status': 'A cancelled booking cannot be reinstated; book the event again'})
+        if new_status == 'Cancelled' and booking.status != 'Cancelled':
+            # Cancelling goes through cancel_bookings so the spots are given back
+            serializer.validated_data.pop('status')
+            serializer.save()
+            self._cancel(booking)
+            return
+        serializer.save()
+    
+    def perform_destroy(self, instance):
+        # The spots of a live booking go back to the event (and its waitlist)
+        with transaction.atomic():
+            cancel_bookings(EventBooking.objects.filter(pk=instance.pk))
+            instance.delete()
+    
+    def _cancel(self, booking):
+        released = cancel_bookings(EventBooking.objects.filter(pk=booking.pk))
+        booking.refresh_from_db(fields=['status', 'cancelled_at'])
+        return released
+    
+    @action(detail=True, methods=['post'])
+    def cancel(self, request, pk=None):
+        """Cancel a booking and give its spots back to the event"""
+        booking = self.get_object()
+        if booking.status == 'Cancelled':
+            return Response({'error': 'Booking is already cancelled'}, 
+                           status=status.HTTP_400_BAD_REQUEST)
+        
+        self._cancel(booking)
+        
+        serializer = self.get_serializer(booking)
+        return Response(serializer.data)
+    
+    @action(detail=False, methods=['post'])
+    def bulk_cancel(self, request):
+        """
+        Cancel many bookings at once and give their spots back.
+        
+        Body: any of ``ids``, ``event_id`` and ``customer_id`` (combined with
+        AND), e.g. ``{"event_id": ...}`` for every booking of an event.
+        Bookings already cancelled are left alone.
+        """
+        ids = request.data.get('ids')
+        event_id = request.data.get('event_id')
+        customer_id = request.data.get('customer_id')
+        if not (ids or event_id or customer_id):
+            return Response({'error': 'ids, event_id or customer_id is required'}, 
+                           status=status.HTTP_400_BAD_REQUEST)
+        
+        bookings = EventBooking.objects.all()
+        try:
+            if ids:
+                if not isinstance(ids, list) or len(ids) > MAX_BULK_CANCEL_IDS:
+                    return Response({'error': f'ids must be a list of at most {MAX_BULK_CANCEL_IDS} booking ids'}, 
+                                   status=status.HTTP_400_BAD_REQUEST)
+                bookings = bookings.filter(pk__in=[uuid.UUID(str(value)) for value in ids])
+            if event_id:
+                bookings = bookings.filter(event_id=uuid.UUID(str(event_id)))
+            if customer_id:
+                bookings = bookings.filter(customer_id=uuid.UUID(str(customer_id)))
+        except ValueError:
+            return Response({'error': 'Ids must be UUIDs'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        released = cancel_bookings(bookings)
+        return Response({
+            'events': len(released),
+            'guests_released': sum(released.values()),
+            'released': [{'event_id': event_id, 'guests': guests} for event_id, guests in released.items()]
+        })
+
+class WaitlistEntryViewSet(SparseFieldsetMixin, viewsets.ModelViewSet):
+    """ViewSet for WaitlistEntry model"""
+    
+    queryset = WaitlistEntry.objects.all()
+    serializer_class = WaitlistEntrySerializer
+    permission_classes = [AllowAny]  # Temporarily allow unauthenticated access for development
+    http_method_names = ['get', 'post', 'delete', 'head', 'options']
+    
+    def get_queryset(self):
+        """Filter waitlist entries based on query parameters"""
+        queryset = WaitlistEntry.objects.all()
+        
+        # Filter by event
+        event_id = self.request.query_params.get('event_id', None)
+        if event_id:
+            queryset = queryset.filter(event_id=event_id)
+        
+        # Filter by customer
+        customer_id = self.request.query_params.get('customer_id', None)
+        if customer_id:
+            queryset = queryset.filter(customer_id=customer_id)
+        
+        # Filter by status
+        status_filter = self.request.query_params.get('status', None)
+        if status_filter:
+            queryset = queryset.filter(status=status_filter)
+        
+        return queryset.order_by('created_at', 'id')
+
+class EventSeriesViewSet(SparseFieldsetMixin, viewsets.ModelViewSet):
+    """ViewSet for EventSeries model"""
+    
+    queryset = EventSeries.objects.all()
+    serializer_class = EventSeriesSerializer
+    permission_classes = [AllowAny]  # Temporarily allow unauthenticated access for development
+    
+    def get_queryset(self):
+        """Filter series based on query parameters"""
+        queryset = EventSeries.objects.all()
+        
+        # Filter by event type
+        event_type = self.request.query_params.get('type', None)
+        if event_type:
+            queryset = queryset.filter(event_type=event_type)
+        
+        # Filter by active status
+        is_active = self.request.query_params.get('active', None)
+        if is_active is not None:
+            queryset = queryset.filter(is_active=is_active.lower() == 'true')
+        
+        return queryset
+    
+    @action(detail=True, methods=['get'])
+    def occurrences(self, request, pk=None):
+        """
+        Occurrences between ``?start=`` and ``?end=`` (default: the next 30 days).
+        
+        Booked occurrences are stored events and carry their ``id``; the
+        others have ``id`` null.
+        """
+        series = self.get_object()
+        try:
+            start = parse_datetime_param(request.query_params.get('start') or timezone.now().isoformat())
+            end = (parse_datetime_param(request.query_params['end']) if request.query_params.get('end')
+                   else start + timedelta(days=30))
+        except (TypeError, ValueError, DjangoValidationError):
+            return Response({'error': 'Invalid start or end'}, status=status.HTTP_400_BAD_REQUEST)
+        if end <= start or end - start > timedelta(days=MAX_CALENDAR_DAYS):
+            return Response({'error': f'The range must cover 1 to {MAX_CALENDAR_DAYS} days'}, 
+                           status=status.HTTP_400_BAD_REQUEST)
+        
+        stored = overlapping_events(series.occurrences.all(), start, end)
+        rows = list(EventSerializer(stored, many=True).data) + list(
+            OccurrenceSerializer(expand_series(EventSeries.objects.filter(pk=series.pk), start, end), many=True).data
+        )
+        rows.sort(key=lambda row: row['start_date'])
+        return Response(rows)
+    
+    @action(detail=True, methods=['post'])
+    def book(self, request, pk=None):
+        """
+        Book one occurrence, given by ``occurrence_start``.
+        
+        The occurrence is stored as an event the first time it is booked;
+        the rest of the body is the same as for booking an event.
+        """
+        series = self.get_object()
+        if not request.data.get('customer_id'):
+            return Response({'error': 'Customer ID is required'}, 
+                           status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            occurrence_start = parse_datetime_param(request.data.get('occurrence_start'))
+            event = materialize(series, occurrence_start)
+        except (TypeError, DjangoValidationError):
+            return Response({'error': 'occurrence_start must be a datetime'}, 
+                           status=status.HTTP_400_BAD_REQUEST)
+        except ValueError as e:
+            return Response({'error': str(e)}, 
+                           status=status.HTTP_400_BAD_REQUEST)
+        
+        return book_event(event, request.data)
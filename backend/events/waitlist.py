@@ -0,0 +1,129 @@
+"""
+Event waitlists.
+
+A customer who cannot get spots on a full event joins its waitlist, and
+entries are served first come first served whenever spots free up (a
+booking is cancelled or the capacity is raised).
+
+Promotion reads the head of the queue through the ``waitlist_queue_idx``
+index, so the cost depends on how many entries are promoted and not on how
+many are waiting. The entries that fit into the free spots (in queue
+order, skipping a party too large for what is left) are then admitted in
+one transaction: one conditional UPDATE claims their combined spots, one
+UPDATE marks them promoted and the bookings are inserted with one
+``bulk_create``. If a concurrent booking or promotion got there first the
+transaction is rolled back and the queue is read again.
+"""
+import uuid
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import Event, EventBooking, WaitlistEntry
+from .reservations import ReservationError, claim_spots
+
+# Entries read from the head of the queue per promotion round
+PROMOTION_BATCH = 500
+
+# How often a promotion re-reads the queue after losing a race
+PROMOTION_ATTEMPTS = 5
+
+
+class _Conflict(Exception):
+    pass
+
+
+def join_waitlist(event, customer_id, number_of_guests=1, notes=None):
+    """Put a customer at the back of the event's waitlist; return the entry"""
+    if number_of_guests < 1:
+        raise ReservationError('Number of guests must be at least 1')
+    if number_of_guests > event.capacity:
+        raise ReservationError('Number of guests exceeds the event capacity')
+
+    try:
+        with transaction.atomic():
+            return WaitlistEntry.objects.create(
+                event=event,
+                customer_id=customer_id,
+                number_of_guests=number_of_guests,
+                notes=notes,
+            )
+    except (IntegrityError, ValidationError):
+        raise ReservationError('Customer not found')
+
+
+def waiting_entries(event_id):
+    """An event's waiting entries in queue order"""
+    return WaitlistEntry.objects.filter(event_id=event_id, status='Waiting').order_by('created_at', 'id')
+
+
+def _promote_round(event_id):
+    """Admit the entries that fit now; return their bookings (empty when none fit)"""
+    row = (
+        Event.objects.filter(pk=event_id, is_active=True)
+        .values_list('capacity', 'current_bookings', 'price')
+        .first()
+    )
+    if row is None:
+        return []
+    capacity, current_bookings, price = row
+    free = capacity - current_bookings
+    if free <= 0:
+        return []
+
+    admitted = []
+    for entry in waiting_entries(event_id).only('id', 'customer_id', 'number_of_guests', 'notes')[:PROMOTION_BATCH]:
+        if entry.number_of_guests <= free:
+            admitted.append(entry)
+            free -= entry.number_of_guests
+            if not free:
+                break
+    if not admitted:
+        return []
+
+    now = timezone.now()
+    bookings = []
+    for entry in admitted:
+        entry.booking = EventBooking(
+            id=uuid.uuid4(),
+            event_id=event_id,
+            customer_id=entry.customer_id,
+            number_of_guests=entry.number_of_guests,
+            total_price=price * entry.number_of_guests,
+            notes=entry.notes,
+        )
+        bookings.append(entry.booking)
+
+    with transaction.atomic():
+        if not claim_spots(event_id, sum(entry.number_of_guests for entry in admitted)):
+            raise _Conflict
+        promoted = WaitlistEntry.objects.filter(
+            pk__in=[entry.pk for entry in admitted], status='Waiting'
+        ).update(status='Promoted', promoted_at=now)
+        if promoted != len(admitted):
+            raise _Conflict
+        EventBooking.objects.bulk_create(bookings)
+        WaitlistEntry.objects.bulk_update(admitted, ['booking'])
+    return bookings
+
+
+def promote_waitlist(event_id):
+    """
+    Turn waiting entries of an event into bookings while spots last.
+
+    Inactive events are skipped. Returns the new EventBookings in queue
+    order.
+    """
+    bookings = []
+    attempts = 0
+    while attempts < PROMOTION_ATTEMPTS:
+        try:
+            promoted = _promote_round(event_id)
+        except _Conflict:
+            attempts += 1
+            continue
+        if not promoted:
+            break
+        bookings.extend(promoted)
+    return bookings
@@ -0,0 +1,83 @@
+"""
+View mixins shared by the API apps.
+"""
+import hashlib
+from urllib.parse import urlencode
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from .serializers import SAFE_METHODS, DynamicFieldsMixin
+
+
+class SparseFieldsetMixin:
+    """
+    Load only what ``?fields=`` / ``?exclude=`` / ``?expand=`` ask for.
+
+    List and detail reads go through ``filter_queryset``; custom read
+    actions that build their own queryset call ``sparse_queryset``.
+    Columns used for keyset pagination are always loaded.
+    """
+
+    def filter_queryset(self, queryset):
+        return self.sparse_queryset(super().filter_queryset(queryset))
+
+    def sparse_queryset(self, queryset):
+        if self.request.method not in SAFE_METHODS:
+            return queryset
+        serializer = self.get_serializer()
+        if not isinstance(serializer, DynamicFieldsMixin):
+            return queryset
+        queryset = serializer.queryset_for(queryset)
+        ordering = getattr(self, 'keyset_ordering', None)
+        if ordering and queryset.query.deferred_loading[1] is False:
+            queryset = queryset.only(*queryset.query.deferred_loading[0], ordering.lstrip('-'))
+        return queryset
+
+
+class ConditionalGetMixin:
+    """
+    Answer repeated polls of a listing with 304 Not Modified.
+
+    ``conditional_response`` derives an ETag from the newest
+    ``updated_at`` and the row count of the querysets a response is built
+    from (one aggregate query each) together with the path and query
+    parameters, and only calls ``respond`` to serialize when the client's
+    ``If-None-Match`` does not match. A deleted row changes the count, so
+    it changes the ETag; ``Last-Modified`` is the newest ``updated_at`` and
+    cannot see deletions, so clients should prefer the ETag.
+
+    Writes that bypass ``save()`` must set ``updated_at`` themselves.
+    """
+
+    def conditional_response(self, querysets, respond, extra=None, stamps=()):
+        """
+        ``stamps`` are (newest updated_at, count) pairs already known to
+        the caller (e.g. from a cache), used like querysets without a query.
+        """
+        request = self.request
+        if request.method not in ('GET', 'HEAD'):
+            return respond()
+
+        stamps = list(stamps) + [
+            tuple(queryset.order_by().aggregate(last=Max('updated_at'), count=Count('pk')).values())
+            for queryset in querysets
+        ]
+        parts = [request.path, urlencode(sorted(request.query_params.lists()), doseq=True), str(extra or '')]
+        last_modified = None
+        for last, count in stamps:
+            parts.append(f"{last.isoformat() if last else ''}/{count}")
+            if last and (last_modified is None or last > last_modified):
+                last_modified = last
+
+        etag = '"%s"' % hashlib.md5('|'.join(parts).encode(), usedforsecurity=False).hexdigest()
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if response is None:
+            response = respond()
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            if timestamp is not None:
+                response['Last-Modified'] = http_date(timestamp)
+        return response
@@ -0,0 +1,127 @@
+"""
+Keyset (cursor) pagination.
+
+Page number pagination runs ``COUNT(*)`` and ``OFFSET`` on every request,
+so deep pages get slower the further a client scrolls. Keyset pagination
+remembers the last row of the previous page instead and asks for rows
+strictly after it, which is an index range scan whatever the depth.
+
+Views opt in by using ``OptionalKeysetPagination`` and naming the column
+they are ordered by in ``keyset_ordering``; ``id`` breaks ties. Clients
+keep getting page number pagination unless they send ``?pagination=cursor``
+or follow a ``cursor`` link, so they can migrate one screen at a time.
+"""
+import base64
+import binascii
+import json
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def encode_cursor(value, pk):
+    """Encode the position of a row as an opaque URL-safe token"""
+    payload = json.dumps([value.isoformat() if hasattr(value, 'isoformat') else value, str(pk)])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token, queryset, ordering):
+    """Turn a cursor token back into (value, pk), raising NotFound if it is invalid"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        value, pk = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        model = queryset.model
+        value = model._meta.get_field(ordering.lstrip('-')).to_python(value)
+        pk = model._meta.pk.to_python(pk)
+    except (TypeError, ValueError, binascii.Error, ValidationError):
+        raise NotFound('Invalid cursor')
+    return value, pk
+
+
+def keyset_page(queryset, ordering, page_size, cursor=None):
+    """
+    Return (rows, next_cursor) for one page of ``queryset``.
+
+    ``ordering`` is a single field name, optionally prefixed with ``-``;
+    rows are ordered by it and then by primary key in the same direction,
+    which the matching composite index serves without sorting.
+    """
+    field = ordering.lstrip('-')
+    descending = ordering.startswith('-')
+    queryset = queryset.order_by(ordering, '-pk' if descending else 'pk')
+
+    if cursor is not None:
+        value, pk = decode_cursor(cursor, queryset, ordering)
+        if descending:
+            after = Q(**{f'{field}__lte': value}) & (Q(**{f'{field}__lt': value}) | Q(pk__lt=pk))
+        else:
+            after = Q(**{f'{field}__gte': value}) & (Q(**{f'{field}__gt': value}) | Q(pk__gt=pk))
+        queryset = queryset.filter(after)
+
+    rows = list(queryset[:page_size + 1])
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, field), last.pk)
+    return rows, next_cursor
+
+
+class OptionalKeysetPagination(PageNumberPagination):
+    """Page number pagination with a per-request keyset mode"""
+
+    cursor_query_param = 'cursor'
+    mode_query_param = 'pagination'
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    def __init__(self):
+        self.page_size = settings.REST_FRAMEWORK.get('PAGE_SIZE', 20)
+        self.use_keyset = False
+
+    def get_page_size(self, request):
+        # Only keyset mode honours ?page_size=; page numbers keep PAGE_SIZE
+        if not self.use_keyset:
+            return self.page_size
+        return super().get_page_size(request)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        ordering = getattr(view, 'keyset_ordering', None)
+        self.use_keyset = ordering is not None and (
+            self.cursor_query_param in request.query_params or
+            request.query_params.get(self.mode_query_param) == 'cursor'
+        )
+        if not self.use_keyset:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        rows, self.next_cursor = keyset_page(
+            queryset,
+            ordering,
+            self.get_page_size(request),
+            request.query_params.get(self.cursor_query_param) or None,
+        )
+        return rows
+
+    def get_next_link(self):
+        if not self.use_keyset:
+            return super().get_next_link()
+        if self.next_cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.mode_query_param)
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        if not self.use_keyset:
+            return super().get_paginated_response(data)
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
@@ -0,0 +1,173 @@
+"""
+Sparse fieldsets and expansions for model serializers.
+
+``?fields=id,title`` keeps only the listed fields, ``?exclude=description``
+drops fields, and ``?expand=customer`` replaces a foreign key id with the
+related object, for any serializer using ``DynamicFieldsMixin``. The same
+options can be passed as keyword arguments when a serializer is built in
+code; query parameters are only read on GET requests so they never change
+what a write accepts.
+
+Trimming the output alone would still load every column, so
+``queryset_for`` works out which columns and relations the remaining
+fields read and turns that into ``only()``, ``select_related()`` and
+``prefetch_related()`` on the queryset (see ``hotel_backend.mixins``).
+"""
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from django.utils.module_loading import import_string
+from rest_framework import serializers
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def _split(value):
+    if value is None:
+        return None
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+class DynamicFieldsMixin:
+    """
+    Serializer mixin adding ``fields``, ``exclude`` and ``expand``.
+
+    ``Meta.expandable_fields`` maps a field name to the serializer that
+    replaces it when expanded, either a class or a dotted path (for
+    serializers in other apps), optionally with keyword arguments:
+    ``{'customer': 'customer_management.serializers.CustomerSerializer'}``
+    or ``{'bookings': (EventBookingSerializer, {'many': True})}``.
+
+    ``Meta.field_dependencies`` names the model fields that computed fields
+    (properties and methods) read, so they can still be projected:
+    ``{'is_full': ['capacity', 'current_bookings']}``. A computed field
+    without dependencies makes the serializer load every column.
+    """
+
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        exclude = kwargs.pop('exclude', None)
+        expand = kwargs.pop('expand', None)
+        super().__init__(*args, **kwargs)
+
+        request = self.context.get('request')
+        if fields is None and exclude is None and expand is None and request is not None \
+                and request.method in SAFE_METHODS:
+            fields = _split(request.query_params.get('fields'))
+            exclude = _split(request.query_params.get('exclude'))
+            expand = _split(request.query_params.get('expand'))
+
+        expandable = getattr(self.Meta, 'expandable_fields', {})
+        for name in expand or ():
+            if name in expandable and (not fields or name in fields):
+                self.fields[name] = self._expanded_field(name, expandable[name])
+
+        if fields:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+        for name in exclude or ():
+            self.fields.pop(name, None)
+
+    def _expanded_field(self, name, spec):
+        serializer_class, options = spec if isinstance(spec, tuple) else (spec, {})
+        if isinstance(serializer_class, str):
+            serializer_class = import_string(serializer_class)
+        source = self.fields[name].source if name in self.fields else name
+        options = {'read_only': True, **options}
+        if source != name:
+            options['source'] = source
+        return serializer_class(**options)
+
+    def queryset_for(self, queryset):
+        """Restrict ``queryset`` to what the current fields read"""
+        columns, select, prefetch = self.projection(queryset.model)
+        if select:
+            queryset = queryset.select_related(*select)
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+        if columns is not None:
+            queryset = queryset.only(*columns)
+        return queryset
+
+    def projection(self, model, prefix=''):
+        """
+        Return (columns, select_related, prefetches) for ``model``.
+
+        ``columns`` is None when some field cannot be traced back to
+        model columns and every column has to be loaded.
+        """
+        columns = {prefix + model._meta.pk.name}
+        select = set()
+        prefetch = []
+        dependencies = getattr(self.Meta, 'field_dependencies', {})
+
+        for name, field in self.fields.items():
+            if field.write_only:
+                continue
+            if name in dependencies:
+                if columns is not None:
+                    columns.update(prefix + column for column in dependencies[name])
+                continue
+            if isinstance(field, serializers.BaseSerializer):
+                nested = field.child if isinstance(field, serializers.ListSerializer) else field
+                try:
+                    relation = model._meta.get_field(field.source)
+                except FieldDoesNotExist:
+                    columns = None
+                    continue
+                if not relation.is_relation or not isinstance(nested, DynamicFieldsMixin):
+                    columns = None
+                elif relation.many_to_many or relation.one_to_many:
+                    prefetch.append(nested._prefetch(prefix + field.source, relation))
+                else:
+                    nested_columns, nested_select, nested_prefetch = nested.projection(
+                        relation.related_model, prefix + field.source + '__')
+                    select.add(prefix + field.source)
+                    select.update(nested_select)
+                    prefetch.extend(nested_prefetch)
+                    columns = None if columns is None or nested_columns is None else columns | nested_columns
+                continue
+            if field.source == '*':
+                columns = None
+                continue
+
+            path = self._trace(model, field.source_attrs)
+            if path is None:
+                columns = None
+                continue
+            related_path, column = path
+            if related_path:
+                select.add(prefix + '__'.join(related_path))
+            if columns is not None:
+                columns.add(prefix + '__'.join(related_path + [column]))
+
+        return columns, select, prefetch
+
+    def _prefetch(self, lookup, relation):
+        """Prefetch for a to-many relation serialized by this serializer"""
+        columns, select, prefetch = self.projection(relation.related_model)
+        queryset = relation.related_model._default_manager.select_related(*select).prefetch_related(*prefetch)
+        if columns is not None:
+            if relation.one_to_many:
+                # Prefetched rows are matched back on their foreign key
+                columns.add(relation.field.name)
+            queryset = queryset.only(*columns)
+        return Prefetch(lookup, queryset=queryset)
+
+    @staticmethod
+    def _trace(model, attrs):
+        """Map a field source to (relations to join, column), or None"""
+        related_path = []
+        for position, attr in enumerate(attrs):
+            try:
+                model_field = model._meta.get_field(attr)
+            except FieldDoesNotExist:
+                return None
+            if position == len(attrs) - 1:
+                if model_field.many_to_many or model_field.one_to_many:
+                    return None
+                return related_path, attr
+            if not model_field.is_relation or model_field.many_to_many or model_field.one_to_many:
+                return None
+            related_path.append(attr)
+            model = model_field.related_model
+        return None
@@ -97,6 +97,24 @@ else:
         'default': {
             'ENGINE': 'django.db.backends.sqlite3',
             'NAME': BASE_DIR / 'db.sqlite3',
+            # Wait for concurrent writers (e.g. a booking rush) instead of failing
+            'OPTIONS': {'timeout': 20},
+        }
+    }
+
+
+# Cache (active offers); processes only share it through Redis
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
         }
     }
 
@@ -125,7 +143,9 @@ AUTH_PASSWORD_VALIDATORS = [
 
 LANGUAGE_CODE = 'en-us'
 
-TIME_ZONE = 'UTC'
+# The hotel's local time zone; offers start and end at its midnight.
+# Run `manage.py rebuild_event_days` after changing it
+TIME_ZONE = os.getenv('TIME_ZONE', 'UTC')
 
 USE_I18N = True
 
@@ -189,6 +209,9 @@ MESSAGEBIRD_API_KEY = os.getenv('MESSAGEBIRD_API_KEY', '')
 # For development/testing, you can use a mock service
 WHATSAPP_MOCK_MODE = os.getenv('WHATSAPP_MOCK_MODE', 'True').lower() == 'true'
 
+# Country code assumed for phone numbers entered without one
+PHONE_DEFAULT_COUNTRY_CODE = os.getenv('PHONE_DEFAULT_COUNTRY_CODE', '1')
+
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/5.0/howto/static-files/
 
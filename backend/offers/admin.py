@@ -3,8 +3,8 @@ from .models import Offer, OfferUsage
 
 @admin.register(Offer)
 class OfferAdmin(admin.ModelAdmin):
-    list_display = ['title', 'offer_type', 'discount_value', 'status', 'valid_from', 'valid_to', 'current_usage']
-    list_filter = ['offer_type', 'status', 'valid_from', 'valid_to']
+    list_display = ['title', 'offer_type', 'discount_value', 'stackable', 'status', 'valid_from', 'valid_to', 'current_usage']
+    list_filter = ['offer_type', 'stackable', 'status', 'valid_from', 'valid_to']
     search_fields = ['title', 'description']
     readonly_fields = ['id', 'current_usage', 'created_at', 'updated_at']
     ordering = ['-created_at']
@@ -0,0 +1,92 @@
+"""
+Cached active-offer set.
+
+The offers valid on a day only change when that day ends or an offer (or
+its usage count) is written, so ``/api/offers/offers/active/`` serves
+them from the cache instead of querying and serializing them per request.
+
+Entries are keyed by the hotel's local date (``TIME_ZONE``) and a version
+number, and expire at the next local midnight, so the set rolls over to
+the new day on its own. Writes bump the version (``bump_version``, called
+from the Offer/OfferUsage signals and by code that writes with
+``update()``) once their transaction commits, which makes every cached
+set stale at once without having to know its keys.
+
+With the default local-memory cache each process keeps its own set and
+only sees bumps made in that process; deployments running several
+processes should configure a shared cache (``REDIS_URL``).
+"""
+import time
+from datetime import datetime, timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from .models import Offer
+
+VERSION_KEY = 'offers:active:version'
+
+
+def _new_version():
+    # Started from the clock so a version lost with the cache never
+    # reuses the key of an older set
+    return time.time_ns()
+
+
+def current_version():
+    return cache.get_or_set(VERSION_KEY, _new_version, timeout=None)
+
+
+def bump_version():
+    """Make every cached active-offer set stale"""
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, _new_version(), timeout=None)
+
+
+def bump_on_commit():
+    """Bump the version once the current transaction commits"""
+    transaction.on_commit(bump_version)
+
+
+def active_queryset(today=None):
+    """Offers valid on ``today`` (the local date by default)"""
+    today = today or timezone.localdate()
+    return Offer.objects.filter(
+        status='active',
+        valid_from__lte=today,
+        valid_to__gte=today
+    )
+
+
+def _seconds_to_midnight(now=None):
+    now = timezone.localtime(now)
+    midnight = timezone.make_aware(datetime.combine(now.date() + timedelta(days=1), datetime.min.time()))
+    return max(1, int((midnight - now).total_seconds()) + 1)
+
+
+def active_offers(build, today=None):
+    """
+    The active-offer set of ``today`` as a dict with the serialized
+    ``rows`` and their ``last_modified`` and ``count`` (for validators).
+
+    ``build(queryset)`` serializes the set on a miss.
+    """
+    today = today or timezone.localdate()
+    # The version is read before the offers, so a write committed in
+    # between leaves this set under a version that is already stale
+    key = f'offers:active:{today.isoformat()}:{current_version()}'
+    entry = cache.get(key)
+    if entry is None:
+        queryset = active_queryset(today)
+        stats = queryset.order_by().aggregate(last=Max('updated_at'), count=Count('pk'))
+        entry = {
+            'rows': build(queryset),
+            'last_modified': stats['last'],
+            'count': stats['count'],
+        }
+        cache.set(key, entry, timeout=_seconds_to_midnight())
+    return entry
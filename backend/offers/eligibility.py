@@ -0,0 +1,71 @@
+"""
+Offer eligibility.
+
+A customer can use an offer that is active, valid today, has uses left
+and that they have not used before. All of it is answered by the
+database: the validity and ``max_usage`` predicates filter the offers,
+and a ``NOT EXISTS`` subquery on ``OfferUsage`` (served by the
+``(customer, offer)`` index) drops the ones the customer already used.
+
+For many customers at once, ``eligibility_batch`` reads the usable offers
+once and then asks, per chunk of customers, one query with a ``NOT
+EXISTS`` column per offer, so the work is a few index probes per customer
+and offer and no rows are loaded for usages at all.
+"""
+from django.db.models import Exists, F, OuterRef, Q
+
+from .cache import active_queryset
+from .models import OfferUsage
+
+# Customers per batch query (SQLite accepts 32766 parameters)
+CUSTOMER_CHUNK = 10000
+
+# NOT EXISTS columns per batch query
+OFFER_CHUNK = 50
+
+# Customers accepted by one eligibility request
+MAX_ELIGIBILITY_CUSTOMERS = 100000
+
+
+def usable_offers(today=None):
+    """Offers valid on ``today`` with uses left"""
+    return active_queryset(today).filter(Q(max_usage__isnull=True) | Q(current_usage__lt=F('max_usage')))
+
+
+def _used(customer, offer):
+    return Exists(OfferUsage.objects.filter(customer_id=customer, offer_id=offer))
+
+
+def eligible_offers(customer_id, today=None):
+    """Offers ``customer_id`` can use on ``today`` (none for an unknown customer), as one query"""
+    from customer_management.models import Customer
+
+    return usable_offers(today).filter(
+        Exists(Customer.objects.filter(pk=customer_id)),
+        ~_used(customer_id, OuterRef('pk')),
+    )
+
+
+def eligibility_batch(customer_ids, today=None):
+    """
+    Offers each customer can use on ``today``.
+
+    Returns (offer ids, {customer_id: [offer_id, ...]}); customers that do
+    not exist are left out of the dict.
+    """
+    from customer_management.models import Customer
+
+    offer_ids = list(usable_offers(today).values_list('pk', flat=True))
+    customer_ids = list(dict.fromkeys(customer_ids))
+    eligible = {}
+    for start in range(0, len(customer_ids), CUSTOMER_CHUNK):
+        chunk = Customer.objects.filter(pk__in=customer_ids[start:start + CUSTOMER_CHUNK])
+        if not offer_ids:
+            eligible.update((pk, []) for pk in chunk.values_list('pk', flat=True))
+            continue
+        for offset in range(0, len(offer_ids), OFFER_CHUNK):
+            offers = offer_ids[offset:offset + OFFER_CHUNK]
+            columns = {f'eligible_{index}': ~_used(OuterRef('pk'), pk) for index, pk in enumerate(offers)}
+            for pk, *flags in chunk.annotate(**columns).values_list('pk', *columns):
+                eligible.setdefault(pk, []).extend(offer for offer, flag in zip(offers, flags) if flag)
+    return offer_ids, eligible
@@ -0,0 +1,55 @@
+"""
+Offer expiry sweep.
+
+Offers do not change status by themselves when their last day passes or
+their last use is taken, so ``sweep_offers`` moves them in bulk, with one
+UPDATE per transition:
+
+* ``active`` or ``exhausted`` offers past ``valid_to`` become ``expired``;
+* ``active`` offers at ``max_usage`` become ``exhausted``;
+* ``exhausted`` offers with uses left again (``max_usage`` was raised)
+  become ``active``.
+
+Inactive offers are left alone. Redemptions mark an offer exhausted as
+soon as they take its last use and ``Offer.save`` reactivates it when
+``max_usage`` is raised, so the sweep mostly handles expiry. No read
+depends on it having run (validity is still checked against the dates).
+Run it with ``manage.py sweep_offers``, e.g. from cron shortly after
+midnight. Reads that report expired offers use ``expired_filter``, which
+counts an offer as expired once its last day has passed, swept or not.
+"""
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .cache import bump_on_commit
+from .models import Offer
+
+
+def expired_filter(today=None):
+    """Offers marked expired or past ``valid_to``, whether or not the sweep has run"""
+    return Q(status='expired') | Q(valid_to__lt=today or timezone.localdate())
+
+
+def sweep_offers(today=None):
+    """Apply the status transitions due on ``today``; return the count of each"""
+    today = today or timezone.localdate()
+    now = timezone.now()
+    with transaction.atomic():
+        counts = {
+            'expired': Offer.objects.filter(
+                status__in=['active', 'exhausted'], valid_to__lt=today
+            ).update(status='expired', updated_at=now),
+            'exhausted': Offer.objects.filter(
+                status='active', max_usage__isnull=False, current_usage__gte=F('max_usage')
+            ).update(status='exhausted', updated_at=now),
+            'reactivated': Offer.objects.filter(
+                Q(max_usage__isnull=True) | Q(current_usage__lt=F('max_usage')),
+                status='exhausted',
+            ).update(status='active', updated_at=now),
+        }
+        if any(counts.values()):
+            # update() sends no signals
+            bump_on_commit()
+    return counts
+
@@ -0,0 +1,116 @@
+import threading
+import time
+import uuid
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, connections
+from django.utils import timezone
+
+from customer_management.models import Customer
+from offers.models import Offer, OfferUsage
+from offers.redemption import AlreadyRedeemed, OfferExhausted, redeem
+
+
+class Command(BaseCommand):
+    help = 'Rush a temporary offer with concurrent redemptions and check it is never over-redeemed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=16,
+                            help='Number of concurrent redeeming clients (threads)')
+        parser.add_argument('--customers', type=int, default=3000,
+                            help='Customers trying to redeem the offer')
+        parser.add_argument('--max-usage', type=int, default=2000,
+                            help='max_usage of the benchmark offer')
+        parser.add_argument('--repeats', type=int, default=2,
+                            help='Times each customer submits the redemption (repeats must be rejected)')
+        parser.add_argument('--no-wal', action='store_true',
+                            help='Leave the SQLite journal mode alone instead of switching to WAL')
+        parser.add_argument('--keep', action='store_true',
+                            help='Keep the benchmark offer, customers and usages afterwards')
+
+    def handle(self, *args, **options):
+        if connection.vendor == 'sqlite' and not options['no_wal']:
+            with connection.cursor() as cursor:
+                cursor.execute('PRAGMA journal_mode=WAL')
+                self.stdout.write(f'SQLite journal mode: {cursor.fetchone()[0]}')
+
+        today = timezone.localdate()
+        offer = Offer.objects.create(
+            title='Redemption benchmark',
+            description='Temporary offer created by benchmark_redemptions',
+            offer_type='fixed',
+            discount_value=5,
+            valid_from=today - timedelta(days=1),
+            valid_to=today + timedelta(days=1),
+            max_usage=options['max_usage'],
+        )
+        run = uuid.uuid4().hex[:8]
+        customers = Customer.objects.bulk_create([
+            Customer(
+                name=f'Benchmark redeemer {i}',
+                phone=f'+1556{run[:3]}{i:05d}',
+                birth_date=today,
+            )
+            for i in range(options['customers'])
+        ])
+
+        stats = {'redeemed': 0, 'duplicates': 0, 'exhausted': 0, 'errors': 0}
+        lock = threading.Lock()
+
+        def client(batch):
+            counts = dict.fromkeys(stats, 0)
+            try:
+                for customer in batch:
+                    for _ in range(options['repeats']):
+                        try:
+                            redeem(offer, customer.pk)
+                            counts['redeemed'] += 1
+                        except AlreadyRedeemed:
+                            counts['duplicates'] += 1
+                        except OfferExhausted:
+                            counts['exhausted'] += 1
+                        except OperationalError:
+                            counts['errors'] += 1
+            finally:
+                connections.close_all()
+                with lock:
+                    for key, value in counts.items():
+                        stats[key] += value
+
+        clients = max(1, options['clients'])
+        threads = [threading.Thread(target=client, args=(customers[i::clients],)) for i in range(clients)]
+        started = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - started
+
+        offer.refresh_from_db()
+        usages = OfferUsage.objects.filter(offer=offer).count()
+        attempts = sum(stats.values())
+        broken = (
+            offer.current_usage > offer.max_usage
+            or usages != offer.current_usage
+            or stats['redeemed'] != usages
+            or usages != min(offer.max_usage, len(customers))
+        )
+
+        self.stdout.write(
+            f"{connection.vendor}: {clients} clients, {attempts} attempts in {elapsed:.2f}s "
+            f"({attempts / elapsed:.0f} attempts/s), {stats['redeemed']} redeemed, "
+            f"{stats['duplicates']} duplicates and {stats['exhausted']} sold out rejected, "
+            f"{stats['errors']} database errors"
+        )
+        self.stdout.write(
+            f'max_usage {offer.max_usage}, current_usage {offer.current_usage}, usage rows {usages}'
+        )
+
+        if not options['keep']:
+            offer.delete()
+            Customer.objects.filter(pk__in=[customer.pk for customer in customers]).delete()
+
+        if broken:
+            raise CommandError('Offer was over-redeemed or its count drifted from the usages')
+        self.stdout.write(self.style.SUCCESS('No over-redemption'))
@@ -0,0 +1,17 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from offers.expiry import sweep_offers
+
+
+class Command(BaseCommand):
+    help = 'Mark offers past valid_to as expired and offers at max_usage as exhausted'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', type=date.fromisoformat,
+                            help='Sweep as of this date (YYYY-MM-DD) instead of today')
+
+    def handle(self, *args, **options):
+        counts = sweep_offers(options['date'])
+        self.stdout.write(', '.join(f'{transition}: {count}' for transition, count in counts.items()))
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.14 on 2026-10-18 05:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer_management', '0005_keyset_pagination_indexes'),
+        ('offers', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='offerusage',
+            index=models.Index(fields=['-used_at', '-id'], name='offer_usage_used_id_idx'),
+        ),
+    ]
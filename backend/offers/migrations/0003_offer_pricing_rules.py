@@ -0,0 +1,23 @@
+# Generated by Django 5.0.14 on 2026-10-18 05:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('offers', '0002_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='offer',
+            name='max_discount',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='offer',
+            name='stackable',
+            field=models.BooleanField(default=False),
+        ),
+    ]
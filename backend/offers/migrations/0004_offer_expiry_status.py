@@ -0,0 +1,38 @@
+# Generated by Django 5.0.14 on 2026-10-18 05:34
+
+from django.db import migrations, models
+from django.db.models import F, Q
+from django.utils import timezone
+
+
+def sweep_existing_offers(apps, schema_editor):
+    Offer = apps.get_model('offers', 'Offer')
+    Offer.objects.filter(status='active', valid_to__lt=timezone.localdate()).update(status='expired')
+    Offer.objects.filter(
+        status='active', max_usage__isnull=False, current_usage__gte=F('max_usage')
+    ).update(status='exhausted')
+
+
+def unsweep_offers(apps, schema_editor):
+    Offer = apps.get_model('offers', 'Offer')
+    Offer.objects.filter(status='exhausted').update(status='active')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('offers', '0003_offer_pricing_rules'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='offer',
+            name='status',
+            field=models.CharField(choices=[('active', 'Active'), ('inactive', 'Inactive'), ('exhausted', 'Exhausted'), ('expired', 'Expired')], default='active', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='offer',
+            index=models.Index(fields=['status', 'valid_to'], name='offer_status_valid_to_idx'),
+        ),
+        migrations.RunPython(sweep_existing_offers, unsweep_offers),
+    ]
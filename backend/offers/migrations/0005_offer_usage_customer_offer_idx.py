@@ -0,0 +1,18 @@
+# Generated by Django 5.0.14 on 2026-10-18 05:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer_management', '0007_customerprofile_updated_at'),
+        ('offers', '0004_offer_expiry_status'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='offerusage',
+            index=models.Index(fields=['customer', 'offer'], name='offer_usage_customer_offer_idx'),
+        ),
+    ]
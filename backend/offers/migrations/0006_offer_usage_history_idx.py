@@ -0,0 +1,18 @@
+# Generated by Django 5.0.14 on 2026-10-18 05:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer_management', '0007_customerprofile_updated_at'),
+        ('offers', '0005_offer_usage_customer_offer_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='offerusage',
+            index=models.Index(fields=['offer', '-used_at', '-id'], name='offer_usage_offer_used_idx'),
+        ),
+    ]
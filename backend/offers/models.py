@@ -13,6 +13,7 @@ class Offer(models.Model):
     STATUS_CHOICES = [
         ('active', 'Active'),
         ('inactive', 'Inactive'),
+        ('exhausted', 'Exhausted'),
         ('expired', 'Expired'),
     ]
     
@@ -21,6 +22,10 @@ class Offer(models.Model):
     description = models.TextField()
     offer_type = models.CharField(max_length=20, choices=OFFER_TYPES)
     discount_value = models.DecimalField(max_digits=10, decimal_places=2)
+    # Largest amount a percentage offer may take off one price
+    max_discount = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    # Stackable offers combine with each other; others only apply alone
+    stackable = models.BooleanField(default=False)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='active')
     valid_from = models.DateField()
     valid_to = models.DateField()
@@ -33,14 +38,27 @@ class Offer(models.Model):
         ordering = ['-created_at']
         verbose_name = 'Offer'
         verbose_name_plural = 'Offers'
+        indexes = [
+            # Status filters and counts, and the expiry sweep
+            models.Index(fields=['status', 'valid_to'], name='offer_status_valid_to_idx'),
+        ]
     
     def __str__(self):
         return f"{self.title} - {self.discount_value}{'%' if self.offer_type == 'percentage' else '$'}"
     
+    def save(self, *args, **kwargs):
+        # Raising max_usage (or dropping it) gives an exhausted offer its uses back
+        if self.status == 'exhausted' and (self.max_usage is None or self.current_usage < self.max_usage):
+            self.status = 'active'
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'max_usage', 'current_usage'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'status'}
+        super().save(*args, **kwargs)
+    
     @property
     def is_valid(self):
         from django.utils import timezone
-        today = timezone.now().date()
+        today = timezone.localdate()
         return self.valid_from <= today <= self.valid_to and self.status == 'active'
     
     @property
@@ -66,6 +84,13 @@ class OfferUsage(models.Model):
         verbose_name = 'Offer Usage'
         verbose_name_plural = 'Offer Usages'
         unique_together = ['offer', 'customer']  # Each customer can use an offer only once
+        indexes = [
+            models.Index(fields=['-used_at', '-id'], name='offer_usage_used_id_idx'),
+            # An offer's usage history and its summary
+            models.Index(fields=['offer', '-used_at', '-id'], name='offer_usage_offer_used_idx'),
+            # Eligibility checks look usages up by customer first
+            models.Index(fields=['customer', 'offer'], name='offer_usage_customer_offer_idx'),
+        ]
     
     def __str__(self):
         return f"{self.customer.name} used {self.offer.title}"
\ No newline at end of file
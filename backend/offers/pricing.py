@@ -0,0 +1,201 @@
+"""
+Offer pricing.
+
+Prices a booking (an event, a number of guests and a customer) with one or
+more offers:
+
+* A percentage offer takes its share of the price, rounded half up to the
+  cent and capped at ``max_discount``; a fixed offer takes its amount. No
+  offer takes more than what is left to pay.
+* Stackable offers combine: percentages apply first, then fixed amounts,
+  each on what the previous ones left. A non-stackable offer only applies
+  alone, so the best of "each non-stackable offer alone" and "all
+  stackable offers together" wins.
+
+``quote_batch`` prices many bookings at once. Events, offers, customers
+and earlier usages are read with one query each for the whole batch, and
+the arithmetic runs on plain tuples of Decimals.
+"""
+import uuid
+from collections import namedtuple
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.utils import timezone
+
+from .models import Offer, OfferUsage
+
+CENT = Decimal('0.01')
+ZERO = Decimal('0.00')
+
+# Bookings priced by one quote_batch call
+MAX_QUOTE_ITEMS = 1000
+
+
+class QuoteError(ValueError):
+    """A quote request item is invalid"""
+
+
+OfferTerms = namedtuple('OfferTerms', [
+    'pk', 'title', 'offer_type', 'discount_value', 'max_discount', 'stackable',
+    'status', 'valid_from', 'valid_to', 'max_usage', 'current_usage',
+])
+
+
+def offer_terms(offer_ids):
+    """OfferTerms of the given offers by id, read with one query"""
+    return {
+        row[0]: OfferTerms(*row)
+        for row in Offer.objects.filter(pk__in=offer_ids).values_list(*OfferTerms._fields)
+    }
+
+
+def unavailable_reason(offer, today):
+    """Why an offer cannot be used today, or None"""
+    if offer.status not in ('active', 'exhausted') or not offer.valid_from <= today <= offer.valid_to:
+        return 'Offer is not valid'
+    if offer.status == 'exhausted' or offer.max_usage is not None and offer.current_usage >= offer.max_usage:
+        return 'Offer is not available'
+    return None
+
+
+def offer_discount(offer, amount):
+    """What one offer takes off ``amount``"""
+    if offer.offer_type == 'percentage':
+        discount = (amount * offer.discount_value / 100).quantize(CENT, rounding=ROUND_HALF_UP)
+    else:
+        discount = offer.discount_value
+    if offer.max_discount is not None:
+        discount = min(discount, offer.max_discount)
+    return max(ZERO, min(discount, amount))
+
+
+def best_discount(amount, offers):
+    """
+    Best combination of ``offers`` for ``amount`` under the stacking rules.
+
+    Returns (discount, [(offer, discount), ...]) in the order applied.
+    """
+    options = [[offer] for offer in offers if not offer.stackable]
+    stackable = [offer for offer in offers if offer.stackable]
+    if stackable:
+        options.append(sorted(stackable, key=lambda offer: offer.offer_type != 'percentage'))
+
+    best = (ZERO, [])
+    for option in options:
+        remaining = amount
+        applied = []
+        for offer in option:
+            discount = offer_discount(offer, remaining)
+            remaining -= discount
+            applied.append((offer, discount))
+        if amount - remaining > best[0]:
+            best = (amount - remaining, applied)
+    return best
+
+
+def _parse_item(item):
+    """(event_id, customer_id or None, number_of_guests, offer_ids) of one quote request"""
+    event_id = uuid.UUID(str(item['event_id']))
+    customer_id = uuid.UUID(str(item['customer_id'])) if item.get('customer_id') else None
+    number_of_guests = int(item.get('number_of_guests', 1))
+    if number_of_guests < 1:
+        raise QuoteError('Number of guests must be at least 1')
+    offer_ids = item.get('offer_ids') or []
+    if not isinstance(offer_ids, list):
+        raise QuoteError('offer_ids must be a list')
+    return event_id, customer_id, number_of_guests, list(dict.fromkeys(uuid.UUID(str(pk)) for pk in offer_ids))
+
+
+def quote_batch(items):
+    """
+    Price bookings with offers.
+
+    ``items`` are dicts with ``event_id``, ``number_of_guests`` (default 1),
+    an optional ``customer_id`` (without it, earlier use of an offer is not
+    checked) and ``offer_ids``. Returns one dict per item, in order, with
+    ``subtotal``, ``discount``, ``total``, the ``applied`` offers and the
+    ``rejected`` ones with a reason, or with an ``error`` when the item
+    itself is invalid.
+    """
+    from customer_management.models import Customer
+    from events.models import Event
+
+    parsed = []
+    for item in items:
+        try:
+            parsed.append(_parse_item(item))
+        except QuoteError as e:
+            parsed.append(str(e))
+        except (AttributeError, KeyError, TypeError, ValueError):
+            parsed.append('Invalid event_id, customer_id, number_of_guests or offer_ids')
+
+    valid = [entry for entry in parsed if isinstance(entry, tuple)]
+    event_ids = {entry[0] for entry in valid}
+    customer_ids = {entry[1] for entry in valid if entry[1]}
+    offer_ids = {pk for entry in valid for pk in entry[3]}
+
+    events = {
+        pk: (price, is_active)
+        for pk, price, is_active in Event.objects.filter(pk__in=event_ids).values_list('pk', 'price', 'is_active')
+    }
+    customers = set(Customer.objects.filter(pk__in=customer_ids).values_list('pk', flat=True))
+    offers = offer_terms(offer_ids)
+    used = set(
+        OfferUsage.objects
+        .filter(offer_id__in=offer_ids, customer_id__in=customer_ids)
+        .values_list('offer_id', 'customer_id')
+    ) if offer_ids and customer_ids else set()
+    today = timezone.localdate()
+
+    quotes = []
+    for index, entry in enumerate(parsed):
+        if not isinstance(entry, tuple):
+            quotes.append({'index': index, 'error': entry})
+            continue
+        event_id, customer_id, number_of_guests, wanted = entry
+        if event_id not in events:
+            quotes.append({'index': index, 'error': 'Event not found'})
+            continue
+        if customer_id is not None and customer_id not in customers:
+            quotes.append({'index': index, 'error': 'Customer not found'})
+            continue
+
+        eligible = []
+        rejected = []
+        for offer_id in wanted:
+            offer = offers.get(offer_id)
+            if offer is None:
+                reason = 'Offer not found'
+            elif (offer_id, customer_id) in used:
+                reason = 'Customer has already used this offer'
+            else:
+                reason = unavailable_reason(offer, today)
+            if reason:
+                rejected.append({'offer_id': offer_id, 'reason': reason})
+            else:
+                eligible.append(offer)
+
+        price, is_active = events[event_id]
+        subtotal = price * number_of_guests
+        discount, applied = best_discount(subtotal, eligible)
+        applied_ids = {offer.pk for offer, _ in applied}
+        rejected.extend(
+            {'offer_id': offer.pk, 'reason': 'Does not combine with the other offers'}
+            for offer in eligible if offer.pk not in applied_ids
+        )
+        quotes.append({
+            'index': index,
+            'event_id': event_id,
+            'customer_id': customer_id,
+            'number_of_guests': number_of_guests,
+            'event_active': is_active,
+            'subtotal': subtotal,
+            'discount': discount,
+            'total': subtotal - discount,
+            'applied': [
+                {'offer_id': offer.pk, 'title': offer.title, 'discount': amount}
+                for offer, amount in applied
+            ],
+            'rejected': rejected,
+        })
+    return quotes
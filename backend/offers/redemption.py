@@ -0,0 +1,144 @@
+"""
+Offer redemption.
+
+Checking ``is_available`` and then saving ``current_usage + 1`` lets a
+rush of requests all see the last free use and push the offer past
+``max_usage``, and a repeated submit only finds out about the
+one-use-per-customer rule when the insert fails. A redemption instead
+takes one use with a conditional UPDATE::
+
+    UPDATE offers_offer
+       SET current_usage = current_usage + 1
+     WHERE id = %s AND status = 'active' AND valid_from <= today AND valid_to >= today
+       AND (max_usage IS NULL OR current_usage < max_usage)
+
+and inserts the usage in the same transaction, leaving duplicates to the
+``(offer, customer)`` unique constraint. Any failure rolls the transaction
+back, so the count always matches the usage rows.
+"""
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, IntegerField, Q, Value, When
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .cache import bump_on_commit
+from .models import Offer, OfferUsage
+from .pricing import offer_discount
+
+
+class RedemptionError(Exception):
+    """An offer could not be redeemed"""
+
+
+class OfferUnavailable(RedemptionError):
+    pass
+
+
+class OfferExhausted(OfferUnavailable):
+    pass
+
+
+class AlreadyRedeemed(RedemptionError):
+    pass
+
+
+def claim_use(offer_id, today=None):
+    """Take one use of a valid offer if one is left; return whether it worked"""
+    today = today or timezone.localdate()
+    claimed = Offer.objects.filter(
+        Q(max_usage__isnull=True) | Q(current_usage__lt=F('max_usage')),
+        pk=offer_id,
+        status='active',
+        valid_from__lte=today,
+        valid_to__gte=today,
+    ).update(
+        current_usage=F('current_usage') + 1,
+        # Taking the last use exhausts the offer
+        status=Case(When(max_usage=F('current_usage') + 1, then=Value('exhausted')), default=F('status')),
+        updated_at=timezone.now(),
+    ) == 1
+    if claimed:
+        # update() sends no signals; the count is part of the cached active set
+        bump_on_commit()
+    return claimed
+
+
+def release_uses(uses_by_offer):
+    """
+    Give uses back: ``uses_by_offer`` maps offer ids to the number of usages removed.
+
+    One UPDATE whose CASE picks every offer's own count; the count never
+    drops below zero and an exhausted offer with a use left is active again.
+    """
+    offer_ids = [offer_id for offer_id, uses in uses_by_offer.items() if uses]
+    if not offer_ids:
+        return
+    released = Case(
+        *(When(pk=offer_id, then=Value(uses_by_offer[offer_id])) for offer_id in offer_ids),
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+    Offer.objects.filter(pk__in=offer_ids).update(
+        current_usage=Greatest(F('current_usage') - released, Value(0)),
+        status=Case(
+            When(
+                Q(max_usage__isnull=True) | Q(max_usage__gt=F('current_usage') - released),
+                status='exhausted',
+                then=Value('active'),
+            ),
+            default=F('status'),
+        ),
+        updated_at=timezone.now(),
+    )
+    # update() sends no signals; the count is part of the cached active set
+    bump_on_commit()
+
+
+def redeem(offer, customer_id, order_id=None, amount=None, discount=None):
+    """
+    Redeem ``offer`` (an Offer or OfferTerms) for a customer.
+
+    ``discount_applied`` is ``discount`` when given, else what the offer
+    takes off ``amount``; a fixed offer needs neither.
+
+    Returns the new OfferUsage. Raises OfferUnavailable when the offer is
+    not valid today, OfferExhausted when it has no uses left,
+    AlreadyRedeemed when the customer has used it before and
+    RedemptionError for an unknown customer; in every case nothing is
+    written.
+    """
+    if discount is None:
+        if amount is None and offer.offer_type == 'percentage':
+            raise RedemptionError('An amount is required to price a percentage offer')
+        discount = offer_discount(offer, offer.discount_value if amount is None else amount)
+
+    try:
+        with transaction.atomic():
+            # The UPDATE comes first so the transaction starts by taking the
+            # write lock (SQLite) and never holds a stale read.
+            if not claim_use(offer.pk):
+                raise _unavailable(offer.pk)
+            return OfferUsage.objects.create(
+                offer_id=offer.pk,
+                customer_id=customer_id,
+                discount_applied=discount,
+                order_id=order_id,
+            )
+    except ValidationError:
+        raise RedemptionError('Customer not found')
+    except IntegrityError:
+        # A duplicate fails on insert, an unknown customer when the foreign
+        # key is checked at commit
+        if OfferUsage.objects.filter(offer_id=offer.pk, customer_id=customer_id).exists():
+            raise AlreadyRedeemed('Customer has already used this offer')
+        raise RedemptionError('Customer not found')
+
+
+def _unavailable(offer_id):
+    """The error explaining why ``claim_use`` found nothing to take"""
+    offer = Offer.objects.filter(pk=offer_id).first()
+    if offer is None or offer.status not in ('active', 'exhausted') \
+            or not offer.valid_from <= timezone.localdate() <= offer.valid_to:
+        return OfferUnavailable('Offer is not valid')
+    return OfferExhausted('Offer is not available')
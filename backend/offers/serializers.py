@@ -1,8 +1,20 @@
+from decimal import Decimal
+from urllib.parse import urlencode
+
+from django.db.models import Count, Max, Min, Sum
+from django.urls import reverse
 from rest_framework import serializers
+from hotel_backend.pagination import keyset_page
+from hotel_backend.serializers import DynamicFieldsMixin
 from .models import Offer, OfferUsage
 from customer_management.serializers import CustomerSerializer
 
-class OfferSerializer(serializers.ModelSerializer):
+# Usages embedded in OfferDetailSerializer, newest first like the usages list
+USAGES_ORDERING = '-used_at'
+USAGES_PAGE_SIZE = 20
+MAX_USAGES_PAGE_SIZE = 100
+
+class OfferSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Serializer for Offer model"""
     
     is_valid = serializers.ReadOnlyField()
@@ -11,11 +23,15 @@ class OfferSerializer(serializers.ModelSerializer):
     class Meta:
         model = Offer
         fields = ['id', 'title', 'description', 'offer_type', 'discount_value', 
-                 'status', 'valid_from', 'valid_to', 'max_usage', 'current_usage',
+                 'max_discount', 'stackable', 'status', 'valid_from', 'valid_to', 'max_usage', 'current_usage',
                  'is_valid', 'is_available', 'created_at', 'updated_at']
         read_only_fields = ['id', 'current_usage', 'created_at', 'updated_at']
+        field_dependencies = {
+            'is_valid': ['status', 'valid_from', 'valid_to'],
+            'is_available': ['status', 'valid_from', 'valid_to', 'max_usage', 'current_usage'],
+        }
 
-class OfferUsageSerializer(serializers.ModelSerializer):
+class OfferUsageSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Serializer for OfferUsage model"""
     
     customer_name = serializers.CharField(source='customer.name', read_only=True)
@@ -26,20 +42,75 @@ class OfferUsageSerializer(serializers.ModelSerializer):
         fields = ['id', 'offer', 'offer_title', 'customer', 'customer_name',
                  'used_at', 'discount_applied', 'order_id']
         read_only_fields = ['id', 'used_at']
+        expandable_fields = {
+            'offer': OfferSerializer,
+            'customer': CustomerSerializer,
+        }
 
-class OfferDetailSerializer(serializers.ModelSerializer):
-    """Detailed serializer for Offer with usage history"""
+class OfferDetailSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    """
+    Detailed serializer for Offer with the first page of its usage history.
     
-    usages = OfferUsageSerializer(many=True, read_only=True)
+    ``usages`` holds a summary computed in SQL (``count``,
+    ``total_discount``, ``first_used_at``, ``last_used_at``), ``next`` (a
+    cursor link into the usages list filtered to this offer) and the newest
+    ``results``; the page size is ``?usages_page_size=`` (default 20, max 100).
+    """
+    
+    usages = serializers.SerializerMethodField()
     is_valid = serializers.ReadOnlyField()
     is_available = serializers.ReadOnlyField()
     
     class Meta:
         model = Offer
         fields = ['id', 'title', 'description', 'offer_type', 'discount_value', 
-                 'status', 'valid_from', 'valid_to', 'max_usage', 'current_usage',
+                 'max_discount', 'stackable', 'status', 'valid_from', 'valid_to', 'max_usage', 'current_usage',
                  'is_valid', 'is_available', 'usages', 'created_at', 'updated_at']
         read_only_fields = ['id', 'current_usage', 'created_at', 'updated_at']
+        field_dependencies = {
+            **OfferSerializer.Meta.field_dependencies,
+            'usages': [],
+        }
+    
+    def get_usages(self, obj):
+        request = self.context.get('request')
+        page_size = USAGES_PAGE_SIZE
+        if request is not None:
+            try:
+                page_size = int(request.query_params.get('usages_page_size', USAGES_PAGE_SIZE))
+            except ValueError:
+                pass
+        page_size = max(1, min(page_size, MAX_USAGES_PAGE_SIZE))
+        
+        usages, cursor = keyset_page(
+            obj.usages.select_related('customer'), USAGES_ORDERING, page_size
+        )
+        for usage in usages:
+            usage.offer = obj
+        
+        next_link = None
+        if cursor is not None:
+            next_link = reverse('offerusage-list') + '?' + urlencode({
+                'offer_id': obj.pk, 'page_size': page_size, 'cursor': cursor,
+            })
+            if request is not None:
+                next_link = request.build_absolute_uri(next_link)
+        
+        summary = obj.usages.order_by().aggregate(
+            count=Count('pk'),
+            total_discount=Sum('discount_applied'),
+            first_used_at=Min('used_at'),
+            last_used_at=Max('used_at'),
+        )
+        return {
+            'count': summary['count'],
+            # A string like the other amounts
+            'total_discount': str((summary['total_discount'] or Decimal('0')).quantize(Decimal('0.01'))),
+            'first_used_at': summary['first_used_at'],
+            'last_used_at': summary['last_used_at'],
+            'next': next_link,
+            'results': OfferUsageSerializer(usages, many=True).data,
+        }
 
 class OfferCreateSerializer(serializers.ModelSerializer):
     """Serializer for creating new offers"""
@@ -47,7 +118,7 @@ class OfferCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Offer
         fields = ['title', 'description', 'offer_type', 'discount_value', 
-                 'valid_from', 'valid_to', 'max_usage']
+                 'max_discount', 'stackable', 'valid_from', 'valid_to', 'max_usage']
     
     def validate(self, data):
         """Validate offer data"""
@@ -60,4 +131,36 @@ class OfferCreateSerializer(serializers.ModelSerializer):
         if data['offer_type'] == 'percentage' and data['discount_value'] > 100:
             raise serializers.ValidationError("Percentage discount cannot exceed 100%.")
         
+        if data.get('max_discount') is not None and data['max_discount'] <= 0:
+            raise serializers.ValidationError("Maximum discount must be greater than 0.")
+        
         return data
+
+
+class AppliedOfferSerializer(serializers.Serializer):
+    """An offer applied to a quote"""
+    
+    offer_id = serializers.UUIDField()
+    title = serializers.CharField()
+    discount = serializers.DecimalField(max_digits=10, decimal_places=2)
+
+class RejectedOfferSerializer(serializers.Serializer):
+    """An offer left out of a quote"""
+    
+    offer_id = serializers.UUIDField()
+    reason = serializers.CharField()
+
+class QuoteSerializer(serializers.Serializer):
+    """Price of one booking with offers, from offers.pricing.quote_batch"""
+    
+    index = serializers.IntegerField()
+    error = serializers.CharField(required=False)
+    event_id = serializers.UUIDField(required=False)
+    customer_id = serializers.UUIDField(required=False, allow_null=True)
+    number_of_guests = serializers.IntegerField(required=False)
+    event_active = serializers.BooleanField(required=False)
+    subtotal = serializers.DecimalField(max_digits=12, decimal_places=2, required=False)
+    discount = serializers.DecimalField(max_digits=12, decimal_places=2, required=False)
+    total = serializers.DecimalField(max_digits=12, decimal_places=2, required=False)
+    applied = AppliedOfferSerializer(many=True, required=False)
+    rejected = RejectedOfferSerializer(many=True, required=False)
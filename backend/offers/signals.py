@@ -0,0 +1,14 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import bump_on_commit
+from .models import Offer, OfferUsage
+
+@receiver(post_save, sender=Offer)
+@receiver(post_delete, sender=Offer)
+@receiver(post_save, sender=OfferUsage)
+@receiver(post_delete, sender=OfferUsage)
+def invalidate_active_offers(sender, raw=False, **kwargs):
+    """Drop the cached active-offer sets after a write to offers or their usages"""
+    if not raw:
+        bump_on_commit()
@@ -1,3 +1,350 @@
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from django.core.cache import cache
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from customer_management.models import Customer
+from .cache import _seconds_to_midnight, active_offers
+from .expiry import sweep_offers
+from .models import Offer, OfferUsage
+from .pricing import OfferTerms, best_discount, offer_discount
+from .redemption import AlreadyRedeemed, OfferExhausted, claim_use, redeem
+
+
+def make_customer(phone):
+    return Customer.objects.create(name=f'Guest {phone}', phone=phone, birth_date=date(1990, 1, 1))
+
+
+def make_offer(**fields):
+    today = timezone.localdate()
+    defaults = {
+        'title': 'Ten off',
+        'description': 'Ten off any booking',
+        'offer_type': 'fixed',
+        'discount_value': Decimal('10.00'),
+        'valid_from': today - timedelta(days=1),
+        'valid_to': today + timedelta(days=1),
+    }
+    return Offer.objects.create(**{**defaults, **fields})
+
+
+class RedemptionTests(TestCase):
+    """Uses are claimed with one conditional UPDATE and never exceed max_usage"""
+
+    def setUp(self):
+        self.offer = make_offer(max_usage=2)
+        self.customers = [make_customer(f'+1555000000{index}') for index in range(3)]
+
+    def test_claim_use_stops_at_max_usage(self):
+        self.assertTrue(claim_use(self.offer.pk))
+        self.assertTrue(claim_use(self.offer.pk))
+        self.assertFalse(claim_use(self.offer.pk))
+        self.offer.refresh_from_db()
+        self.assertEqual(self.offer.current_usage, 2)
+
+    def test_last_use_exhausts_offer(self):
+        redeem(self.offer, self.customers[0].pk)
+        self.offer.refresh_from_db()
+        self.assertEqual(self.offer.status, 'active')
+
+        redeem(self.offer, self.customers[1].pk)
+        self.offer.refresh_from_db()
+        self.assertEqual(self.offer.status, 'exhausted')
+        self.assertEqual(self.offer.current_usage, 2)
+
+    def test_over_redemption_writes_nothing(self):
+        redeem(self.offer, self.customers[0].pk)
+        redeem(self.offer, self.customers[1].pk)
+        with self.assertRaises(OfferExhausted):
+            redeem(self.offer, self.customers[2].pk)
+        self.offer.refresh_from_db()
+        self.assertEqual(self.offer.current_usage, 2)
+        self.assertEqual(OfferUsage.objects.filter(offer=self.offer).count(), 2)
+
+    def test_duplicate_redemption_gives_use_back(self):
+        redeem(self.offer, self.customers[0].pk)
+        with self.assertRaises(AlreadyRedeemed):
+            redeem(self.offer, self.customers[0].pk)
+        self.offer.refresh_from_db()
+        self.assertEqual(self.offer.current_usage, 1)
+        self.assertEqual(OfferUsage.objects.filter(offer=self.offer).count(), 1)
+
+
+class UseOfferAPITests(TestCase):
+    """POST /api/offers/offers/{id}/use/ answers 409 once no use can be taken"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.offer = make_offer(max_usage=1)
+        self.first = make_customer('+15550000010')
+        self.second = make_customer('+15550000011')
+
+    def use(self, customer):
+        return self.client.post(f'/api/offers/offers/{self.offer.pk}/use/',
+                                {'customer_id': str(customer.pk)}, format='json')
+
+    def test_duplicate_submit_is_conflict(self):
+        self.assertEqual(self.use(self.first).status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.use(self.first).status_code, status.HTTP_409_CONFLICT)
+
+    def test_exhausted_offer_is_conflict(self):
+        self.assertEqual(self.use(self.first).status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.use(self.second).status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(OfferUsage.objects.filter(offer=self.offer).count(), 1)
+
+
+def terms(offer_type='fixed', value='10.00', max_discount=None, stackable=False, pk=None):
+    today = timezone.localdate()
+    return OfferTerms(pk or offer_type + value, 'Offer', offer_type, Decimal(value),
+                      Decimal(max_discount) if max_discount else None, stackable,
+                      'active', today, today, None, 0)
+
+
+class PricingTests(TestCase):
+    """Discounts round half up, respect caps and follow the stacking rules"""
+
+    def test_percentage_rounds_half_up_and_caps(self):
+        self.assertEqual(offer_discount(terms('percentage', '12.5'), Decimal('0.20')), Decimal('0.03'))
+        self.assertEqual(offer_discount(terms('percentage', '50', max_discount='20.00'), Decimal('100')),
+                         Decimal('20.00'))
+
+    def test_fixed_never_exceeds_amount(self):
+        self.assertEqual(offer_discount(terms('fixed', '30.00'), Decimal('25.00')), Decimal('25.00'))
+
+    def test_stackable_offers_apply_percentage_first(self):
+        discount, applied = best_discount(Decimal('100.00'), [
+            terms('fixed', '10.00', stackable=True),
+            terms('percentage', '10', stackable=True),
+        ])
+        # 10% of 100, then 10 off the remaining 90
+        self.assertEqual(discount, Decimal('20.00'))
+        self.assertEqual([offer.offer_type for offer, _ in applied], ['percentage', 'fixed'])
+
+    def test_best_of_non_stackable_alone_and_stack(self):
+        big = terms('fixed', '40.00')
+        discount, applied = best_discount(Decimal('100.00'), [
+            big,
+            terms('fixed', '10.00', stackable=True),
+            terms('percentage', '20', stackable=True),
+        ])
+        self.assertEqual(discount, Decimal('40.00'))
+        self.assertEqual([offer for offer, _ in applied], [big])
+
+
+class QuoteAPITests(TestCase):
+    """POST /api/offers/offers/quote/ prices items without redeeming anything"""
+
+    def setUp(self):
+        from events.models import Event
+
+        self.client = APIClient()
+        start = timezone.now() + timedelta(days=3)
+        self.event = Event.objects.create(title='Dinner', description='Dinner', event_type='Restaurant',
+                                          start_date=start, end_date=start + timedelta(hours=2),
+                                          capacity=10, price=Decimal('40.00'))
+        self.customer = make_customer('+15550000060')
+        self.offer = make_offer(offer_type='percentage', discount_value=Decimal('25'))
+
+    def quote(self, **item):
+        item = {'event_id': str(self.event.pk), 'number_of_guests': 2, **item}
+        response = self.client.post('/api/offers/offers/quote/', {'items': [item]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data['quotes'][0]
+
+    def test_quote_applies_offer(self):
+        quote = self.quote(customer_id=str(self.customer.pk), offer_ids=[str(self.offer.pk)])
+        self.assertEqual((quote['subtotal'], quote['discount'], quote['total']), ('80.00', '20.00', '60.00'))
+        self.assertFalse(OfferUsage.objects.exists())
+
+    def test_quote_rejects_used_offer(self):
+        redeem(self.offer, self.customer.pk, amount=Decimal('10.00'))
+        quote = self.quote(customer_id=str(self.customer.pk), offer_ids=[str(self.offer.pk)])
+        self.assertEqual(quote['discount'], '0.00')
+        self.assertEqual(quote['rejected'][0]['reason'], 'Customer has already used this offer')
+
+    def test_invalid_item_reports_error(self):
+        quote = self.quote(number_of_guests=0)
+        self.assertIn('error', quote)
+
+
+class ExpiryTests(TestCase):
+    """Offers past valid_to read as expired before and after the sweep"""
+
+    def setUp(self):
+        self.client = APIClient()
+        today = timezone.localdate()
+        self.past = make_offer(valid_from=today - timedelta(days=10), valid_to=today - timedelta(days=1))
+        self.current = make_offer()
+        self.used_up = make_offer(max_usage=1)
+        Offer.objects.filter(pk=self.used_up.pk).update(current_usage=1)
+
+    def stats(self):
+        return self.client.get('/api/offers/offers/stats/').data
+
+    def expired_ids(self):
+        return {row['id'] for row in self.client.get('/api/offers/offers/expired/').data}
+
+    def test_expired_and_stats_agree_without_sweep(self):
+        self.assertEqual(self.expired_ids(), {str(self.past.pk)})
+        stats = self.stats()
+        self.assertEqual((stats['expired_offers'], stats['active_offers']), (1, 2))
+
+    def test_sweep_transitions(self):
+        self.assertEqual(sweep_offers(), {'expired': 1, 'exhausted': 1, 'reactivated': 0})
+        statuses = dict(Offer.objects.values_list('pk', 'status'))
+        self.assertEqual(statuses[self.past.pk], 'expired')
+        self.assertEqual(statuses[self.used_up.pk], 'exhausted')
+        self.assertEqual(statuses[self.current.pk], 'active')
+
+        stats = self.stats()
+        self.assertEqual((stats['expired_offers'], stats['active_offers'], stats['exhausted_offers']), (1, 1, 1))
+        self.assertEqual(self.expired_ids(), {str(self.past.pk)})
+
+    def test_raising_max_usage_reactivates_offer(self):
+        sweep_offers()
+        offer = Offer.objects.get(pk=self.used_up.pk)
+        offer.max_usage = 2
+        offer.save(update_fields=['max_usage'])
+        offer.refresh_from_db()
+        self.assertEqual(offer.status, 'active')
+
+
+class ActiveOfferCacheTests(TestCase):
+    """The active set is cached per local day and dropped after writes commit"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.today = timezone.localdate()
+        self.offer = make_offer(valid_from=self.today, valid_to=self.today)
+        self.builds = 0
+
+    def build(self, queryset):
+        self.builds += 1
+        return sorted(str(pk) for pk in queryset.values_list('pk', flat=True))
+
+    def test_set_is_built_once(self):
+        self.assertEqual(active_offers(self.build, self.today)['rows'], [str(self.offer.pk)])
+        self.assertEqual(active_offers(self.build, self.today)['count'], 1)
+        self.assertEqual(self.builds, 1)
+
+    def test_write_drops_set_after_commit(self):
+        active_offers(self.build, self.today)
+        with self.captureOnCommitCallbacks(execute=True):
+            make_offer(title='Second', valid_from=self.today, valid_to=self.today)
+        self.assertEqual(len(active_offers(self.build, self.today)['rows']), 2)
+        self.assertEqual(self.builds, 2)
+
+    def test_redemption_drops_set(self):
+        active_offers(self.build, self.today)
+        with self.captureOnCommitCallbacks(execute=True):
+            claim_use(self.offer.pk)
+        active_offers(self.build, self.today)
+        self.assertEqual(self.builds, 2)
+
+    def test_next_day_has_its_own_set(self):
+        self.assertEqual(active_offers(self.build, self.today + timedelta(days=1))['rows'], [])
+
+    def test_entries_expire_at_local_midnight(self):
+        now = timezone.make_aware(datetime(2026, 3, 10, 23, 59, 30))
+        self.assertEqual(_seconds_to_midnight(now), 31)
+
+    def test_endpoint_answers_304_until_a_write(self):
+        response = self.client.get('/api/offers/offers/active/')
+        self.assertEqual([row['id'] for row in response.data], [str(self.offer.pk)])
+        etag = response['ETag']
+        self.assertEqual(self.client.get('/api/offers/offers/active/', HTTP_IF_NONE_MATCH=etag).status_code,
+                         status.HTTP_304_NOT_MODIFIED)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.offer.title = 'Renamed'
+            self.offer.save()
+        response = self.client.get('/api/offers/offers/active/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data[0]['title'], 'Renamed')
+
+
+class EligibilityTests(TestCase):
+    """Eligible offers are valid, have uses left and were not used by the customer"""
+
+    def setUp(self):
+        self.client = APIClient()
+        today = timezone.localdate()
+        self.customer = make_customer('+15550000080')
+        self.other = make_customer('+15550000081')
+        self.open = make_offer(title='Open')
+        self.used = make_offer(title='Used')
+        self.full = make_offer(title='Full', max_usage=1)
+        make_offer(title='Past', valid_from=today - timedelta(days=5), valid_to=today - timedelta(days=1))
+        redeem(self.used, self.customer.pk)
+        redeem(self.full, self.other.pk)
+
+    def test_single_customer(self):
+        response = self.client.get('/api/offers/offers/eligible/', {'customer_id': str(self.customer.pk)})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['id'] for row in response.data], [str(self.open.pk)])
+
+    def test_unknown_customer_is_not_found(self):
+        response = self.client.get('/api/offers/offers/eligible/',
+                                   {'customer_id': '00000000-0000-0000-0000-000000000000'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_malformed_customer_id_is_bad_request(self):
+        response = self.client.get('/api/offers/offers/eligible/', {'customer_id': 'nope'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_batch(self):
+        unknown = '00000000-0000-0000-0000-000000000000'
+        response = self.client.post('/api/offers/offers/eligible/', {
+            'customer_ids': [str(self.customer.pk), str(self.other.pk), unknown],
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        eligible = {str(row['customer_id']): {str(pk) for pk in row['offer_ids']}
+                    for row in response.data['customers']}
+        self.assertEqual(eligible, {
+            str(self.customer.pk): {str(self.open.pk)},
+            str(self.other.pk): {str(self.open.pk), str(self.used.pk)},
+        })
+        self.assertEqual([str(pk) for pk in response.data['not_found']], [unknown])
+
+
+class UsageHistoryTests(TestCase):
+    """Offer details embed a bounded page of usages and their totals"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.offer = make_offer()
+        for index in range(5):
+            OfferUsage.objects.create(offer=self.offer, customer=make_customer(f'+1555024{index:04d}'),
+                                      discount_applied=Decimal('2.50'))
+        OfferUsage.objects.create(offer=make_offer(), customer=make_customer('+15550249999'),
+                                  discount_applied=Decimal('9.00'))
+
+    def test_page_summary_and_next_link(self):
+        response = self.client.get(f'/api/offers/offers/{self.offer.pk}/', {'usages_page_size': 2})
+        usages = response.data['usages']
+        self.assertEqual((usages['count'], usages['total_discount'], len(usages['results'])), (5, '12.50', 2))
+        self.assertIsNotNone(usages['first_used_at'])
+
+        seen = [row['id'] for row in usages['results']]
+        next_link = usages['next']
+        while next_link:
+            response = self.client.get(next_link)
+            seen.extend(row['id'] for row in response.data['results'])
+            next_link = response.data['next']
+        expected = self.offer.usages.order_by('-used_at', '-pk').values_list('pk', flat=True)
+        self.assertEqual(seen, [str(pk) for pk in expected])
+
+    def test_page_size_is_bounded_and_unused_offers_are_empty(self):
+        response = self.client.get(f'/api/offers/offers/{self.offer.pk}/', {'usages_page_size': 0})
+        self.assertEqual(len(response.data['usages']['results']), 1)
 
-# Create your tests here.
+        response = self.client.get(f'/api/offers/offers/{make_offer().pk}/')
+        self.assertEqual(response.data['usages'], {
+            'count': 0, 'total_discount': '0.00', 'first_used_at': None, 'last_used_at': None,
+            'next': None, 'results': [],
+        })
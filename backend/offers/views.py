@@ -2,16 +2,27 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
+from django.db.models import Count, Q
 from django.utils import timezone
+from decimal import Decimal, InvalidOperation
+import uuid
+from hotel_backend.mixins import ConditionalGetMixin, SparseFieldsetMixin
+from hotel_backend.pagination import OptionalKeysetPagination
+from .cache import active_offers
+from .expiry import expired_filter
+from .eligibility import MAX_ELIGIBILITY_CUSTOMERS, eligibility_batch, eligible_offers
 from .models import Offer, OfferUsage
+from .pricing import MAX_QUOTE_ITEMS, quote_batch
+from .redemption import AlreadyRedeemed, OfferExhausted, RedemptionError, redeem
 from .serializers import (
     OfferSerializer, 
     OfferDetailSerializer, 
     OfferCreateSerializer,
-    OfferUsageSerializer
+    OfferUsageSerializer,
+    QuoteSerializer
 )
 
-class OfferViewSet(viewsets.ModelViewSet):
+class OfferViewSet(ConditionalGetMixin, SparseFieldsetMixin, viewsets.ModelViewSet):
     """ViewSet for Offer model"""
     
     queryset = Offer.objects.all()
@@ -41,7 +52,7 @@ class OfferViewSet(viewsets.ModelViewSet):
         # Filter by active offers only
         active_only = self.request.query_params.get('active_only', None)
         if active_only and active_only.lower() == 'true':
-            today = timezone.now().date()
+            today = timezone.localdate()
             queryset = queryset.filter(
                 status='active',
                 valid_from__lte=today,
@@ -52,29 +63,105 @@ class OfferViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['get'])
     def active(self, request):
-        """Get all active offers"""
-        today = timezone.now().date()
-        active_offers = Offer.objects.filter(
-            status='active',
-            valid_from__lte=today,
-            valid_to__gte=today
+        """
+        Get all active offers (answers If-None-Match with 304 while they are unchanged).
+        
+        The set of the day is served from the cache (see ``offers.cache``),
+        trimmed to ``?fields=`` / ``?exclude=``.
+        """
+        today = timezone.localdate()
+        entry = active_offers(
+            lambda queryset: list(OfferSerializer(queryset, many=True).data),
+            today,
         )
+        fields = list(self.get_serializer().fields)
+        
+        # The date is part of the validator since offers start and end by day
+        return self.conditional_response(
+            [],
+            lambda: Response([{name: row[name] for name in fields} for row in entry['rows']]),
+            extra=today,
+            stamps=[(entry['last_modified'], entry['count'])],
+        )
+    
+    @action(detail=False, methods=['get', 'post'])
+    def eligible(self, request):
+        """
+        Offers a customer can use right now: valid, with uses left and not used by them before.
+        
+        GET ``?customer_id=`` lists the offers (404 for an unknown customer). POST ``{"customer_ids": [...]}``
+        answers for up to 100000 customers at once with the usable
+        ``offer_ids`` and, per customer, the ids of those they can use;
+        unknown customers are listed in ``not_found``.
+        """
+        if request.method == 'POST':
+            return self._eligible_batch(request.data.get('customer_ids'))
+        
+        customer_id = request.query_params.get('customer_id')
+        try:
+            customer_id = uuid.UUID(str(customer_id))
+        except ValueError:
+            return Response({'error': 'A valid customer_id is required'}, 
+                           status=status.HTTP_400_BAD_REQUEST)
         
-        serializer = self.get_serializer(active_offers, many=True)
+        # One query: the validity predicates plus NOT EXISTS on the customer's usages
+        offers = list(self.sparse_queryset(eligible_offers(customer_id)))
+        if not offers:
+            from customer_management.models import Customer
+            if not Customer.objects.filter(pk=customer_id).exists():
+                return Response({'error': 'Customer not found'}, 
+                               status=status.HTTP_404_NOT_FOUND)
+        
+        serializer = self.get_serializer(offers, many=True)
         return Response(serializer.data)
     
+    def _eligible_batch(self, customer_ids):
+        if not isinstance(customer_ids, list) or not customer_ids:
+            return Response({'error': 'customer_ids must be a non-empty list'}, 
+                           status=status.HTTP_400_BAD_REQUEST)
+        if len(customer_ids) > MAX_ELIGIBILITY_CUSTOMERS:
+            return Response({'error': f'At most {MAX_ELIGIBILITY_CUSTOMERS} customers per request'}, 
+                           status=status.HTTP_400_BAD_REQUEST)
+        
+        parsed = []
+        not_found = []
+        for customer_id in customer_ids:
+            try:
+                parsed.append(uuid.UUID(str(customer_id)))
+            except ValueError:
+                not_found.append(customer_id)
+        
+        offer_ids, eligible = eligibility_batch(parsed)
+        customers = []
+        for customer_id in dict.fromkeys(parsed):
+            if customer_id in eligible:
+                customers.append({'customer_id': customer_id, 'offer_ids': eligible[customer_id]})
+            else:
+                not_found.append(customer_id)
+        
+        return Response({
+            'offer_ids': offer_ids,
+            'customers': customers,
+            'not_found': not_found,
+        })
+    
     @action(detail=False, methods=['get'])
     def expired(self, request):
-        """Get all expired offers"""
-        today = timezone.now().date()
-        expired_offers = Offer.objects.filter(valid_to__lt=today)
+        """Get all expired offers (past ``valid_to``, whether or not the expiry sweep has run)"""
+        expired_offers = self.sparse_queryset(Offer.objects.filter(expired_filter()))
         
         serializer = self.get_serializer(expired_offers, many=True)
         return Response(serializer.data)
     
     @action(detail=True, methods=['post'])
     def use(self, request, pk=None):
-        """Use an offer"""
+        """
+        Use an offer.
+        
+        ``amount`` is the price the offer is applied to and is required for
+        percentage offers. Answers 409 when the offer has no uses left or
+        the customer has already used it.
+        """
         offer = self.get_object()
         customer_id = request.data.get('customer_id')
         
@@ -82,56 +169,74 @@ class OfferViewSet(viewsets.ModelViewSet):
             return Response({'error': 'Customer ID is required'}, 
                            status=status.HTTP_400_BAD_REQUEST)
         
-        # Check if offer is valid and available
-        if not offer.is_valid:
-            return Response({'error': 'Offer is not valid'}, 
+        amount = request.data.get('amount')
+        if amount is not None:
+            try:
+                amount = Decimal(str(amount))
+            except InvalidOperation:
+                amount = None
+            if amount is None or not amount.is_finite() or amount < 0:
+                return Response({'error': 'Amount must be a non-negative number'}, 
+                               status=status.HTTP_400_BAD_REQUEST)
+        
+        # One use is claimed and the usage created in one transaction
+        try:
+            usage = redeem(offer, customer_id, order_id=request.data.get('order_id'), amount=amount)
+        except (OfferExhausted, AlreadyRedeemed) as e:
+            return Response({'error': str(e)}, 
+                           status=status.HTTP_409_CONFLICT)
+        except RedemptionError as e:
+            return Response({'error': str(e)}, 
                            status=status.HTTP_400_BAD_REQUEST)
         
-        if not offer.is_available:
-            return Response({'error': 'Offer is not available'}, 
+        serializer = OfferUsageSerializer(usage)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+    
+    @action(detail=False, methods=['post'])
+    def quote(self, request):
+        """
+        Price many bookings with offers in one call, without redeeming anything.
+        
+        Body: ``{"items": [{"event_id", "number_of_guests", "customer_id",
+        "offer_ids": [...]}, ...]}``. Each quote has ``subtotal``,
+        ``discount``, ``total``, the ``applied`` offers and the ``rejected``
+        ones with a reason, or an ``error``.
+        """
+        items = request.data.get('items')
+        if not isinstance(items, list) or not items:
+            return Response({'error': 'items must be a non-empty list'}, 
                            status=status.HTTP_400_BAD_REQUEST)
-        
-        # Check if customer has already used this offer
-        if OfferUsage.objects.filter(offer=offer, customer_id=customer_id).exists():
-            return Response({'error': 'Customer has already used this offer'}, 
+        if len(items) > MAX_QUOTE_ITEMS:
+            return Response({'error': f'At most {MAX_QUOTE_ITEMS} items per request'}, 
                            status=status.HTTP_400_BAD_REQUEST)
         
-        # Create offer usage
-        discount_applied = offer.discount_value
-        usage = OfferUsage.objects.create(
-            offer=offer,
-            customer_id=customer_id,
-            discount_applied=discount_applied
-        )
-        
-        # Update offer usage count
-        offer.current_usage += 1
-        offer.save()
-        
-        serializer = OfferUsageSerializer(usage)
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
+        return Response({'quotes': QuoteSerializer(quote_batch(items), many=True).data})
     
     @action(detail=False, methods=['get'])
     def stats(self, request):
-        """Get offer statistics"""
-        total_offers = Offer.objects.count()
-        active_offers = Offer.objects.filter(status='active').count()
-        expired_offers = Offer.objects.filter(status='expired').count()
+        """Get offer statistics; offers past ``valid_to`` count as expired like in ``expired``"""
+        expired = expired_filter()
+        counts = Offer.objects.aggregate(
+            total_offers=Count('pk'),
+            active_offers=Count('pk', filter=Q(status='active') & ~expired),
+            exhausted_offers=Count('pk', filter=Q(status='exhausted') & ~expired),
+            expired_offers=Count('pk', filter=expired),
+        )
         total_usage = OfferUsage.objects.count()
         
         return Response({
-            'total_offers': total_offers,
-            'active_offers': active_offers,
-            'expired_offers': expired_offers,
+            **counts,
             'total_usage': total_usage
         })
 
-class OfferUsageViewSet(viewsets.ModelViewSet):
+class OfferUsageViewSet(SparseFieldsetMixin, viewsets.ModelViewSet):
     """ViewSet for OfferUsage model"""
     
     queryset = OfferUsage.objects.all()
     serializer_class = OfferUsageSerializer
     permission_classes = [AllowAny]  # Temporarily allow unauthenticated access for development
+    pagination_class = OptionalKeysetPagination
+    keyset_ordering = '-used_at'
     
     def get_queryset(self):
         """Filter offer usages based on query parameters"""
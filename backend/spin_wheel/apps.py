@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class SpinWheelConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'spin_wheel'
+
+    def ready(self):
+        from . import signals  # noqa: F401
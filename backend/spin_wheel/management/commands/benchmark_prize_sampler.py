@@ -0,0 +1,73 @@
+import random
+import time
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from spin_wheel.sampler import AliasSampler, draw_prize
+
+
+def _weighted_list_draw(prizes, weights, rng):
+    """The former per-spin approach: a list with ``weight`` copies of each prize"""
+    weighted = []
+    for prize, weight in zip(prizes, weights):
+        weighted.extend([prize] * weight)
+    return rng.choice(weighted)
+
+
+class Command(BaseCommand):
+    help = 'Time prize draws from the alias table against the weighted list and count queries per spin'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='6,100,1000,10000',
+                            help='Comma-separated numbers of prizes to time')
+        parser.add_argument('--draws', type=int, default=100000,
+                            help='Draws per timing')
+        parser.add_argument('--seed', type=int, default=1,
+                            help='Random seed for the synthetic weights and draws')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        draws = options['draws']
+
+        self.stdout.write(f"{'prizes':>8} {'build ms':>10} {'alias ns/draw':>14} {'list ns/draw':>13} {'max error':>10}")
+        for size in [int(size) for size in options['sizes'].split(',')]:
+            prizes = list(range(size))
+            weights = [rng.randint(1, 30) for _ in prizes]
+
+            start = time.perf_counter()
+            sampler = AliasSampler(prizes, weights)
+            build = time.perf_counter() - start
+
+            start = time.perf_counter()
+            counts = Counter(sampler.draw(rng) for _ in range(draws))
+            alias = (time.perf_counter() - start) / draws
+
+            # The list is rebuilt on every spin, so fewer draws are enough
+            list_draws = max(1, min(draws, 2000000 // sum(weights)))
+            start = time.perf_counter()
+            for _ in range(list_draws):
+                _weighted_list_draw(prizes, weights, rng)
+            weighted_list = (time.perf_counter() - start) / list_draws
+
+            total = sum(weights)
+            error = max(abs(counts[prize] / draws - weight / total) for prize, weight in zip(prizes, weights))
+            self.stdout.write(
+                f'{size:>8} {build * 1000:>10.2f} {alias * 1e9:>14.0f} {weighted_list * 1e9:>13.0f} {error:>10.5f}'
+            )
+
+        # Spins against the configured prizes, after the table is built
+        if draw_prize() is None:
+            self.stdout.write('No active prizes with a positive probability; skipping the query check')
+            return
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            for _ in range(draws):
+                draw_prize()
+            elapsed = time.perf_counter() - start
+        self.stdout.write(
+            f'draw_prize: {elapsed / draws * 1e9:.0f} ns/draw, '
+            f'{len(queries.captured_queries)} queries in {draws} draws'
+        )
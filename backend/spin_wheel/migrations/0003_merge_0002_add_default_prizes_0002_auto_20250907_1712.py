@@ -0,0 +1,14 @@
+# Generated by Django 5.0.14 on 2026-10-18 05:00
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('spin_wheel', '0002_add_default_prizes'),
+        ('spin_wheel', '0002_auto_20250907_1712'),
+    ]
+
+    operations = [
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.14 on 2026-10-18 05:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer_management', '0005_keyset_pagination_indexes'),
+        ('spin_wheel', '0003_merge_0002_add_default_prizes_0002_auto_20250907_1712'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='spinwheelgame',
+            index=models.Index(fields=['-played_at', '-id'], name='spin_game_played_id_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.0.14 on 2026-10-18 05:39
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('spin_wheel', '0004_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='prize',
+            name='probability',
+            field=models.FloatField(default=20, validators=[django.core.validators.MinValueValidator(0)]),
+        ),
+    ]
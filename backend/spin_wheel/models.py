@@ -1,3 +1,4 @@
+from django.core.validators import MinValueValidator
 from django.db import models
 from customer_management.models import Customer
 import uuid
@@ -9,7 +10,8 @@ class Prize(models.Model):
     name = models.CharField(max_length=100)
     description = models.TextField()
     icon = models.CharField(max_length=10, default='🎁')  # Emoji icon
-    probability = models.PositiveIntegerField(default=20)  # Probability percentage
+    # Relative weight, fractions allowed (a percentage when the active prizes add up to 100)
+    probability = models.FloatField(default=20, validators=[MinValueValidator(0)])
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -20,7 +22,7 @@ class Prize(models.Model):
         verbose_name_plural = 'Prizes'
     
     def __str__(self):
-        return f"{self.name} ({self.probability}%)"
+        return f"{self.name} ({self.probability:g}%)"
 
 class SpinWheelGame(models.Model):
     """Track spin wheel game sessions"""
@@ -37,6 +39,9 @@ class SpinWheelGame(models.Model):
         ordering = ['-played_at']
         verbose_name = 'Spin Wheel Game'
         verbose_name_plural = 'Spin Wheel Games'
+        indexes = [
+            models.Index(fields=['-played_at', '-id'], name='spin_game_played_id_idx'),
+        ]
     
     def __str__(self):
         return f"{self.customer.name} won {self.prize_won.name}"
@@ -0,0 +1,121 @@
+"""
+Prize sampling.
+
+A spin used to read every active prize and build a list holding
+``probability`` copies of each before picking one, which costs a query and
+O(sum of weights) allocations per request and only works for whole
+numbers. Prizes are instead drawn from an alias table (Vose's method):
+building it is O(n) in the number of prizes, a draw is O(1) (one table
+slot and one biased coin) and weights can be fractional.
+
+Each process builds the table once and keeps it until the prize version
+changes or it is ``TABLE_TTL`` seconds old. Prize signals bump the version
+once the write commits; the version lives in the cache, so with
+``REDIS_URL`` every process sees a bump at once, while with the default
+per-process cache other workers catch up when their table expires. A draw
+costs one cache read and no queries.
+"""
+import random
+import threading
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Prize
+
+VERSION_KEY = 'spin_wheel:prizes:version'
+
+# Seconds a process keeps its table without seeing a version bump
+TABLE_TTL = 30
+
+_lock = threading.Lock()
+_cached = (None, 0.0, None)
+
+
+class AliasSampler:
+    """Draw items with probability proportional to their weights in O(1)"""
+
+    def __init__(self, items, weights):
+        pairs = [(item, float(weight)) for item, weight in zip(items, weights) if weight > 0]
+        if not pairs:
+            raise ValueError('At least one positive weight is required')
+        self.items = [item for item, _ in pairs]
+        count = len(pairs)
+        total = sum(weight for _, weight in pairs)
+        scaled = [weight * count / total for _, weight in pairs]
+
+        self.accept = [1.0] * count
+        self.alias = list(range(count))
+        small = [index for index, weight in enumerate(scaled) if weight < 1.0]
+        large = [index for index, weight in enumerate(scaled) if weight >= 1.0]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            self.accept[less] = scaled[less]
+            self.alias[less] = more
+            scaled[more] -= 1.0 - scaled[less]
+            (small if scaled[more] < 1.0 else large).append(more)
+        # Whatever is left is 1 up to rounding and keeps accept = 1
+
+    def __len__(self):
+        return len(self.items)
+
+    def draw(self, rng=random):
+        index = int(rng.random() * len(self.items))
+        if rng.random() < self.accept[index]:
+            return self.items[index]
+        return self.items[self.alias[index]]
+
+
+def _new_version():
+    # Started from the clock so a version lost with the cache never
+    # matches a table built before
+    return time.time_ns()
+
+
+def current_version():
+    return cache.get_or_set(VERSION_KEY, _new_version, timeout=None)
+
+
+def bump_version():
+    """Make every process rebuild its prize table on the next draw"""
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, _new_version(), timeout=None)
+
+
+def bump_on_commit():
+    transaction.on_commit(bump_version)
+
+
+def reset_sampler():
+    """Drop this process's table, e.g. after drawing a prize that was deleted meanwhile"""
+    global _cached
+    _cached = (None, 0.0, None)
+
+
+def _fresh(cached, version):
+    cached_version, built_at, _ = cached
+    return cached_version == version and time.monotonic() - built_at < TABLE_TTL
+
+
+def prize_sampler():
+    """The sampler of the active prizes, or None when no prize can be won"""
+    global _cached
+    version = current_version()
+    cached = _cached
+    if _fresh(cached, version):
+        return cached[2]
+    with _lock:
+        if not _fresh(_cached, version):
+            prizes = list(Prize.objects.filter(is_active=True, probability__gt=0))
+            sampler = AliasSampler(prizes, [prize.probability for prize in prizes]) if prizes else None
+            _cached = (version, time.monotonic(), sampler)
+        return _cached[2]
+
+
+def draw_prize(rng=random):
+    """A random active prize, weighted by probability, or None when there is none"""
+    sampler = prize_sampler()
+    return sampler.draw(rng) if sampler is not None else None
@@ -1,8 +1,11 @@
+import math
+
 from rest_framework import serializers
+from hotel_backend.serializers import DynamicFieldsMixin
 from .models import Prize, SpinWheelGame, GameSession
 from customer_management.serializers import CustomerSerializer
 
-class PrizeSerializer(serializers.ModelSerializer):
+class PrizeSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Serializer for Prize model"""
     
     class Meta:
@@ -10,8 +13,13 @@ class PrizeSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'description', 'icon', 'probability', 'is_active', 
                  'created_at', 'updated_at']
         read_only_fields = ['id', 'created_at', 'updated_at']
+    
+    def validate_probability(self, value):
+        if not math.isfinite(value) or value < 0:
+            raise serializers.ValidationError("Probability must be a non-negative number.")
+        return value
 
-class SpinWheelGameSerializer(serializers.ModelSerializer):
+class SpinWheelGameSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Serializer for SpinWheelGame model"""
     
     customer_name = serializers.CharField(source='customer.name', read_only=True)
@@ -23,8 +31,12 @@ class SpinWheelGameSerializer(serializers.ModelSerializer):
         fields = ['id', 'customer', 'customer_name', 'played_at', 'prize_won', 
                  'prize_name', 'prize_icon', 'is_claimed', 'claimed_at', 'notes']
         read_only_fields = ['id', 'played_at']
+        expandable_fields = {
+            'customer': CustomerSerializer,
+            'prize_won': PrizeSerializer,
+        }
 
-class GameSessionSerializer(serializers.ModelSerializer):
+class GameSessionSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Serializer for GameSession model"""
     
     customer_name = serializers.CharField(source='customer.name', read_only=True)
@@ -34,6 +46,9 @@ class GameSessionSerializer(serializers.ModelSerializer):
         fields = ['id', 'customer', 'customer_name', 'has_played', 'first_play_date', 
                  'created_at', 'updated_at']
         read_only_fields = ['id', 'created_at', 'updated_at']
+        expandable_fields = {
+            'customer': CustomerSerializer,
+        }
 
 class SpinWheelPlaySerializer(serializers.Serializer):
     """Serializer for playing the spin wheel game"""
@@ -0,0 +1,12 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Prize
+from .sampler import bump_on_commit
+
+@receiver(post_save, sender=Prize)
+@receiver(post_delete, sender=Prize)
+def invalidate_prize_sampler(sender, raw=False, **kwargs):
+    """Rebuild the prize tables after a prize is written"""
+    if not raw:
+        bump_on_commit()
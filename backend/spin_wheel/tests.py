@@ -1,3 +1,138 @@
-from django.test import TestCase
+import random
+from collections import Counter
+from datetime import date
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import TestCase, TransactionTestCase
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from customer_management.models import Customer
+from . import sampler
+from .models import Prize, SpinWheelGame
+from .sampler import TABLE_TTL, AliasSampler, draw_prize, prize_sampler, reset_sampler
+
+
+def make_prize(name='Dessert', probability=20, **fields):
+    return Prize.objects.create(name=name, description=f'A free {name.lower()}', probability=probability, **fields)
+
+
+def odds(table):
+    """Exact probability of each item under an alias table"""
+    count = len(table)
+    mass = Counter()
+    for index in range(count):
+        mass[table.items[index]] += table.accept[index] / count
+        mass[table.items[table.alias[index]]] += (1 - table.accept[index]) / count
+    return mass
+
+
+class ActivePrizesTests(TestCase):
+    """Active prizes answer 304 until one of them changes"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.prize = make_prize()
+
+    def test_etag_follows_the_active_prizes(self):
+        response = self.client.get('/api/spin-wheel/prizes/active/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response['ETag']
+        response = self.client.get('/api/spin-wheel/prizes/active/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.prize.probability = 30
+        self.prize.save()
+        response = self.client.get('/api/spin-wheel/prizes/active/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        row = next(row for row in response.data if row['id'] == str(self.prize.pk))
+        self.assertEqual(row['probability'], 30)
+
+
+class AliasSamplerTests(TestCase):
+    """The alias table draws every item with its share of the weights"""
+
+    def test_table_matches_the_weights(self):
+        weights = {'a': 50, 'b': 0.5, 'c': 12.25, 'd': 37.25, 'e': 0}
+        table = AliasSampler(list(weights), list(weights.values()))
+        self.assertEqual(len(table), 4)
+        total = sum(weights.values())
+        for item, probability in odds(table).items():
+            self.assertAlmostEqual(probability, weights[item] / total)
+        self.assertNotIn('e', odds(table))
+
+    def test_draws_follow_the_weights(self):
+        table = AliasSampler(['rare', 'common'], [1, 3])
+        rng = random.Random(25)
+        draws = Counter(table.draw(rng) for _ in range(20000))
+        self.assertAlmostEqual(draws['common'] / 20000, 0.75, delta=0.02)
+
+    def test_no_positive_weight(self):
+        with self.assertRaises(ValueError):
+            AliasSampler(['a'], [0])
+
+
+class PrizeSamplerTests(TestCase):
+    """Each process reuses its table until the prizes change or it expires"""
+
+    def setUp(self):
+        cache.clear()
+        reset_sampler()
+        # Start without the prizes seeded by the migrations
+        Prize.objects.all().delete()
+        self.prize = make_prize()
+
+    def tearDown(self):
+        reset_sampler()
+
+    def test_table_is_reused_without_queries(self):
+        table = prize_sampler()
+        with self.assertNumQueries(0):
+            self.assertIs(prize_sampler(), table)
+            self.assertEqual(draw_prize(), self.prize)
+
+    def test_prize_writes_rebuild_the_table(self):
+        table = prize_sampler()
+        with self.captureOnCommitCallbacks(execute=True):
+            make_prize('Spa', probability=0)
+            make_prize('Drink')
+        self.assertIsNot(prize_sampler(), table)
+        self.assertEqual({prize.name for prize in prize_sampler().items}, {'Dessert', 'Drink'})
+
+    def test_table_expires(self):
+        table = prize_sampler()
+        version, built_at, _ = sampler._cached
+        sampler._cached = (version, built_at - TABLE_TTL - 1, table)
+        self.assertIsNot(prize_sampler(), table)
+
+    def test_no_active_prize(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.prize.is_active = False
+            self.prize.save()
+        self.assertIsNone(draw_prize())
+
+
+class PlayTests(TransactionTestCase):
+    """A prize deleted after the table was built is redrawn from fresh data"""
+
+    def setUp(self):
+        Prize.objects.all().delete()
+        cache.clear()
+        reset_sampler()
+
+    def tearDown(self):
+        reset_sampler()
+
+    def test_deleted_prize_is_redrawn(self):
+        gone = make_prize('Gone')
+        prize_sampler()
+        # As if another process changed the prizes before this one saw the bump
+        with mock.patch('spin_wheel.signals.bump_on_commit'):
+            gone.delete()
+            kept = make_prize('Kept')
+
+        customer = Customer.objects.create(name='Guest', phone='+15550250000', birth_date=date(1990, 1, 1))
+        response = APIClient().post('/api/spin-wheel/games/play/', {'customer_id': str(customer.pk)}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(SpinWheelGame.objects.get().prize_won, kept)
@@ -2,9 +2,12 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
+from django.db import IntegrityError, transaction
 from django.utils import timezone
-import random
+from hotel_backend.mixins import ConditionalGetMixin, SparseFieldsetMixin
+from hotel_backend.pagination import OptionalKeysetPagination
 from .models import Prize, SpinWheelGame, GameSession
+from .sampler import draw_prize, reset_sampler
 from .serializers import (
     PrizeSerializer, 
     SpinWheelGameSerializer, 
@@ -13,7 +16,7 @@ from .serializers import (
     PrizeResultSerializer
 )
 
-class PrizeViewSet(viewsets.ModelViewSet):
+class PrizeViewSet(ConditionalGetMixin, SparseFieldsetMixin, viewsets.ModelViewSet):
     """ViewSet for Prize model"""
     
     queryset = Prize.objects.filter(is_active=True)
@@ -22,17 +25,21 @@ class PrizeViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['get'])
     def active(self, request):
-        """Get all active prizes"""
+        """Get all active prizes (answers If-None-Match with 304 while they are unchanged)"""
         active_prizes = Prize.objects.filter(is_active=True)
-        serializer = self.get_serializer(active_prizes, many=True)
-        return Response(serializer.data)
+        return self.conditional_response(
+            [active_prizes],
+            lambda: Response(self.get_serializer(self.sparse_queryset(active_prizes), many=True).data),
+        )
 
-class SpinWheelGameViewSet(viewsets.ModelViewSet):
+class SpinWheelGameViewSet(SparseFieldsetMixin, viewsets.ModelViewSet):
     """ViewSet for SpinWheelGame model"""
     
     queryset = SpinWheelGame.objects.all()
     serializer_class = SpinWheelGameSerializer
     permission_classes = [AllowAny]  # Temporarily allow unauthenticated access for development
+    pagination_class = OptionalKeysetPagination
+    keyset_ordering = '-played_at'
     
     def get_queryset(self):
         """Filter games based on query parameters"""
@@ -79,11 +86,21 @@ class SpinWheelGameViewSet(viewsets.ModelViewSet):
                 game_session.first_play_date = timezone.now()
             game_session.save()
         
-        # Create spin wheel game record
-        game = SpinWheelGame.objects.create(
-            customer=customer,
-            prize_won=prize
-        )
+        # Create spin wheel game record; a prize deleted since this process
+        # built its table fails the foreign key, so draw again from fresh data
+        try:
+            with transaction.atomic():
+                game = SpinWheelGame.objects.create(
+                    customer=customer,
+                    prize_won=prize
+                )
+        except IntegrityError:
+            reset_sampler()
+            prize = self._determine_prize()
+            game = SpinWheelGame.objects.create(
+                customer=customer,
+                prize_won=prize
+            )
         
         # Return result
         result_serializer = PrizeResultSerializer({
@@ -96,9 +113,9 @@ class SpinWheelGameViewSet(viewsets.ModelViewSet):
         return Response(result_serializer.data, status=status.HTTP_201_CREATED)
     
     def _determine_prize(self):
-        """Determine prize based on probability"""
-        prizes = Prize.objects.filter(is_active=True)
-        if not prizes.exists():
+        """Determine prize based on probability (O(1) from the cached alias table, no queries)"""
+        prize = draw_prize()
+        if prize is None:
             # Default prize if no prizes are configured
             return Prize.objects.create(
                 name="Thank You",
@@ -107,12 +124,7 @@ class SpinWheelGameViewSet(viewsets.ModelViewSet):
                 probability=100
             )
         
-        # Create weighted list based on probability
-        weighted_prizes = []
-        for prize in prizes:
-            weighted_prizes.extend([prize] * prize.probability)
-        
-        return random.choice(weighted_prizes)
+        return prize
     
     @action(detail=True, methods=['patch'])
     def claim(self, request, pk=None):
@@ -151,7 +163,7 @@ class SpinWheelGameViewSet(viewsets.ModelViewSet):
             'prize_distribution': prize_stats
         })
 
-class GameSessionViewSet(viewsets.ModelViewSet):
+class GameSessionViewSet(SparseFieldsetMixin, viewsets.ModelViewSet):
     """ViewSet for GameSession model"""
     
     queryset = GameSession.objects.all()
@@ -161,7 +173,7 @@ class GameSessionViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def played_customers(self, request):
         """Get list of customers who have played"""
-        played_sessions = GameSession.objects.filter(has_played=True)
+        played_sessions = self.sparse_queryset(GameSession.objects.filter(has_played=True))
         serializer = self.get_serializer(played_sessions, many=True)
         return Response(serializer.data)
     
@@ -3,11 +3,36 @@ from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework import status
 from django.http import JsonResponse
+from django.core.exceptions import ValidationError as DjangoValidationError
 import logging
+from customer_management.models import Customer
 from .whatsapp_service import WhatsAppService
 
 logger = logging.getLogger(__name__)
 
+def resolve_customer_recipient(data):
+    """
+    Fill customer_name and phone from customer_id when one is given.
+    
+    The stored E.164 number is sent as is, so the service does not have to
+    normalize the free text phone again.
+    """
+    customer_id = data.get('customer_id')
+    if not customer_id:
+        return data
+    
+    try:
+        customer = Customer.objects.filter(id=customer_id).values('name', 'phone', 'phone_e164').first()
+    except DjangoValidationError:
+        customer = None
+    if customer is None:
+        return None
+    
+    data = dict(data.items())
+    data.setdefault('customer_name', customer['name'])
+    data['phone'] = customer['phone_e164'] or customer['phone']
+    return data
+
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def send_whatsapp_wish(request):
@@ -22,9 +47,16 @@ def send_whatsapp_wish(request):
         "custom_message": "Hope you have an amazing day!",
         "offer_details": "Special 20% off offer"
     }
+    
+    "customer_id" can be sent instead of "customer_name" and "phone".
     """
     try:
-        data = request.data
+        data = resolve_customer_recipient(request.data)
+        if data is None:
+            return Response({
+                'success': False,
+                'error': 'Customer not found'
+            }, status=status.HTTP_404_NOT_FOUND)
         
         # Validate required fields
         required_fields = ['customer_name', 'phone', 'special_date_type']
@@ -93,9 +125,16 @@ def send_whatsapp_message(request):
         "phone": "+1234567890",
         "message": "Your custom message here"
     }
+    
+    "customer_id" can be sent instead of "phone".
     """
     try:
-        data = request.data
+        data = resolve_customer_recipient(request.data)
+        if data is None:
+            return Response({
+                'success': False,
+                'error': 'Customer not found'
+            }, status=status.HTTP_404_NOT_FOUND)
         
         # Validate required fields
         if 'phone' not in data or 'message' not in data:
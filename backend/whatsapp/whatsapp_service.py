@@ -2,6 +2,7 @@ import requests
 import os
 from django.conf import settings
 import logging
+from customer_management.phone import is_e164, normalize_phone
 
 logger = logging.getLogger(__name__)
 
@@ -64,15 +65,14 @@ class WhatsAppService:
     
     def _format_phone_number(self, phone: str) -> str:
         """Format phone number for WhatsApp API"""
-        # Remove all non-digit characters except +
-        clean_phone = ''.join(filter(lambda x: x.isdigit() or x == '+', phone))
-        
-        # If no country code, assume US (+1)
-        if not clean_phone.startswith('+'):
-            clean_phone = '+1' + clean_phone.lstrip('0')
+        # Numbers read from Customer.phone_e164 are already normalized
+        if not is_e164(phone):
+            phone = normalize_phone(phone)
+            if phone is None:
+                raise ValueError('Invalid phone number')
         
         # Remove + for API calls (some APIs don't need it)
-        return clean_phone.replace('+', '')
+        return phone[1:]
     
     def _send_via_mock(self, phone: str, message: str) -> dict:
         """